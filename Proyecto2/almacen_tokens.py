@@ -0,0 +1,593 @@
+# ---------------------------------------------
+# Almacén compacto de tokens (struct-of-arrays)
+# - Columnas paralelas array('i'): tipo, línea, columna, índice de lexema
+#   (o, con lexer.tokenize, tipo, índice de lexema y offset en el texto:
+#   línea y columna se calculan al pedirlas, ver posiciones.py)
+# - Tabla de cadenas: cada lexema distinto se guarda una sola vez
+# - Token: vista liviana que solo se crea al pedir un token concreto
+# - dedent_de: tabla INDENT -> DEDENT para saltar bloques enteros
+# - BufferTokens: ventana circular sobre un iterador de tokens (modo streaming)
+# - a_bytes/desde_bytes: serialización compacta (caché en disco)
+# - escribir_binario/TokensMapeados: archivo de tokens binario que se lee
+#   con mmap, sin copiar ni decodificar los registros
+# ---------------------------------------------
+
+import marshal
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+
+
+def sumar_tramo(columna, desde, hasta, delta):
+    """columna[desde:hasta] += delta para un array de enteros (una pasada en C)."""
+    if delta and desde < hasta:
+        columna[desde:hasta] = array(columna.typecode, map(delta.__add__, columna[desde:hasta]))
+
+
+class Token:
+    """Vista de un token dentro de un TokenStore (no copia datos)."""
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store, i):
+        self._store = store
+        self._i = i
+
+    @property
+    def kind(self):
+        return self._store.tipos[self._i]
+
+    @property
+    def type(self):
+        return self._store.nombres_tipo[self._store.tipos[self._i]]
+
+    @property
+    def lexeme(self):
+        return self._store.cadenas[self._store.lexemas[self._i]]
+
+    @property
+    def line(self):
+        return self._store.linea(self._i)
+
+    @property
+    def col(self):
+        return self._store.columna(self._i)
+
+    def __repr__(self):
+        return f"Token({self.type!r}, {self.lexeme!r}, {self.line}, {self.col})"
+
+
+class TokenStore:
+    """
+    Secuencia de tokens guardada en columnas paralelas:
+      tipos[i]    -> id entero del tipo (índice en nombres_tipo)
+      lexemas[i]  -> índice del lexema en la tabla 'cadenas'
+      lineas[i], columnas[i]
+    Un token ocupa 16 bytes en las columnas, frente a un dict por token.
+    Tras desplazar_lineas, lineas[i] puede tener pendiente un desplazamiento
+    (a partir de _corte_lineas): la línea real se lee con linea(i).
+    Con 'posiciones' (un IndiceLineas del texto fuente) las columnas de
+    línea y columna quedan vacías y cada token guarda su offset en
+    offsets[i] (12 bytes por token): se llena con agregar_en.
+    """
+
+    def __init__(self, nombres_tipo, posiciones=None):
+        self.nombres_tipo = list(nombres_tipo)
+        self._id_tipo = {nombre: k for k, nombre in enumerate(self.nombres_tipo)}
+        self.tipos = array("i")
+        self.lexemas = array("i")
+        self.lineas = array("i")
+        self.columnas = array("i")
+        self.posiciones = posiciones
+        self.offsets = array("i") if posiciones is not None else None
+        self.cadenas = [""]
+        self._indice_cadena = {"": 0}
+        self._corte_lineas = 0
+        self._d_lineas = 0  # se suma a lineas[k] para k >= _corte_lineas
+        self._dedents = None  # INDENT -> DEDENT que lo cierra (ver dedent_de)
+        self.errores = []  # LexError de los que el lexer se recuperó (tokenize con max_errores > 1)
+
+    def id_tipo(self, nombre):
+        """Id del tipo con ese nombre; registra tipos desconocidos (p. ej. al leer archivos)."""
+        k = self._id_tipo.get(nombre)
+        if k is None:
+            k = len(self.nombres_tipo)
+            self.nombres_tipo.append(nombre)
+            self._id_tipo[nombre] = k
+        return k
+
+    def agregar(self, tipo, lexema, linea, col):
+        """Añade un token; 'tipo' es el id entero del tipo."""
+        k = self._indice_cadena.get(lexema)
+        if k is None:
+            k = len(self.cadenas)
+            self.cadenas.append(lexema)
+            self._indice_cadena[lexema] = k
+        self.tipos.append(tipo)
+        self.lexemas.append(k)
+        self.lineas.append(linea)
+        self.columnas.append(col)
+
+    def agregar_en(self, tipo, lexema, offset):
+        """Añade un token por su offset en el texto (almacén con 'posiciones')."""
+        k = self._indice_cadena.get(lexema)
+        if k is None:
+            k = len(self.cadenas)
+            self.cadenas.append(lexema)
+            self._indice_cadena[lexema] = k
+        self.tipos.append(tipo)
+        self.lexemas.append(k)
+        self.offsets.append(offset)
+
+    def __len__(self):
+        return len(self.tipos)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.tipos)
+        if not 0 <= i < len(self.tipos):
+            raise IndexError("token fuera de rango")
+        return Token(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.tipos)):
+            yield Token(self, i)
+
+    def linea(self, i):
+        if self.posiciones is not None:
+            return self.posiciones.linea(self.offsets[i])
+        linea = self.lineas[i]
+        return linea + self._d_lineas if i >= self._corte_lineas else linea
+
+    def columna(self, i):
+        if self.posiciones is not None:
+            return self.posiciones.columna(self.offsets[i])
+        return self.columnas[i]
+
+    def lineas_columnas(self):
+        """Columnas (lineas, columnas) completas; con offsets se calculan en una pasada."""
+        if self.posiciones is not None:
+            return self.posiciones.convertir(self.offsets)
+        self.fijar_lineas()
+        return self.lineas, self.columnas
+
+    def dedent_de(self, i):
+        """
+        Posición del DEDENT que cierra el INDENT de la posición i (None si no
+        está emparejado). La tabla se arma una sola vez, en O(n), la primera
+        vez que se pide: se buscan los INDENT/DEDENT en los bytes de la
+        columna de tipos y se emparejan con una pila.
+        """
+        if self._dedents is None:
+            self._dedents = self._emparejar_bloques()
+        return self._dedents.get(i)
+
+    def _emparejar_bloques(self):
+        indent, dedent = self._id_tipo["INDENT"], self._id_tipo["DEDENT"]
+        datos = self.tipos.tobytes()
+        ancho = self.tipos.itemsize
+        posiciones = []
+        for tipo in (indent, dedent):
+            aguja = array(self.tipos.typecode, [tipo]).tobytes()
+            j = datos.find(aguja)
+            while j != -1:
+                if j % ancho == 0:  # solo coincidencias alineadas a un elemento
+                    posiciones.append(j // ancho)
+                j = datos.find(aguja, j + 1)
+        posiciones.sort()
+        tipos = self.tipos
+        abiertos = []
+        parejas = {}
+        for p in posiciones:
+            if tipos[p] == indent:
+                abiertos.append(p)
+            elif abiertos:
+                parejas[abiertos.pop()] = p
+        return parejas
+
+    def filas(self):
+        """Recorre los tokens como tuplas (tipo, lexema, linea, col), el formato de iter_tokens."""
+        lineas, columnas = self.lineas_columnas()
+        cadenas = self.cadenas
+        for tipo, k, linea, col in zip(self.tipos, self.lexemas, lineas, columnas):
+            yield tipo, cadenas[k], linea, col
+
+    # ---- Edición en sitio (lexer incremental) ----
+
+    def vacio_compartido(self):
+        """Almacén vacío que comparte la tabla de cadenas (para empalmar después)."""
+        otro = TokenStore.__new__(TokenStore)
+        otro.nombres_tipo, otro._id_tipo = self.nombres_tipo, self._id_tipo
+        otro.cadenas, otro._indice_cadena = self.cadenas, self._indice_cadena
+        otro.tipos, otro.lexemas = array("i"), array("i")
+        otro.lineas, otro.columnas = array("i"), array("i")
+        otro.posiciones, otro.offsets = None, None
+        otro._corte_lineas, otro._d_lineas = 0, 0
+        otro._dedents = None
+        otro.errores = []
+        return otro
+
+    def empalmar(self, desde, hasta, otro):
+        """Reemplaza los tokens [desde, hasta) por los de 'otro' (de vacio_compartido, sin desplazamientos)."""
+        if self._d_lineas:
+            if self._corte_lineas < hasta:
+                sumar_tramo(self.lineas, self._corte_lineas, desde, self._d_lineas)
+                self._corte_lineas = desde + len(otro)
+            else:
+                self._corte_lineas += len(otro) - (hasta - desde)
+        self.tipos[desde:hasta] = otro.tipos
+        self._dedents = None
+        self.lexemas[desde:hasta] = otro.lexemas
+        self.lineas[desde:hasta] = otro.lineas
+        self.columnas[desde:hasta] = otro.columnas
+
+    def recortar(self, n):
+        """Descarta los tokens desde la posición n (recuperación de errores del lexer)."""
+        del self.tipos[n:], self.lexemas[n:]
+        if self.offsets is not None:
+            del self.offsets[n:]
+        else:
+            self.fijar_lineas()
+            del self.lineas[n:], self.columnas[n:]
+        self._dedents = None
+
+    def desplazar_lineas(self, desde, delta):
+        """
+        Suma 'delta' a la línea de todos los tokens desde 'desde', de forma
+        perezosa: solo se materializa el tramo entre este corte y el anterior,
+        así que ediciones sucesivas en la misma zona no recorren el archivo.
+        """
+        if not delta:
+            return
+        if self._d_lineas:
+            corte, d = self._corte_lineas, self._d_lineas
+            if corte < desde:
+                sumar_tramo(self.lineas, corte, desde, d)
+            else:
+                sumar_tramo(self.lineas, desde, corte, delta)
+            self._corte_lineas, self._d_lineas = max(corte, desde), d + delta
+        else:
+            self._corte_lineas, self._d_lineas = desde, delta
+
+    def fijar_lineas(self):
+        """Aplica el desplazamiento pendiente: lineas[i] vuelve a ser la línea real."""
+        if self._d_lineas:
+            sumar_tramo(self.lineas, self._corte_lineas, len(self.lineas), self._d_lineas)
+            self._corte_lineas, self._d_lineas = 0, 0
+
+    def a_bytes(self):
+        """Serializa el almacén (columnas en binario + tabla de cadenas), comprimido."""
+        lineas, columnas = self.lineas_columnas()
+        return zlib.compress(marshal.dumps((
+            tuple(self.nombres_tipo), self.tipos.tobytes(), self.lexemas.tobytes(),
+            lineas.tobytes(), columnas.tobytes(), self.cadenas,
+        )), 1)
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        """Inverso de a_bytes."""
+        nombres, tipos, lexemas, lineas, columnas, cadenas = marshal.loads(zlib.decompress(datos))
+        store = cls(nombres)
+        store.tipos.frombytes(tipos)
+        store.lexemas.frombytes(lexemas)
+        store.lineas.frombytes(lineas)
+        store.columnas.frombytes(columnas)
+        store.cadenas = cadenas
+        store._indice_cadena = {cadena: k for k, cadena in enumerate(cadenas)}
+        return store
+
+
+# ---- Formato binario mapeable ----
+# Cabecera (64 bytes, little-endian) y secciones alineadas a 4 bytes:
+#   registros  n x 8 bytes: tipo u8, delta de línea u8, columna u16, lexema u32
+#   puntos     línea absoluta de cada token múltiplo de PASO_PUNTOS
+#   desbordes  (índice, línea, columna) de los tokens cuyo delta de línea o
+#              columna no entra en su campo (ordenados por índice)
+#   cadenas    tabla de lexemas sin repetir: desplazamientos u32 + UTF-8
+#   nombres    nombres de los tipos, en el mismo formato
+# La columna se guarda absoluta: en 16 bits ya entra casi siempre y así se
+# lee en O(1); la línea se reconstruye sumando deltas desde el punto o
+# desborde anterior (a lo sumo PASO_PUNTOS bytes, con sum() en C).
+
+MAGICO_BINARIO = b"TOKB"
+VERSION_BINARIO = 1
+_CABECERA = struct.Struct("<4sHHIIIIQQQQQ")
+PASO_PUNTOS = 256
+_DELTA_MAX = 0xFF  # delta de línea que no entra: va a desbordes
+_COL_MAX = 0xFFFF
+_BLOQUE_ESCRITURA = 1 << 16
+
+
+def es_binario(nombre_archivo):
+    """True si el archivo empieza con la firma del formato binario."""
+    with open(nombre_archivo, "rb") as f:
+        return f.read(len(MAGICO_BINARIO)) == MAGICO_BINARIO
+
+
+def _palabras(typecode, valores):
+    datos = array(typecode, valores)
+    if sys.byteorder != "little":
+        datos.byteswap()
+    return datos.tobytes()
+
+
+def _escribir_tabla(f, cadenas):
+    blobs = [c.encode("utf-8") for c in cadenas]
+    desplazamientos = [0]
+    for b in blobs:
+        desplazamientos.append(desplazamientos[-1] + len(b))
+    f.write(_palabras("I", desplazamientos))
+    f.write(b"".join(blobs))
+    _alinear(f)
+
+
+def _alinear(f):
+    resto = f.tell() % 4
+    if resto:
+        f.write(bytes(4 - resto))
+
+
+def escribir_binario(tokens, nombre_archivo, nombres_tipo=None):
+    """
+    Escribe los tokens en el formato binario. Acepta un TokenStore o
+    cualquier iterable de tuplas (tipo, lexema, linea, col), p. ej.
+    lexer.iter_tokens(f), que se escribe por bloques sin materializarlo;
+    en ese caso hay que pasar 'nombres_tipo'.
+    """
+    if isinstance(tokens, TokenStore):
+        nombres_tipo = tokens.nombres_tipo
+        cadenas = tokens.cadenas
+        filas = zip(tokens.tipos, tokens.lexemas, *tokens.lineas_columnas())
+    else:
+        cadenas = [""]
+        indice = {"": 0}
+
+        def internar(filas):
+            for tipo, lexema, linea, col in filas:
+                k = indice.get(lexema)
+                if k is None:
+                    k = indice[lexema] = len(cadenas)
+                    cadenas.append(lexema)
+                yield tipo, k, linea, col
+
+        filas = internar(tokens)
+    if len(nombres_tipo) > 0x100:
+        raise ValueError("el formato binario admite a lo sumo 256 tipos de token")
+
+    puntos = []
+    desbordes = []
+    with open(nombre_archivo, "wb") as f:
+        f.write(bytes(_CABECERA.size))
+        bloque = []
+        n = 0
+        previa = 0
+        for tipo, k, linea, col in filas:
+            delta = linea - previa
+            previa = linea
+            if n % PASO_PUNTOS == 0:
+                puntos.append(linea)
+            if not 0 <= delta < _DELTA_MAX or not 0 <= col < _COL_MAX:
+                desbordes += (n, linea, col)
+                delta = min(max(delta, 0), _DELTA_MAX)
+                col = min(max(col, 0), _COL_MAX)
+            bloque += (tipo | delta << 8 | col << 16, k)
+            n += 1
+            if len(bloque) >= _BLOQUE_ESCRITURA:
+                f.write(_palabras("I", bloque))
+                bloque.clear()
+        f.write(_palabras("I", bloque))
+        off_puntos = f.tell()
+        f.write(_palabras("I", puntos))
+        off_desbordes = f.tell()
+        f.write(_palabras("I", desbordes))
+        off_cadenas = f.tell()
+        _escribir_tabla(f, cadenas)
+        off_nombres = f.tell()
+        _escribir_tabla(f, nombres_tipo)
+        f.seek(0)
+        f.write(_CABECERA.pack(MAGICO_BINARIO, VERSION_BINARIO, 0, n, len(nombres_tipo), len(cadenas),
+                               len(desbordes) // 3, _CABECERA.size, off_puntos, off_desbordes,
+                               off_cadenas, off_nombres))
+    return n
+
+
+class _TablaCadenas:
+    """Tabla de cadenas del archivo mapeado: cada lexema se decodifica al pedirlo."""
+    __slots__ = ("_datos", "_desplazamientos", "_cache")
+
+    def __init__(self, datos, desplazamientos):
+        self._datos = datos
+        self._desplazamientos = desplazamientos
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._desplazamientos) - 1
+
+    def __getitem__(self, k):
+        cadena = self._cache.get(k)
+        if cadena is None:
+            d = self._desplazamientos
+            cadena = self._cache[k] = str(self._datos[d[k]:d[k + 1]], "utf-8")
+        return cadena
+
+
+class TokensMapeados:
+    """
+    Tokens de un archivo de escribir_binario, mapeados en memoria. Las
+    columnas son memoryviews sobre el mmap (tipos[i] es el byte del tipo en
+    el registro i), así que abrir el archivo no lee ni copia los registros:
+    el Parser recorre 'tipos' como con un TokenStore. Líneas, columnas y
+    lexemas se resuelven solo para los tokens que se piden.
+    """
+
+    def __init__(self, nombre_archivo):
+        with open(nombre_archivo, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._abrir(nombre_archivo)
+        except Exception:
+            self.cerrar()
+            raise
+
+    def _abrir(self, nombre_archivo):
+        if len(self._mm) < _CABECERA.size:
+            raise ValueError(f"{nombre_archivo}: no es un archivo de tokens binario")
+        (magico, version, _, n, n_nombres, n_cadenas, n_desbordes, off_registros, off_puntos,
+         off_desbordes, off_cadenas, off_nombres) = _CABECERA.unpack_from(self._mm)
+        if magico != MAGICO_BINARIO:
+            raise ValueError(f"{nombre_archivo}: no es un archivo de tokens binario")
+        if version != VERSION_BINARIO:
+            raise ValueError(f"{nombre_archivo}: versión {version} del formato binario no soportada")
+        mv = self._mv = memoryview(self._mm)
+        self._n = n
+        registros = mv[off_registros:off_registros + 8 * n]
+        self.tipos = registros[0::8]
+        self._deltas = registros[1::8]
+        self.lexemas = self._enteros(registros, "I")[1::2]
+        self._columnas = self._enteros(registros, "H")[1::4]
+        self._puntos = self._enteros(mv[off_puntos:off_desbordes], "I")
+        desbordes = self._enteros(mv[off_desbordes:off_desbordes + 12 * n_desbordes], "I").tolist()
+        self._desborde_idx = desbordes[0::3]
+        self._desborde_pos = dict(zip(desbordes[0::3], zip(desbordes[1::3], desbordes[2::3])))
+        self.cadenas = self._tabla(off_cadenas, n_cadenas)
+        nombres = self._tabla(off_nombres, n_nombres)
+        self.nombres_tipo = [nombres[k] for k in range(n_nombres)]
+
+    @staticmethod
+    def _enteros(datos, typecode):
+        if sys.byteorder == "little":
+            return datos.cast(typecode)
+        columna = array(typecode, datos.tobytes())  # sin vista directa: copia en el orden nativo
+        columna.byteswap()
+        return memoryview(columna)
+
+    def _tabla(self, off, n):
+        desplazamientos = self._enteros(self._mv[off:off + 4 * (n + 1)], "I")
+        inicio = off + 4 * (n + 1)
+        return _TablaCadenas(self._mv[inicio:inicio + desplazamientos[n]], desplazamientos)
+
+    def cerrar(self):
+        """Libera las vistas y el mmap (los Token ya creados dejan de servir)."""
+        cadenas = self.__dict__.pop("cadenas", None)
+        vistas = [self.__dict__.pop(nombre, None)
+                  for nombre in ("tipos", "_deltas", "lexemas", "_columnas", "_puntos", "_mv")]
+        if cadenas is not None:
+            vistas += (cadenas._datos, cadenas._desplazamientos)
+        for vista in vistas:
+            if isinstance(vista, memoryview):
+                vista.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("token fuera de rango")
+        return Token(self, i)
+
+    def __iter__(self):
+        for i in range(self._n):
+            yield Token(self, i)
+
+    def linea(self, i):
+        desborde = self._desborde_pos.get(i)
+        if desborde is not None:
+            return desborde[0]
+        bloque = i // PASO_PUNTOS
+        desde, linea = bloque * PASO_PUNTOS, self._puntos[bloque]
+        j = bisect_right(self._desborde_idx, i) - 1
+        if j >= 0 and self._desborde_idx[j] >= desde:
+            desde = self._desborde_idx[j]
+            linea = self._desborde_pos[desde][0]
+        return linea + sum(self._deltas[desde + 1:i + 1])
+
+    def columna(self, i):
+        desborde = self._desborde_pos.get(i)
+        return desborde[1] if desborde is not None else self._columnas[i]
+
+    def filas(self):
+        """Recorre los tokens como tuplas (tipo, lexema, linea, col), decodificando en secuencia."""
+        cadenas, desbordes = self.cadenas, self._desborde_pos
+        linea = 0
+        for i, (tipo, delta, k, col) in enumerate(zip(self.tipos, self._deltas, self.lexemas, self._columnas)):
+            desborde = desbordes.get(i)
+            if desborde is not None:
+                linea, col = desborde
+            else:
+                linea += delta
+            yield tipo, cadenas[k], linea, col
+
+
+class TokenSuelto:
+    """Token independiente (copiado de una tupla) con la misma interfaz que Token."""
+    __slots__ = ("kind", "lexeme", "line", "col", "_nombres")
+
+    def __init__(self, fila, nombres_tipo):
+        self.kind, self.lexeme, self.line, self.col = fila
+        self._nombres = nombres_tipo
+
+    @property
+    def type(self):
+        return self._nombres[self.kind]
+
+    def __repr__(self):
+        return f"Token({self.type!r}, {self.lexeme!r}, {self.line}, {self.col})"
+
+
+class _ColumnaTipos:
+    """Expone los tipos de un BufferTokens con la interfaz de la columna 'tipos'."""
+    __slots__ = ("_buffer",)
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    def __getitem__(self, pos):
+        return self._buffer.fila(pos)[0]
+
+
+class BufferTokens:
+    """
+    Ventana circular sobre un iterador de tuplas (tipo, lexema, linea, col).
+    El parser LL(1) solo mira el token actual, así que basta con un anillo de
+    pocas posiciones: los tokens se piden al iterador a medida que se avanza y
+    la memoria no crece con el tamaño de la entrada. Pasado el último token
+    (EOF) se sigue devolviendo ese mismo token.
+    """
+
+    def __init__(self, iterable, nombres_tipo, capacidad=4):
+        self._it = iter(iterable)
+        self._anillo = [None] * capacidad
+        self._capacidad = capacidad
+        self._leidos = 0          # tokens ya tomados del iterador
+        self._agotado = False
+        self.nombres_tipo = nombres_tipo
+        self.tipos = _ColumnaTipos(self)
+
+    def fila(self, pos):
+        """Tupla del token en 'pos' (no puede haber salido ya de la ventana)."""
+        anillo, cap = self._anillo, self._capacidad
+        while pos >= self._leidos and not self._agotado:
+            try:
+                anillo[self._leidos % cap] = next(self._it)
+                self._leidos += 1
+            except StopIteration:
+                self._agotado = True
+        if pos >= self._leidos:
+            pos = self._leidos - 1
+        elif pos < self._leidos - cap:
+            raise IndexError("el token ya salió de la ventana de lectura")
+        return anillo[pos % cap]
+
+    def __getitem__(self, pos):
+        return TokenSuelto(self.fila(pos), self.nombres_tipo)
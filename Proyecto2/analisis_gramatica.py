@@ -5,11 +5,92 @@
 # - Errores de indentación: "<fila,columna>Error sintactico: falla de indentacion"
 # - Soporta elif, while, for-in, asignaciones, llamadas, listas, unarios, postfijos
 # - Lee tokens de 'salida_tokens.txt' de manera robusta (lexemas con comas)
+# - analyze(): lexer -> parser en memoria, sin pasar por 'salida_tokens.txt'
+# - Con un archivo abierto, tokens en streaming (iter_tokens): memoria acotada
+# - ParserTabla: mismo análisis dirigido por la tabla LL(1) de gramatica.py
+# - ParserAST: además construye el AST en una arena compacta (arbol.py)
+# - ParserEsquema: solo cabeceras de clases/funciones, cuerpos bajo demanda
+# - max_errores > 1: recuperación en modo pánico, todos los errores en una pasada
 # - Guarda salida en "salida parser.txt"
 # ---------------------------------------------
 
+import sys
+
+from almacen_tokens import BufferTokens, TokensMapeados, TokenStore, es_binario
+from arbol import ND, ArenaAST
+from gramatica import construir_tabla
+from lexer import NOMBRES_TIPO, TK, LexError, iter_tokens, tokenize
+
+# Tipos de token como constantes enteras del módulo (valores de lexer.TK):
+# en el camino caliente una global se resuelve más rápido que TK.X
+EOF, NEWLINE, INDENT, DEDENT, ID = TK.EOF, TK.NEWLINE, TK.INDENT, TK.DEDENT, TK.ID
+KW_BOOL, KW_BREAK, KW_CLASS, KW_CONTINUE, KW_DEF = TK.KW_BOOL, TK.KW_BREAK, TK.KW_CLASS, TK.KW_CONTINUE, TK.KW_DEF
+KW_ELIF, KW_ELSE, KW_FLOAT, KW_FOR, KW_FROM = TK.KW_ELIF, TK.KW_ELSE, TK.KW_FLOAT, TK.KW_FOR, TK.KW_FROM
+KW_IF, KW_IMPORT, KW_IN, KW_INT, KW_PASS = TK.KW_IF, TK.KW_IMPORT, TK.KW_IN, TK.KW_INT, TK.KW_PASS
+KW_PRINT, KW_RETURN, KW_STR, KW_WHILE, KW_YIELD = TK.KW_PRINT, TK.KW_RETURN, TK.KW_STR, TK.KW_WHILE, TK.KW_YIELD
+ASIG, COMA, COR_DER, COR_IZQ, DOS_PUNTOS = TK.ASIG, TK.COMA, TK.COR_DER, TK.COR_IZQ, TK.DOS_PUNTOS
+PAR_DER, PAR_IZQ, PUNTO = TK.PAR_DER, TK.PAR_IZQ, TK.PUNTO
+
+# ------------------------- PRECEDENCIA DE OPERADORES -------------------------
+# Niveles de Python, de menor a mayor: un número más alto liga más fuerte
+(PREC_OR, PREC_AND, PREC_NOT, PREC_COMPARACION, PREC_OR_BIT, PREC_XOR_BIT, PREC_AND_BIT,
+ PREC_SHIFT, PREC_SUMA, PREC_MULT, PREC_UNARIO, PREC_POTENCIA) = range(1, 13)
+
+PRECEDENCIA_BINARIA = {
+    TK.KW_OR: PREC_OR,
+    TK.KW_AND: PREC_AND,
+    TK.IGUALDAD: PREC_COMPARACION, TK.DISTINTO: PREC_COMPARACION,
+    TK.MAYOR: PREC_COMPARACION, TK.MENOR: PREC_COMPARACION,
+    TK.MAYOR_IGUAL: PREC_COMPARACION, TK.MENOR_IGUAL: PREC_COMPARACION,
+    TK.OR_BIT: PREC_OR_BIT,
+    TK.XOR_BIT: PREC_XOR_BIT,
+    TK.AND_BIT: PREC_AND_BIT,
+    TK.SHIFT_IZQ: PREC_SHIFT, TK.SHIFT_DER: PREC_SHIFT,
+    TK.SUMA: PREC_SUMA, TK.RESTA: PREC_SUMA,
+    TK.MULT: PREC_MULT, TK.DIV: PREC_MULT, TK.DIV_ENTERA: PREC_MULT, TK.MOD: PREC_MULT, TK.MATMUL: PREC_MULT,
+    TK.POTENCIA: PREC_POTENCIA,
+}
+
+# 'not' liga menos que las comparaciones (not a == b -> not (a == b)) y los
+# unarios aritméticos menos que '**' (-a ** b -> -(a ** b))
+PRECEDENCIA_PREFIJA = {TK.KW_NOT: PREC_NOT, TK.SUMA: PREC_UNARIO, TK.RESTA: PREC_UNARIO, TK.NOT_BIT: PREC_UNARIO}
+
+# Niveles que no se reducen ante un operador del mismo nivel: '**' asocia por la
+# derecha y las comparaciones se encadenan (a < b < c es una sola comparación)
+NO_REDUCE_IGUAL = frozenset({PREC_POTENCIA, PREC_COMPARACION})
+
+# Marcos abiertos dentro de una expresión
+_GRUPO, _LISTA, _LLAMADA, _INDICE = range(4)
+
+
+def _reducir(arbol, ops, base):
+    """
+    Saca de 'ops' el operador de la cima y crea su nodo con los operandos de
+    arbol.pila. Una comparación se lleva las comparaciones consecutivas que
+    tenga debajo en el mismo marco: a < b < c es un solo nodo con tres hijos.
+    """
+    p = ops.pop()
+    if p == PREC_NOT or p == PREC_UNARIO:
+        # El operador prefijo es el token anterior a su operando
+        h = arbol.pila[-1]
+        arbol.cerrar(ND.UNARIA, arbol.inicios[h] - 1, arbol.fines[h], len(arbol.pila) - 1)
+    elif p == PREC_COMPARACION:
+        n = 2
+        while len(ops) > base and ops[-1] == PREC_COMPARACION:
+            ops.pop()
+            n += 1
+        arbol.envolver(ND.COMPARACION, n)
+    else:
+        arbol.envolver(ND.BINARIA, 2)
+
+
 class ParseError(Exception):
-    pass
+    """Error sintáctico: posición y mensaje (el mismo que se emite a los logs)."""
+
+    def __init__(self, linea=None, columna=None, mensaje=""):
+        super().__init__(mensaje)
+        self.linea = linea
+        self.columna = columna
 
 
 # ---------------------------- CARGA DE TOKENS ----------------------------
@@ -20,8 +101,13 @@ def cargar_tokens(nombre_archivo):
       <TIPO,LEXEMA,LINEA,COL>
       <TIPO,LINEA,COL>  (sin lexema)
     Soporta lexemas que contengan comas.
+    Devuelve un TokenStore (mismo formato que produce lexer.tokenize).
+    Si el archivo está en el formato binario (lexer.exportar_tokens_binario)
+    se delega en cargar_tokens_binario.
     """
-    tokens = []
+    if es_binario(nombre_archivo):
+        return cargar_tokens_binario(nombre_archivo)
+    tokens = TokenStore(NOMBRES_TIPO)
     with open(nombre_archivo, "r", encoding="utf-8") as f:
         for raw in f:
             line = raw.strip()
@@ -57,367 +143,513 @@ def cargar_tokens(nombre_archivo):
                 # Si por algún motivo no son números, descartar línea
                 continue
 
-            tokens.append({"type": tipo, "lexeme": lexema, "line": linea, "col": columna})
+            tokens.agregar(tokens.id_tipo(tipo), lexema, linea, columna)
 
     # Asegurar EOF
-    if not tokens or tokens[-1]["type"] != "EOF":
-        last_line = tokens[-1]["line"] if tokens else 1
-        last_col = (tokens[-1]["col"] + 1) if tokens else 1
-        tokens.append({"type": "EOF", "lexeme": "", "line": last_line, "col": last_col})
+    if not len(tokens) or tokens[-1].type != "EOF":
+        last_line = tokens[-1].line if len(tokens) else 1
+        last_col = (tokens[-1].col + 1) if len(tokens) else 1
+        tokens.agregar(tokens.id_tipo("EOF"), "", last_line, last_col)
+    return tokens
+
+
+def cargar_tokens_binario(nombre_archivo):
+    """
+    Abre un archivo de lexer.exportar_tokens_binario con mmap: devuelve un
+    TokensMapeados que el Parser recorre sin copiar los registros (cerrarlo
+    con .cerrar() o un bloque with). Los ids de tipo del archivo deben ser
+    los de este lexer, porque el Parser compara los enteros directamente.
+    """
+    tokens = TokensMapeados(nombre_archivo)
+    if tokens.nombres_tipo[:len(NOMBRES_TIPO)] != list(NOMBRES_TIPO):
+        tokens.cerrar()
+        raise ValueError(f"{nombre_archivo}: tokens generados con otra versión del lexer")
     return tokens
 
 
 # -------------------------------- PARSER --------------------------------
 
 class Parser:
-    # Operadores binarios que este parser reconoce (asociación izquierda, sin precedencia fina)
-    OP_TYPES = {
-        "tk_suma", "tk_resta", "tk_mult", "tk_div", "tk_mod",
-        "tk_igualdad", "tk_distinto", "tk_mayor", "tk_menor", "tk_mayor_igual", "tk_menor_igual",
+    # Los tipos de token son enteros (lexer.TK); los conjuntos FIRST/lookahead se
+    # precalculan como frozensets de enteros. Los nombres legados (tk_*) solo se
+    # usan al formatear mensajes de error.
+
+    # Operadores binarios que este parser reconoce (precedencia en PRECEDENCIA_BINARIA)
+    OP_TYPES = frozenset({
+        TK.SUMA, TK.RESTA, TK.MULT, TK.DIV, TK.MOD,
+        TK.IGUALDAD, TK.DISTINTO, TK.MAYOR, TK.MENOR, TK.MAYOR_IGUAL, TK.MENOR_IGUAL,
         # Extras según tu lexer mejorado:
-        "tk_potencia",          # **
-        "tk_div_entera",        # //
-        "tk_shift_izq", "tk_shift_der",  # << >>
-        "tk_and_bit", "tk_or_bit", "tk_xor_bit",  # & | ^
-        "tk_matmul",            # @
-    }
+        TK.POTENCIA,          # **
+        TK.DIV_ENTERA,        # //
+        TK.SHIFT_IZQ, TK.SHIFT_DER,  # << >>
+        TK.AND_BIT, TK.OR_BIT, TK.XOR_BIT,  # & | ^
+        TK.MATMUL,            # @
+    })
+
+    # OP_TYPES más 'and'/'or': lo que puede continuar una expresión
+    BINARY_OPS = OP_TYPES | {TK.KW_AND, TK.KW_OR}
 
     # Operadores de asignación aumentada (target simple soportado)
-    AUG_ASSIGN = {
-        "tk_mas_igual", "tk_menos_igual", "tk_mul_igual", "tk_div_igual", "tk_mod_igual",
-        "tk_divent_igual", "tk_pot_igual", "tk_andb_igual", "tk_orb_igual", "tk_xorb_igual",
-        "tk_shl_igual", "tk_shr_igual"
-    }
-
-    TYPE_STARTERS = {"id", "int", "str", "float", "bool", "tk_cor_izq"}
-
-    # Tokens que pueden iniciar una expresión (además de 'id')
-    EXPR_STARTERS = {
-        "tk_entero", "tk_float", "tk_cadena",
-        "True", "False", "None",
-        "tk_par_izq", "tk_cor_izq"
-    }
-
-    def __init__(self, tokens):
+    AUG_ASSIGN = frozenset({
+        TK.MAS_IGUAL, TK.MENOS_IGUAL, TK.MUL_IGUAL, TK.DIV_IGUAL, TK.MOD_IGUAL,
+        TK.DIVENT_IGUAL, TK.POT_IGUAL, TK.ANDB_IGUAL, TK.ORB_IGUAL, TK.XORB_IGUAL,
+        TK.SHL_IGUAL, TK.SHR_IGUAL
+    })
+
+    TYPE_STARTERS = frozenset({TK.ID, TK.KW_INT, TK.KW_STR, TK.KW_FLOAT, TK.KW_BOOL, TK.COR_IZQ})
+
+    # Tokens que pueden iniciar una expresión (además de 'id'); tupla ordenada
+    # para los mensajes de error y frozenset para las consultas
+    EXPR_STARTERS_ORDEN = (
+        TK.ENTERO, TK.FLOAT, TK.CADENA,
+        TK.KW_TRUE, TK.KW_FALSE, TK.KW_NONE,
+        TK.PAR_IZQ, TK.COR_IZQ
+    )
+    EXPR_STARTERS = frozenset(EXPR_STARTERS_ORDEN)
+
+    UNARY_OPS = frozenset({TK.SUMA, TK.RESTA, TK.NOT_BIT, TK.KW_NOT})
+    LITERALS = frozenset({TK.ENTERO, TK.FLOAT, TK.CADENA, TK.KW_TRUE, TK.KW_FALSE, TK.KW_NONE})
+    END_OF_STMT = frozenset({TK.NEWLINE, TK.DEDENT, TK.EOF})
+
+    # Lo que se esperaba al no poder iniciar un término (orden del mensaje original)
+    TERM_EXPECTED = (TK.ID, TK.ENTERO, TK.FLOAT, TK.CADENA, TK.KW_TRUE, TK.KW_FALSE, TK.KW_NONE,
+                     TK.PAR_IZQ, TK.COR_IZQ, TK.SUMA, TK.RESTA, TK.NOT_BIT, TK.KW_NOT)
+
+    # Solo el parser recursivo sabe retomar tras un error (ver _sincronizar)
+    RECUPERA_ERRORES = True
+
+    def __init__(self, tokens, silencioso=False, max_errores=1):
+        # tokens: TokenStore (se lee su columna de tipos directamente) o cualquier
+        # iterador de tuplas (tipo, lexema, linea, col), p. ej. lexer.iter_tokens,
+        # que se consume a través de una ventana circular de pocos tokens.
+        # silencioso=True: los mensajes solo van a self.logs (uso por lotes)
+        # max_errores > 1: recuperación en modo pánico; self.errores junta hasta
+        # max_errores errores (los léxicos de tokens.errores primero)
+        if max_errores > 1 and not self.RECUPERA_ERRORES:
+            raise ValueError(f"{type(self).__name__} no se recupera de errores: usar max_errores=1")
+        if not hasattr(tokens, "tipos"):
+            tokens = BufferTokens(tokens, NOMBRES_TIPO)
         self.tokens = tokens
+        self._tipos = tokens.tipos
+        self._ultimo = len(tokens) - 1 if hasattr(tokens, "__len__") else sys.maxsize
         self.pos = 0
+        self.k = self._tipos[0] if self._ultimo >= 0 else EOF  # tipo (entero) del token actual
         self.logs = []
+        self.silencioso = silencioso
+        self.error_sintactico = None  # ParseError que detuvo el análisis, si hubo
+        self.max_errores = max_errores
+        self.errores = []  # LexError y ParseError en el orden en que se informaron
+        self.arbol = None  # ArenaAST en construcción (solo ParserAST)
 
     def emit(self, msg: str):
-        print(msg)
+        if not self.silencioso:
+            print(msg)
         self.logs.append(msg)
 
     def actual(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else self.tokens[-1]
+        return self.tokens[self.pos]
 
     def avanzar(self):
-        tok = self.actual()
-        self.pos += 1
-        return tok
+        # Al llegar al último token (EOF) la posición queda fija en él
+        if self.pos < self._ultimo:
+            self.pos += 1
+            self.k = self._tipos[self.pos]
 
-    def coincidir(self, *esperados):
-        tok = self.actual()
-        if tok["type"] in esperados or tok["lexeme"] in esperados:
-            return self.avanzar()
-        self.error(tok, esperados)
+    def coincidir(self, esperado):
+        if self.k != esperado:
+            self.error(self.actual(), (esperado,))
+        self.avanzar()
 
     # --------- Errores ----------
     def error(self, tok, esperados):
-        linea, columna = tok["line"], tok["col"]
-        enc = tok["lexeme"] if tok["lexeme"] else tok["type"]
-        esp = ", ".join(esperados)
-        self.emit(f"<{linea},{columna}> Error sintactico: se encontro: “{enc}”; se esperaba: “{esp}”.")
-        raise ParseError()
+        linea, columna = tok.line, tok.col
+        enc = tok.lexeme if tok.lexeme else tok.type
+        esp = ", ".join(NOMBRES_TIPO[k] for k in esperados)
+        self.error_custom(linea, columna, enc, esp)
 
     def error_custom(self, linea, columna, encontrado, esperado):
-        self.emit(f"<{linea},{columna}> Error sintactico: se encontro: “{encontrado}”; se esperaba: “{esperado}”.")
-        raise ParseError()
+        msg = f"<{linea},{columna}> Error sintactico: se encontro: “{encontrado}”; se esperaba: “{esperado}”."
+        if not self._repetido(linea, columna):
+            self.emit(msg)
+        raise ParseError(linea, columna, msg)
 
     def indent_error(self, tok):
-        self.emit(f"<{tok['line']},{tok['col']}>Error sintactico: falla de indentacion")
-        raise ParseError()
+        msg = f"<{tok.line},{tok.col}>Error sintactico: falla de indentacion"
+        if not self._repetido(tok.line, tok.col):
+            self.emit(msg)
+        raise ParseError(tok.line, tok.col, msg)
+
+    def _repetido(self, linea, columna):
+        # Tras recuperarse, el mismo error puede volver a saltar en el mismo
+        # token (p. ej. al cerrar la suite que lo contenía): se informa una vez
+        ultimo = self.errores[-1] if self.errores else None
+        return isinstance(ultimo, ParseError) and ultimo.linea == linea and ultimo.columna == columna
 
     # ---------------------------------------------
     # Programa
     # ---------------------------------------------
     def parse_programa(self):
+        for e in getattr(self.tokens, "errores", ()):
+            self.emit(f">>> {e}")
+            self.errores.append(e)
+        if len(self.errores) >= self.max_errores:
+            return
         try:
-            while self.actual()["type"] != "EOF":
-                self.parse_sentencia()
-            self.coincidir("EOF")
-            self.emit(" Análisis sintáctico finalizado correctamente.")
-        except ParseError:
-            pass
+            while self.k != EOF:
+                self._sentencia(superior=True)
+            self.coincidir(EOF)
+            if not self.errores:
+                self.emit(" Análisis sintáctico finalizado correctamente.")
+        except ParseError as e:
+            if not self.errores or (self.errores[-1] is not e and not self._repetido(e.linea, e.columna)):
+                self.errores.append(e)
+        self.error_sintactico = next((e for e in self.errores if isinstance(e, ParseError)), None)
+
+    # ---------------------------------------------
+    # Recuperación de errores (modo pánico)
+    # ---------------------------------------------
+    def _sentencia(self, superior=False):
+        # parse_sentencia de los bucles de sentencias (programa y suites): con
+        # max_errores > 1 un error se anota y el análisis sigue tras sincronizar
+        inicio = self.pos
+        try:
+            self.parse_sentencia()
+        except ParseError as e:
+            self._anotar(e)
+            self._sincronizar(inicio, superior)
+
+    def _anotar(self, e):
+        """Agrega 'e' a self.errores (si no repite el anterior); al llegar al tope lo relanza."""
+        if self.errores and self.errores[-1] is e:
+            raise e  # ya anotado en una suite interna: se llegó al tope
+        if not self._repetido(e.linea, e.columna):
+            self.errores.append(e)
+        if len(self.errores) >= self.max_errores:
+            raise e
+
+    def _sincronizar(self, inicio, superior):
+        """
+        Tras un error en la sentencia que empezó en 'inicio', descarta tokens
+        hasta el fin de la línea lógica (los NEWLINE se consumen) o hasta un
+        DEDENT/EOF, que cierran la suite en curso. Si el error saltó en el
+        primer token de una línea (p. ej. falta el cuerpo de una cabecera), esa
+        línea es la sentencia siguiente y no se descarta. Un bloque indentado
+        que quede detrás (el cuerpo de una cabecera con error) se analiza como
+        una suite, y después los elif/else que lo continúan, anotando los
+        errores de todos ellos.
+        """
+        if self.pos == inicio and self.k == DEDENT:
+            if not superior:
+                return  # cierra la suite en curso: lo consume parse_suite
+            self.avanzar()  # DEDENT suelto en el nivel superior
+        elif self.pos == inicio or self._tipos[self.pos - 1] not in (NEWLINE, DEDENT):
+            self._saltar_linea()
+        while True:
+            while self.k == NEWLINE:
+                self.avanzar()
+            if self.k != INDENT:
+                return
+            self._recuperar_bloque()
+            if self.k not in (KW_ELIF, KW_ELSE):
+                return
+            inicio = self.pos
+            try:
+                self._parse_ramas_if()
+                return
+            except ParseError as e:
+                self._anotar(e)  # en la cabecera de un elif/else: se sincroniza igual
+            if self.pos == inicio or self._tipos[self.pos - 1] not in (NEWLINE, DEDENT):
+                self._saltar_linea()
+
+    def _saltar_linea(self):
+        # Hasta el fin de la línea lógica o un cambio de bloque
+        while self.k not in (NEWLINE, INDENT, DEDENT, EOF):
+            self.avanzar()
+
+    def _recuperar_bloque(self):
+        # Desde un INDENT sin cabecera válida: sus sentencias se analizan como
+        # las de una suite y el DEDENT que lo cierra se consume
+        self.avanzar()
+        while self.k not in (DEDENT, EOF):
+            self._sentencia()
+        if self.k == DEDENT:
+            self.avanzar()
 
     def parse_sentencia(self):
-        t = self.actual()["type"]
+        t = self.k
 
-        if t in ("INDENT", "DEDENT"):
+        if t in (INDENT, DEDENT):
             self.indent_error(self.actual())
 
-        if t in ("import", "from"):
+        if t in (KW_IMPORT, KW_FROM):
             self.parse_import()
-        elif t == "class":
+        elif t == KW_CLASS:
             self.parse_class_decl()
-        elif t == "def":
+        elif t == KW_DEF:
             self.parse_func_decl()
-        elif t == "if":
+        elif t == KW_IF:
             self.parse_if_stmt()
-        elif t == "else":
+        elif t == KW_ELSE:
             self.parse_else_stmt_error()
-        elif t == "elif":
-            self.error(self.actual(), ["if"])
-        elif t == "for":
+        elif t == KW_ELIF:
+            self.error(self.actual(), [KW_IF])
+        elif t == KW_FOR:
             self.parse_for_stmt()
-        elif t == "while":
+        elif t == KW_WHILE:
             self.parse_while_stmt()
-        elif t == "return":
+        elif t == KW_RETURN:
             self.parse_return_stmt()
-        elif t == "yield":
+        elif t == KW_YIELD:
             self.parse_yield_stmt()
-        elif t == "print":
+        elif t == KW_PRINT:
             self.parse_print_stmt()
-        elif t == "pass":
+        elif t == KW_PASS:
             self.avanzar()
-            if self.actual()["type"] == "NEWLINE":
-                self.coincidir("NEWLINE")
-        elif t == "break":
+            if self.k == NEWLINE:
+                self.avanzar()
+        elif t == KW_BREAK:
             self.avanzar()
-            if self.actual()["type"] == "NEWLINE":
-                self.coincidir("NEWLINE")
-        elif t == "continue":
+            if self.k == NEWLINE:
+                self.avanzar()
+        elif t == KW_CONTINUE:
             self.avanzar()
-            if self.actual()["type"] == "NEWLINE":
-                self.coincidir("NEWLINE")
+            if self.k == NEWLINE:
+                self.avanzar()
 
-        elif t == "id":
+        elif t == ID:
             # Puede ser asignación o expresión que empieza con id
             self.parse_assign_or_expr_stmt()
 
         elif t in self.EXPR_STARTERS:
             # Expresión-sentencia que NO empieza con id
             self.parse_expresion()
-            if self.actual()["type"] == "NEWLINE":
-                self.coincidir("NEWLINE")
+            if self.k == NEWLINE:
+                self.avanzar()
 
-        elif t == "NEWLINE":
-            self.coincidir("NEWLINE")
+        elif t == NEWLINE:
+            self.avanzar()
         else:
-            esperados = ["import", "class", "def", "if", "for", "while", "print",
-                         "id", "return", "yield", "pass", "break", "continue", "NEWLINE"] + list(self.EXPR_STARTERS)
+            esperados = [KW_IMPORT, KW_CLASS, KW_DEF, KW_IF, KW_FOR, KW_WHILE, KW_PRINT,
+                         ID, KW_RETURN, KW_YIELD, KW_PASS, KW_BREAK, KW_CONTINUE, NEWLINE] + list(self.EXPR_STARTERS_ORDEN)
             self.error(self.actual(), esperados)
 
     # ---------------------------------------------
     # import / from ... import ...
     # ---------------------------------------------
     def parse_import(self):
-        if self.actual()["type"] == "import":
-            self.coincidir("import")
-            self.coincidir("id")
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
-                self.coincidir("id")
+        if self.k == KW_IMPORT:
+            self.avanzar()
+            self.coincidir(ID)
+            while self.k == COMA:
+                self.avanzar()
+                self.coincidir(ID)
         else:
-            self.coincidir("from")
-            self.coincidir("id")
-            self.coincidir("import")
-            self.coincidir("id")
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
-                self.coincidir("id")
-        if self.actual()["type"] == "NEWLINE":
-            self.coincidir("NEWLINE")
+            self.coincidir(KW_FROM)
+            self.coincidir(ID)
+            self.coincidir(KW_IMPORT)
+            self.coincidir(ID)
+            while self.k == COMA:
+                self.avanzar()
+                self.coincidir(ID)
+        if self.k == NEWLINE:
+            self.avanzar()
 
     # ---------------------------------------------
     # class Nombre([Padre]):
     # ---------------------------------------------
     def parse_class_decl(self):
-        self.coincidir("class")
-        self.coincidir("id")
-        if self.actual()["type"] == "tk_par_izq":
-            self.coincidir("tk_par_izq")
-            self.coincidir("id")
-            self.coincidir("tk_par_der")
-        self.coincidir("tk_dos_puntos")
-        self.parse_suite()
+        self.coincidir(KW_CLASS)
+        self.coincidir(ID)
+        if self.k == PAR_IZQ:
+            self.avanzar()
+            self.coincidir(ID)
+            self.coincidir(PAR_DER)
+        self.coincidir(DOS_PUNTOS)
+        self._parse_cuerpo()
 
     # ---------------------------------------------
     # def nombre(params):
     # ---------------------------------------------
     def parse_func_decl(self):
-        self.coincidir("def")
-        self.coincidir("id")
-        self.coincidir("tk_par_izq")
-        if self.actual()["type"] not in ("tk_par_der", "EOF"):
+        self.coincidir(KW_DEF)
+        self.coincidir(ID)
+        self.coincidir(PAR_IZQ)
+        if self.k not in (PAR_DER, EOF):
             self.parse_param()
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
-                if self.actual()["type"] in ("tk_par_der", "EOF"):
+            while self.k == COMA:
+                self.avanzar()
+                if self.k in (PAR_DER, EOF):
                     break
                 self.parse_param()
-        self.coincidir("tk_par_der")
-        self.coincidir("tk_dos_puntos")
-        self.parse_suite()
+        self.coincidir(PAR_DER)
+        self.coincidir(DOS_PUNTOS)
+        self._parse_cuerpo()
 
     def parse_param(self):
-        self.coincidir("id")
-        if self.actual()["type"] == "tk_dos_puntos":
+        self.coincidir(ID)
+        if self.k == DOS_PUNTOS:
             colon_tok = self.actual()
-            self.coincidir("tk_dos_puntos")
-            if self.actual()["type"] not in self.TYPE_STARTERS:
-                self.error_custom(colon_tok["line"], colon_tok["col"], "tk_dos_puntos", "tk_par_der")
+            self.coincidir(DOS_PUNTOS)
+            if self.k not in self.TYPE_STARTERS:
+                self.error_custom(colon_tok.line, colon_tok.col, "tk_dos_puntos", "tk_par_der")
             self.parse_type()
 
     # ---------------------------------------------
     # Tipos (con [] y sin coma final)
     # ---------------------------------------------
     def parse_type(self):
-        t = self.actual()["type"]
-        if t in ("id", "int", "str", "float", "bool"):
+        t = self.k
+        if t in (ID, KW_INT, KW_STR, KW_FLOAT, KW_BOOL):
             self.avanzar()
-            if self.actual()["type"] == "tk_cor_izq":
+            if self.k == COR_IZQ:
                 self._parse_brackets_no_trailing_comma()
-        elif t == "tk_cor_izq":
+        elif t == COR_IZQ:
             self._parse_brackets_no_trailing_comma()
         else:
-            self.error(self.actual(), ["id", "int", "str", "float", "bool", "tk_cor_izq"])
+            self.error(self.actual(), [ID, KW_INT, KW_STR, KW_FLOAT, KW_BOOL, COR_IZQ])
 
     def _parse_brackets_no_trailing_comma(self):
-        self.coincidir("tk_cor_izq")
+        self.coincidir(COR_IZQ)
         self.parse_type()
-        while self.actual()["type"] == "tk_coma":
+        while self.k == COMA:
             coma_tok = self.actual()
-            self.coincidir("tk_coma")
-            if self.actual()["type"] == "tk_cor_der":
-                self.error_custom(coma_tok["line"], max(1, coma_tok["col"] - 1), ",", "]")
+            self.coincidir(COMA)
+            if self.k == COR_DER:
+                self.error_custom(coma_tok.line, max(1, coma_tok.col - 1), ",", "]")
             self.parse_type()
-        self.coincidir("tk_cor_der")
+        self.coincidir(COR_DER)
 
     # ---------------------------------------------
     # suite -> NEWLINE (NEWLINE)* INDENT (sentencia)+ DEDENT
     # ---------------------------------------------
     def parse_suite(self):
-        self.coincidir("NEWLINE")
-        while self.actual()["type"] == "NEWLINE":
-            self.coincidir("NEWLINE")
+        self.coincidir(NEWLINE)
+        while self.k == NEWLINE:
+            self.avanzar()
 
-        if self.actual()["type"] != "INDENT":
+        if self.k != INDENT:
             self.indent_error(self.actual())
-        self.coincidir("INDENT")
+        self.coincidir(INDENT)
 
-        if self.actual()["type"] in ("DEDENT", "EOF"):
+        if self.k in (DEDENT, EOF):
             self.indent_error(self.actual())
 
-        self.parse_sentencia()
-        while self.actual()["type"] not in ("DEDENT", "EOF"):
-            self.parse_sentencia()
+        self._sentencia()
+        while self.k not in (DEDENT, EOF):
+            self._sentencia()
 
-        if self.actual()["type"] == "EOF":
+        if self.k == EOF:
             self.indent_error(self.actual())
-        self.coincidir("DEDENT")
+        self.coincidir(DEDENT)
+
+    def _parse_cuerpo(self):
+        # Suite de una clase o función (ParserEsquema la salta sin analizarla)
+        self.parse_suite()
 
     # ---------------------------------------------
     # if / elif* / else?
     # ---------------------------------------------
     def parse_if_stmt(self):
-        self.coincidir("if")
-        if self.actual()["type"] == "tk_par_izq":
-            self.coincidir("tk_par_izq")
+        self.coincidir(KW_IF)
+        if self.k == PAR_IZQ:
+            self.avanzar()
             self.parse_expresion()
-            self.coincidir("tk_par_der")
+            self.coincidir(PAR_DER)
         else:
             self.parse_expresion()
-        self.coincidir("tk_dos_puntos")
+        self.coincidir(DOS_PUNTOS)
         self.parse_suite()
+        self._parse_ramas_if()
 
-        while self.actual()["type"] == "elif":
-            self.coincidir("elif")
-            if self.actual()["type"] == "tk_par_izq":
-                self.coincidir("tk_par_izq")
+    def _parse_ramas_if(self):
+        while self.k == KW_ELIF:
+            self.avanzar()
+            if self.k == PAR_IZQ:
+                self.avanzar()
                 self.parse_expresion()
-                self.coincidir("tk_par_der")
+                self.coincidir(PAR_DER)
             else:
                 self.parse_expresion()
-            self.coincidir("tk_dos_puntos")
+            self.coincidir(DOS_PUNTOS)
             self.parse_suite()
 
-        if self.actual()["type"] == "else":
-            self.coincidir("else")
-            self.coincidir("tk_dos_puntos")
+        if self.k == KW_ELSE:
+            self.avanzar()
+            self.coincidir(DOS_PUNTOS)
             self.parse_suite()
 
     def parse_else_stmt_error(self):
-        self.error(self.actual(), ["if"])
+        self.error(self.actual(), [KW_IF])
 
     # ---------------------------------------------
     # for target_list in expr : suite
     # ---------------------------------------------
     def parse_for_stmt(self):
-        self.coincidir("for")
+        self.coincidir(KW_FOR)
         self.parse_target_list()
-        self.coincidir("in")
+        self.coincidir(KW_IN)
         self.parse_expresion()
-        self.coincidir("tk_dos_puntos")
+        self.coincidir(DOS_PUNTOS)
         self.parse_suite()
 
     def parse_target_list(self):
-        if self.actual()["type"] == "tk_par_izq":
-            self.coincidir("tk_par_izq")
-            self.coincidir("id")
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
-                self.coincidir("id")
-            self.coincidir("tk_par_der")
+        if self.k == PAR_IZQ:
+            self.avanzar()
+            self.coincidir(ID)
+            while self.k == COMA:
+                self.avanzar()
+                self.coincidir(ID)
+            self.coincidir(PAR_DER)
         else:
-            self.coincidir("id")
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
-                self.coincidir("id")
+            self.coincidir(ID)
+            while self.k == COMA:
+                self.avanzar()
+                self.coincidir(ID)
 
     # ---------------------------------------------
     # while expr : suite
     # ---------------------------------------------
     def parse_while_stmt(self):
-        self.coincidir("while")
+        self.coincidir(KW_WHILE)
         self.parse_expresion()
-        self.coincidir("tk_dos_puntos")
+        self.coincidir(DOS_PUNTOS)
         self.parse_suite()
 
     # ---------------------------------------------
     # return / yield
     # ---------------------------------------------
     def parse_return_stmt(self):
-        self.coincidir("return")
-        if self.actual()["type"] not in ("NEWLINE", "DEDENT", "EOF"):
+        self.coincidir(KW_RETURN)
+        if self.k not in self.END_OF_STMT:
             self.parse_expresion()
-        if self.actual()["type"] == "NEWLINE":
-            self.coincidir("NEWLINE")
+        if self.k == NEWLINE:
+            self.avanzar()
 
     def parse_yield_stmt(self):
-        self.coincidir("yield")
-        if self.actual()["type"] not in ("NEWLINE", "DEDENT", "EOF"):
+        self.coincidir(KW_YIELD)
+        if self.k not in self.END_OF_STMT:
             self.parse_expresion()
-        if self.actual()["type"] == "NEWLINE":
-            self.coincidir("NEWLINE")
+        if self.k == NEWLINE:
+            self.avanzar()
 
     # ---------------------------------------------
     # print(...)
     # ---------------------------------------------
     def parse_print_stmt(self):
-        self.coincidir("print")
+        self.coincidir(KW_PRINT)
         # Reutilizamos la misma lógica que en llamadas normales: (args)
-        self.coincidir("tk_par_izq")
-        if self.actual()["type"] != "tk_par_der":
+        self.coincidir(PAR_IZQ)
+        if self.k != PAR_DER:
             self.parse_expresion()
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
+            while self.k == COMA:
+                self.avanzar()
                 # Permitir coma final opcional: print(a, b,)
-                if self.actual()["type"] == "tk_par_der":
+                if self.k == PAR_DER:
                     break
                 self.parse_expresion()
-        self.coincidir("tk_par_der")
-        if self.actual()["type"] == "NEWLINE":
-            self.coincidir("NEWLINE")
+        self.coincidir(PAR_DER)
+        if self.k == NEWLINE:
+            self.avanzar()
 
     # ---------------------------------------------
     # Asignación o Expresión (que empieza con 'id')
@@ -427,139 +659,226 @@ class Parser:
         first_plain = self._parse_assign_target()
 
         # ¿Anotación de tipo? (solo para id simple)
-        if first_plain and self.actual()["type"] == "tk_dos_puntos":
-            self.coincidir("tk_dos_puntos")
+        if first_plain and self.k == DOS_PUNTOS:
+            self.coincidir(DOS_PUNTOS)
             self.parse_type()
-            if self.actual()["type"] == "tk_asig":
-                self.coincidir("tk_asig")
+            if self.k == ASIG:
+                self.avanzar()
                 self.parse_expr_list()
-            if self.actual()["type"] == "NEWLINE":
-                self.coincidir("NEWLINE")
+            if self.k == NEWLINE:
+                self.avanzar()
             return
 
         # ¿Lista de targets: t1, t2, ... = ... ?
         multiple_targets = False
-        while self.actual()["type"] == "tk_coma":
+        while self.k == COMA:
             multiple_targets = True
-            self.coincidir("tk_coma")
+            self.coincidir(COMA)
             self._parse_assign_target()
 
         # Asignación '=' o aumentada
-        if self.actual()["type"] == "tk_asig":
-            self.coincidir("tk_asig")
+        if self.k == ASIG:
+            self.avanzar()
             self.parse_expr_list()
-        elif self.actual()["type"] in self.AUG_ASSIGN:
+        elif self.k in self.AUG_ASSIGN:
             # t op= expr
             self.avanzar()
             self.parse_expresion()
         else:
             # No era asignación: interpretarlo como EXPRESIÓN que arrancó con un primario.
             # Permite ahora llamadas, más attrs/index y operadores binarios.
-            self._parse_postfijos()
-            while self.actual()["type"] in self.OP_TYPES or self.actual()["type"] in ("and", "or"):
-                self.avanzar()
-                self.parse_termino()
+            self._expresion(tras_operando=True)
 
-        if self.actual()["type"] == "NEWLINE":
-            self.coincidir("NEWLINE")
+        if self.k == NEWLINE:
+            self.avanzar()
 
 
     def parse_expr_list(self):
         self.parse_expresion()
-        while self.actual()["type"] == "tk_coma":
-            self.coincidir("tk_coma")
+        while self.k == COMA:
+            self.avanzar()
             self.parse_expresion()
 
     # ---------------------------------------------
-    # Expresiones (asociación izquierda; precedencia no diferenciada)
+    # Expresiones: precedence climbing iterativo
     # ---------------------------------------------
     def parse_expresion(self):
-        self.parse_termino()
-        while self.actual()["type"] in self.OP_TYPES or self.actual()["type"] in ("and", "or"):
-            self.avanzar()
-            self.parse_termino()
-
-    def parse_termino(self):
-        t = self.actual()["type"]
-
-        # Unarios: +x, -x, ~x, not x
-        if t in ("tk_suma", "tk_resta", "tk_not_bit") or t == "not":
-            self.avanzar()
-            self.parse_termino()
-            # Permitir postfijos tras unario (p. ej., -(a).f()[i])
-            self._parse_postfijos()
-            return
-
-        if t == "id":
-            self.coincidir("id")
-            self._parse_postfijos()
-        elif t in ("tk_entero", "tk_float", "tk_cadena"):
-            self.avanzar()
-            self._parse_postfijos()
-        elif t in ("True", "False", "None"):
-            self.avanzar()
-            self._parse_postfijos()
-        elif t == "tk_par_izq":
-            # (exp)
-            self.coincidir("tk_par_izq")
-            # Permitimos tuplas simples: (a, b, c) como una lista de expresiones
-            self.parse_expresion()
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
-                # Tupla con coma final opcional NO soportada; si quieres, lo ampliamos
-                self.parse_expresion()
-            self.coincidir("tk_par_der")
-            self._parse_postfijos()
-        elif t == "tk_cor_izq":
-            # Lista literal: [a, b, c]
-            self.coincidir("tk_cor_izq")
-            if self.actual()["type"] != "tk_cor_der":
-                self.parse_expresion()
-                while self.actual()["type"] == "tk_coma":
-                    self.coincidir("tk_coma")
-                    if self.actual()["type"] == "tk_cor_der":
-                        break
-                    self.parse_expresion()
-            self.coincidir("tk_cor_der")
-            self._parse_postfijos()
-        else:
-            self.error(self.actual(),
-                       ["id", "tk_entero", "tk_float", "tk_cadena", "True", "False", "None",
-                        "tk_par_izq", "tk_cor_izq", "tk_suma", "tk_resta", "tk_not_bit", "not"])
+        self._expresion()
 
-    # ------------------------- Postfijos -------------------------
-    def _parse_postfijos(self):
+    def _expresion(self, apertura=None, tras_operando=False):
         """
-        Consume repetidamente postfijos tras un primario:
-          - Llamadas:  (args)
-          - Indexación: [expr (',' expr)*]
-          - Atributos: .id
+        Motor de expresiones sin recursión. 'ops' es la pila de operadores
+        pendientes (su nivel de precedencia; los prefijos también) y 'marcos' la
+        de paréntesis/corchetes abiertos, con el largo de 'ops' al abrirse: ni el
+        anidamiento ni las cadenas largas de operadores usan la pila de Python.
+        Un operador binario reduce antes los pendientes que ligan más fuerte (o
+        igual, salvo '**' y comparaciones, ver NO_REDUCE_IGUAL).
+        Con self.arbol (ParserAST) cada reducción y cada cierre crean su nodo.
+          apertura: _LLAMADA o _INDICE para leer solo '(args)' / '[índices]'
+                    (el token actual es el de apertura)
+          tras_operando: el primer primario ya se leyó (sentencia que empieza con id)
         """
-        while True:
-            t = self.actual()["type"]
-            if t == "tk_par_izq":
-                self._parse_call_args()
-            elif t == "tk_cor_izq":
-                self._parse_index_args()
-            elif t == "tk_punto":
-                self.coincidir("tk_punto")
-                self.coincidir("id")
-            else:
-                break
+        tipos, ultimo = self._tipos, self._ultimo
+        binaria, prefija = PRECEDENCIA_BINARIA, PRECEDENCIA_PREFIJA
+        literales = self.LITERALS
+        arbol = self.arbol
+        pila = arbol.pila if arbol is not None else ()  # operandos ya construidos
+        pos, k = self.pos, self.k
+        ops = []
+        marcos = []               # (tipo, largo de ops, marca en pila, token de apertura)
+        operando = tras_operando  # False: se espera un operando
+        base = 0                  # largo de 'ops' al abrir el marco actual
+        if apertura is not None:
+            if pos < ultimo:
+                pos += 1
+                k = tipos[pos]
+            if apertura == _LLAMADA and k == PAR_DER:
+                if arbol is not None:
+                    arbol.envolver(ND.LLAMADA, 1, pos + 1)
+                if pos < ultimo:
+                    pos += 1
+                    k = tipos[pos]
+                self.pos, self.k = pos, k
+                return
+            marcos.append((apertura, 0, len(pila) - 1, pos - 1))
+        try:
+            while True:
+                if not operando:
+                    if k == ID or k in literales:
+                        if arbol is not None:
+                            arbol.hoja(ND.NOMBRE if k == ID else ND.LITERAL, pos, pos + 1)
+                        operando = True
+                    elif k in prefija:
+                        ops.append(prefija[k])
+                    elif k == PAR_IZQ:
+                        # (exp) o tupla (a, b) sin coma final
+                        marcos.append((_GRUPO, len(ops), len(pila), pos))
+                        base = len(ops)
+                    elif k == COR_IZQ:
+                        # Lista literal: [a, b, c] o []
+                        if pos < ultimo:
+                            pos += 1
+                            k = tipos[pos]
+                        if k == COR_DER:
+                            if arbol is not None:
+                                arbol.hoja(ND.LISTA, pos - 1, pos + 1)
+                            operando = True
+                        else:
+                            marcos.append((_LISTA, len(ops), len(pila), pos - 1))
+                            base = len(ops)
+                            continue
+                    else:
+                        self.pos, self.k = pos, k
+                        self.error(self.actual(), self.TERM_EXPECTED)
+                    if pos < ultimo:
+                        pos += 1
+                        k = tipos[pos]
+                    continue
+
+                # Tras un operando: postfijos, operador binario o fin del marco
+                if k == PAR_IZQ:
+                    if pos < ultimo:
+                        pos += 1
+                        k = tipos[pos]
+                    if k != PAR_DER:
+                        marcos.append((_LLAMADA, len(ops), len(pila) - 1, pos - 1))
+                        base = len(ops)
+                        operando = False
+                        continue
+                    if arbol is not None:
+                        arbol.envolver(ND.LLAMADA, 1, pos + 1)
+                elif k == COR_IZQ:
+                    # Indexación: una o varias expresiones separadas por coma (no slices 'a:b')
+                    marcos.append((_INDICE, len(ops), len(pila) - 1, pos))
+                    base = len(ops)
+                    operando = False
+                elif k == PUNTO:
+                    if pos < ultimo:
+                        pos += 1
+                        k = tipos[pos]
+                    if k != ID:
+                        self.pos, self.k = pos, k
+                        self.error(self.actual(), (ID,))
+                    if arbol is not None:
+                        arbol.hoja(ND.NOMBRE, pos, pos + 1)
+                        arbol.envolver(ND.ATRIBUTO, 2)
+                elif k in binaria:
+                    p = binaria[k]
+                    while len(ops) > base and (ops[-1] > p or (ops[-1] == p and p not in NO_REDUCE_IGUAL)):
+                        if arbol is None:
+                            ops.pop()
+                        else:
+                            _reducir(arbol, ops, base)
+                    ops.append(p)
+                    operando = False
+                else:
+                    # Termina la expresión del marco actual: se reduce lo pendiente
+                    if arbol is None:
+                        del ops[base:]
+                    else:
+                        while len(ops) > base:
+                            _reducir(arbol, ops, base)
+                    if not marcos:
+                        break
+                    marco = marcos[-1][0]
+                    if k == COMA:
+                        if pos < ultimo:
+                            pos += 1
+                            k = tipos[pos]
+                        # Coma final permitida en listas y llamadas
+                        if not ((marco == _LISTA and k == COR_DER) or (marco == _LLAMADA and k == PAR_DER)):
+                            operando = False
+                            continue
+                    elif marco == _LLAMADA:
+                        if k != PAR_DER:
+                            self.pos, self.k = pos, k
+                            self.error(self.actual(), (COMA, PAR_DER))
+                    else:
+                        cierre = PAR_DER if marco == _GRUPO else COR_DER
+                        if k != cierre:
+                            self.pos, self.k = pos, k
+                            self.error(self.actual(), (cierre,))
+                    _, _, marca, apertura_tok = marcos.pop()
+                    if arbol is not None:
+                        if marco == _GRUPO:
+                            tipo = ND.GRUPO if len(pila) - marca == 1 else ND.TUPLA
+                            arbol.cerrar(tipo, apertura_tok, pos + 1, marca)
+                        elif marco == _LISTA:
+                            arbol.cerrar(ND.LISTA, apertura_tok, pos + 1, marca)
+                        else:
+                            arbol.envolver(ND.LLAMADA if marco == _LLAMADA else ND.INDICE, len(pila) - marca, pos + 1)
+                    base = marcos[-1][1] if marcos else 0
+                    if apertura is not None and not marcos:
+                        if pos < ultimo:
+                            pos += 1
+                            k = tipos[pos]
+                        break
+                if pos < ultimo:
+                    pos += 1
+                    k = tipos[pos]
+        finally:
+            self.pos, self.k = pos, k
+
     def _parse_assign_target(self):
         """
         Target asignable para LHS: id, id.attr, id[...], encadenado.
         Devuelve True si el target fue un id 'simple' (sin postfijos), útil para 'id: Tipo'.
         """
-        self.coincidir("id")
+        arbol = self.arbol
+        self.coincidir(ID)
+        if arbol is not None:
+            arbol.hoja(ND.NOMBRE, self.pos - 1, self.pos)
         plain = True
         while True:
-            t = self.actual()["type"]
-            if t == "tk_punto":
+            t = self.k
+            if t == PUNTO:
                 plain = False
-                self.coincidir("tk_punto")
-                self.coincidir("id")
-            elif t == "tk_cor_izq":
+                self.coincidir(PUNTO)
+                self.coincidir(ID)
+                if arbol is not None:
+                    arbol.hoja(ND.NOMBRE, self.pos - 1, self.pos)
+                    arbol.envolver(ND.ATRIBUTO, 2)
+            elif t == COR_IZQ:
                 plain = False
                 self._parse_index_args()  # ya definida: [expr (, expr)*]
             else:
@@ -567,39 +886,322 @@ class Parser:
         return plain
 
     def _parse_call_args(self):
-        self.coincidir("tk_par_izq")
-        if self.actual()["type"] != "tk_par_der":
-            self.parse_expresion()
-            while self.actual()["type"] == "tk_coma":
-                self.coincidir("tk_coma")
-                if self.actual()["type"] == "tk_par_der":
-                    break
-                self.parse_expresion()
-            if self.actual()["type"] != "tk_par_der":
-                self.error(self.actual(), ["tk_coma", "tk_par_der"])
-        self.coincidir("tk_par_der")
+        self._expresion(apertura=_LLAMADA)
 
     def _parse_index_args(self):
-        self.coincidir("tk_cor_izq")
-        # Soporte básico: una o varias expresiones separadas por coma (no slices 'a:b')
-        self.parse_expresion()
-        while self.actual()["type"] == "tk_coma":
-            self.coincidir("tk_coma")
-            self.parse_expresion()
-        self.coincidir("tk_cor_der")
+        self._expresion(apertura=_INDICE)
+
+
+# ---------------------------- PARSER DE TABLA ----------------------------
+
+class ParserTabla(Parser):
+    """
+    El mismo análisis dirigido por la tabla LL(1) que gramatica.py genera a
+    partir de la gramática declarativa: una pila explícita de símbolos y una
+    consulta a la tabla por no terminal, sin recursión (el anidamiento no
+    está limitado por la pila de Python). Mensajes idénticos a los de Parser.
+    """
+
+    RECUPERA_ERRORES = False
+
+    def parse_programa(self):
+        try:
+            self._ejecutar(construir_tabla())
+            self.emit(" Análisis sintáctico finalizado correctamente.")
+        except ParseError as e:
+            self.error_sintactico = e
+
+    def _ejecutar(self, tabla):
+        # Rangos de códigos de símbolo (ver gramatica.TablaLL1)
+        base_nt, base_clases, base_acciones = tabla.base_no_terminales, tabla.base_clases, tabla.base_acciones
+        expansiones, clases = tabla.expansiones, tabla.clases
+        fuera = tabla.n_terminales  # tipos desconocidos (p. ej. leídos de un archivo) van a esa columna
+        tipos, ultimo = self._tipos, self._ultimo
+        pos, k = self.pos, self.k
+        pila = [tabla.inicio]
+        sacar, apilar = pila.pop, pila.extend
+        while pila:
+            s = sacar()
+            if s < base_nt:
+                if k != s:
+                    self.pos, self.k = pos, k
+                    self.error(self.actual(), (s,))
+            elif s < base_clases:
+                # No terminal: una consulta a la tabla. La expansión ya viene derivada
+                # por la izquierda hasta el terminal que consume k (si lo consume)
+                resto, consume = expansiones[s - base_nt][k if k < fuera else fuera]
+                apilar(resto)
+                if not consume:
+                    continue
+            elif s < base_acciones:
+                if k not in clases[s - base_clases]:
+                    self.pos, self.k = pos, k
+                    self.error(self.actual(), sorted(clases[s - base_clases]))
+            else:
+                self.pos, self.k = pos, k
+                self._error_tabla(tabla.acciones[s - base_acciones])
+            # Se consumió el token actual
+            if pos < ultimo:
+                pos += 1
+                k = tipos[pos]
+        self.pos, self.k = pos, k
+
+    def _error_tabla(self, accion):
+        nombre = accion[0]
+        if nombre == "esperados":
+            self.error(self.actual(), accion[1])
+        elif nombre == "indentacion":
+            self.indent_error(self.actual())
+        elif nombre == "anotacion":
+            # Tras 'nombre:' en un parámetro no viene un tipo: se señala el ':'
+            dos_puntos = self.tokens[self.pos - 1]
+            self.error_custom(dos_puntos.line, dos_puntos.col, "tk_dos_puntos", "tk_par_der")
+        else:  # "coma_final": 'Tipo[a, ]'
+            coma = self.tokens[self.pos - 1]
+            self.error_custom(coma.line, max(1, coma.col - 1), ",", "]")
+
+
+# ---------------------------- PARSER CON AST ----------------------------
+
+def _con_nodo(tipo, metodo):
+    """Regla 'metodo' que además cierra un nodo 'tipo' con los nodos que construyó."""
+    def regla(self):
+        arbol = self.arbol
+        marca, inicio = len(arbol.pila), self.pos
+        metodo(self)
+        arbol.cerrar(tipo, inicio, self.pos, marca)
+    regla.__name__ = metodo.__name__
+    return regla
+
+
+class ParserAST(Parser):
+    """
+    Mismo análisis que Parser (mismo lenguaje y mensajes) que además construye
+    el árbol sintáctico en una ArenaAST: self.arbol.raiz es el nodo 'programa',
+    o None si hubo error. Parser sin más no construye nada, así que la
+    validación pura no paga el árbol. Los nodos apuntan a tramos de tokens,
+    por eso hace falta el TokenStore completo (no un flujo de iter_tokens).
+    """
+
+    # Sentencias de un solo token: tipo de nodo según la palabra clave
+    _SIMPLES = {KW_PASS: ND.PASS, KW_BREAK: ND.BREAK, KW_CONTINUE: ND.CONTINUE}
+    RECUPERA_ERRORES = False  # una sentencia a medias dejaría nodos abiertos en la arena
+
+    def __init__(self, tokens, silencioso=False):
+        if not isinstance(tokens, TokenStore):
+            raise ValueError("ParserAST necesita un TokenStore (lexer.tokenize), no un flujo de tokens")
+        super().__init__(tokens, silencioso)
+        self.arbol = ArenaAST(tokens)
+
+    def parse_programa(self):
+        Parser.parse_programa(self)
+        if self.error_sintactico is None:
+            self.arbol.terminar(len(self.tokens))
+
+    def parse_sentencia(self):
+        t, marca, inicio = self.k, len(self.arbol.pila), self.pos
+        Parser.parse_sentencia(self)
+        if t in self._SIMPLES:
+            self.arbol.hoja(self._SIMPLES[t], inicio, self.pos)
+        elif t in self.EXPR_STARTERS:
+            self.arbol.cerrar(ND.EXPRESION, inicio, self.pos, marca)
+
+    def parse_assign_or_expr_stmt(self):
+        arbol = self.arbol
+        marca, inicio = len(arbol.pila), self.pos
+        Parser.parse_assign_or_expr_stmt(self)
+        # El tipo de sentencia lo decide el token que sigue a los objetivos:
+        # hijos = objetivos..., valores... (anotacion: nombre, tipo[, valores...])
+        tipo = ND.EXPRESION
+        for h in arbol.pila[marca:]:
+            t = self._tipos[arbol.fines[h]]
+            if t == ASIG:
+                tipo = ND.ASIGNACION
+            elif t in self.AUG_ASSIGN:
+                tipo = ND.AUMENTADA
+            elif t == DOS_PUNTOS:
+                tipo = ND.ANOTACION
+            else:
+                continue
+            break
+        arbol.cerrar(tipo, inicio, self.pos, marca)
+
+    parse_import = _con_nodo(ND.IMPORT, Parser.parse_import)
+    parse_class_decl = _con_nodo(ND.CLASE, Parser.parse_class_decl)
+    parse_func_decl = _con_nodo(ND.FUNCION, Parser.parse_func_decl)
+    parse_param = _con_nodo(ND.PARAMETRO, Parser.parse_param)
+    parse_type = _con_nodo(ND.TIPO, Parser.parse_type)
+    parse_suite = _con_nodo(ND.SUITE, Parser.parse_suite)
+    # if: condición, suite, [condición, suite]... (elif), [suite] (else)
+    parse_if_stmt = _con_nodo(ND.IF, Parser.parse_if_stmt)
+    parse_for_stmt = _con_nodo(ND.FOR, Parser.parse_for_stmt)
+    parse_target_list = _con_nodo(ND.OBJETIVOS, Parser.parse_target_list)
+    parse_while_stmt = _con_nodo(ND.WHILE, Parser.parse_while_stmt)
+    parse_return_stmt = _con_nodo(ND.RETURN, Parser.parse_return_stmt)
+    parse_yield_stmt = _con_nodo(ND.YIELD, Parser.parse_yield_stmt)
+    parse_print_stmt = _con_nodo(ND.PRINT, Parser.parse_print_stmt)
+
+
+# ---------------------------- MODO ESQUEMA ----------------------------
+
+class ParserEsquema(ParserAST):
+    """
+    Modo esquema (outline): de cada clase y función solo se analiza la
+    cabecera; su cuerpo se salta de un golpe con la tabla INDENT -> DEDENT
+    del TokenStore y queda en el árbol como nodo 'cuerpo'. El resto de las
+    sentencias de nivel superior se analiza normalmente, así que el costo
+    depende de las cabeceras y no del tamaño de los cuerpos. Los errores
+    dentro de un cuerpo solo aparecen al expandirlo.
+    """
+
+    def _parse_cuerpo(self):
+        inicio = self.pos
+        self.coincidir(NEWLINE)
+        while self.k == NEWLINE:
+            self.avanzar()
+        if self.k != INDENT:
+            self.indent_error(self.actual())
+        fin = self.tokens.dedent_de(self.pos)
+        if fin is None:  # tokens sin emparejar (p. ej. cargados de archivo): análisis normal
+            self.pos = inicio
+            self.k = self._tipos[inicio]
+            ParserAST.parse_suite(self)
+            return
+        self.pos = fin
+        self.k = DEDENT
+        self.avanzar()
+        self.arbol.hoja(ND.CUERPO, inicio, self.pos)
+
+    def expandir(self, nodo):
+        """
+        Analiza bajo demanda el cuerpo omitido de la clase o función 'nodo' (a
+        su vez en modo esquema) y lo cuelga en el árbol en lugar del nodo
+        'cuerpo'. Devuelve la suite; un error del cuerpo se lanza como ParseError.
+        """
+        arbol = self.arbol
+        cuerpo = nodo.hijos[-1]
+        if cuerpo.kind != ND.CUERPO:
+            return cuerpo  # ya expandido
+        marca = len(arbol.pila)
+        self.pos = cuerpo.inicio
+        self.k = self._tipos[self.pos]
+        try:
+            self.parse_suite()
+            suite = arbol.pila.pop()
+        finally:
+            del arbol.pila[marca:]
+        arbol.reemplazar(nodo.indice, cuerpo.indice, suite)
+        return arbol[suite]
+
+    def esquema(self):
+        """
+        Resumen de las sentencias de nivel superior, para indexar:
+          {"tipo": "import", "linea", "nombres"}
+          {"tipo": "clase", "linea", "nombre", "bases"}
+          {"tipo": "funcion", "linea", "nombre", "parametros"}
+        """
+        raiz = self.arbol.raiz
+        if raiz is None:
+            return []
+        tokens, tipos = self.tokens, self._tipos
+        salida = []
+        for nodo in raiz:
+            linea = tokens.linea(nodo.inicio)
+            if nodo.kind == ND.IMPORT:
+                nombres = [tokens[i].lexeme for i in range(nodo.inicio, nodo.fin) if tipos[i] == ID]
+                salida.append({"tipo": "import", "linea": linea, "nombres": nombres})
+            elif nodo.kind == ND.CLASE:
+                i = nodo.inicio
+                bases = [tokens[i + 3].lexeme] if tipos[i + 2] == PAR_IZQ else []
+                salida.append({"tipo": "clase", "linea": linea, "nombre": nodo.nombre, "bases": bases})
+            elif nodo.kind == ND.FUNCION:
+                parametros = [h.nombre for h in nodo if h.kind == ND.PARAMETRO]
+                salida.append({"tipo": "funcion", "linea": linea, "nombre": nodo.nombre, "parametros": parametros})
+        return salida
+
+
+# Parsers disponibles: mismo lenguaje y mismos mensajes
+PARSERS = {"recursivo": Parser, "tabla": ParserTabla}
+
+
+def _parser(nombre):
+    try:
+        return PARSERS[nombre]
+    except KeyError:
+        raise ValueError(f"parser desconocido: {nombre!r} (opciones: {', '.join(PARSERS)})") from None
+
+
+# ---------------------------- API EN MEMORIA ----------------------------
+
+def analyze(source, motor="manual", parser="recursivo", ast=False, esquema=False, max_errores=1):
+    """
+    Analiza código fuente en memoria: los tokens estructurados de tokenize()
+    pasan directo al Parser (sin formatear, escribir ni releer 'salida_tokens.txt').
+    'source' puede ser el texto o un archivo abierto; con un archivo se lee por
+    bloques con iter_tokens y el Parser consume el flujo sin materializarlo.
+    'motor' elige el escáner del lexer ("manual" o "regex", ver lexer.MOTORES)
+    y 'parser' el analizador ("recursivo" o "tabla", ver PARSERS).
+    Con ast=True se usa ParserAST y el árbol queda en parser.arbol (los tokens
+    se materializan aunque 'source' sea un archivo); solo con el recursivo.
+    esquema=True (implica ast) usa ParserEsquema: cuerpos de clases y funciones
+    sin analizar, ver parser.esquema() y parser.expandir(nodo).
+    Con max_errores > 1 (solo el parser recursivo, sin AST) los errores léxicos
+    y sintácticos no detienen el análisis: quedan todos en parser.errores y en
+    parser.logs, hasta max_errores (los tokens se materializan).
+    Devuelve el Parser ya ejecutado; sus mensajes quedan en parser.logs.
+    """
+    clase = _parser(parser)
+    if max_errores > 1 and (ast or esquema or not clase.RECUPERA_ERRORES):
+        raise ValueError("la recuperación de errores solo la hace el parser recursivo, sin AST")
+    if ast or esquema:
+        if clase is not Parser:
+            raise ValueError(f"el AST solo lo construye el parser recursivo, no {parser!r}")
+        clase = ParserEsquema if esquema else ParserAST
+    if hasattr(source, "read") and (ast or esquema or max_errores > 1):
+        source = source.read()
+    if hasattr(source, "read"):
+        tokens = iter_tokens(source, motor=motor)
+    else:
+        tokens = tokenize(source, motor, max_errores)
+    parser = clase(tokens, max_errores=max_errores) if max_errores > 1 else clase(tokens)
+    parser.parse_programa()
+    return parser
 
 
 # -------------------------------------------------------
 # MAIN
 # -------------------------------------------------------
 if __name__ == "__main__":
-    tokens = cargar_tokens("salida_tokens.txt")
-    parser = Parser(tokens)
+    fuente = None
+    parser = None
     try:
+        if len(sys.argv) > 1:
+            # python analisis_gramatica.py archivo.py [manual|regex] [recursivo|tabla]
+            # -> análisis directo, en streaming
+            # python analisis_gramatica.py salida_tokens.bin -> tokens binarios de lexer.py --binario
+            if es_binario(sys.argv[1]):
+                fuente = cargar_tokens_binario(sys.argv[1])
+                parser = Parser(fuente)
+            else:
+                motor = sys.argv[2] if len(sys.argv) > 2 else "manual"
+                clase = _parser(sys.argv[3] if len(sys.argv) > 3 else "recursivo")
+                fuente = open(sys.argv[1], "r", encoding="utf-8")
+                parser = clase(iter_tokens(fuente, motor=motor))
+        else:
+            # Flujo clásico: tokens exportados previamente por lexer.py
+            parser = Parser(cargar_tokens("salida_tokens.txt"))
         parser.parse_programa()
+    except LexError as e:
+        print(f">>> {e}")
+        sys.exit(1)
     finally:
+        if isinstance(fuente, TokensMapeados):
+            fuente.cerrar()
+        elif fuente is not None:
+            fuente.close()
+        logs = parser.logs if parser is not None else []
         with open("salida parser.txt", "w", encoding="utf-8") as out:
-            if parser.logs:
-                out.write("\n".join(parser.logs) + "\n")
+            if logs:
+                out.write("\n".join(logs) + "\n")
             else:
                 out.write("")
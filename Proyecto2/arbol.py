@@ -0,0 +1,242 @@
+# ---------------------------------------------
+# AST compacto en arena (struct-of-arrays)
+# - Columnas paralelas array('i'): tipo de nodo, primer hijo, siguiente
+#   hermano y tramo de tokens [inicio, fin)
+# - Nodo: vista liviana que solo se crea al leer un nodo concreto
+# - Los nodos se crean de abajo hacia arriba: los nodos terminados esperan en
+#   'pila' hasta que se cierra su padre, que los enlaza como hermanos
+# ---------------------------------------------
+
+from array import array
+
+from lexer import MULTI_OPS, SINGLE_OPS, TIPO_ID, TK
+
+NOMBRES_NODO = (
+    # Sentencias
+    "programa", "import", "clase", "funcion", "parametro", "tipo", "suite",
+    "cuerpo",  # suite de clase/función sin analizar (modo esquema)
+    "if", "for", "objetivos", "while", "return", "yield", "print",
+    "pass", "break", "continue", "asignacion", "aumentada", "anotacion", "expresion",
+    # Expresiones
+    "nombre", "literal", "unaria", "binaria", "comparacion",
+    "grupo", "tupla", "lista", "llamada", "indice", "atributo",
+)
+
+
+class ND:
+    """
+    Enumeración de tipos de nodo (enteros planos, como lexer.TK):
+    ND.IF, ND.BINARIA... NOMBRES_NODO[k] es el nombre del tipo k.
+    """
+
+
+for _k, _nombre in enumerate(NOMBRES_NODO):
+    setattr(ND, _nombre.upper(), _k)
+del _k, _nombre
+
+SIN_NODO = -1
+
+# Los operadores y signos no guardan lexema: se muestran con su símbolo
+_SIMBOLOS = {TIPO_ID[nombre]: op for op, nombre in {**MULTI_OPS, **SINGLE_OPS}.items()}
+_SIN_TEXTO = frozenset({TK.NEWLINE, TK.INDENT, TK.DEDENT, TK.EOF})
+
+
+def _texto(token):
+    return token.lexeme or _SIMBOLOS.get(token.kind) or token.type
+
+
+class Nodo:
+    """Vista de un nodo dentro de un ArenaAST (no copia datos)."""
+    __slots__ = ("_arbol", "_i")
+
+    def __init__(self, arbol, i):
+        self._arbol = arbol
+        self._i = i
+
+    @property
+    def indice(self):
+        return self._i
+
+    @property
+    def kind(self):
+        return self._arbol.tipos[self._i]
+
+    @property
+    def tipo(self):
+        return NOMBRES_NODO[self._arbol.tipos[self._i]]
+
+    @property
+    def inicio(self):
+        """Primer token del nodo (índice en el TokenStore)."""
+        return self._arbol.inicios[self._i]
+
+    @property
+    def fin(self):
+        """Token siguiente al último del nodo."""
+        return self._arbol.fines[self._i]
+
+    @property
+    def nombre(self):
+        """Identificador de un nodo clase, funcion, parametro, nombre o atributo (None en otros)."""
+        arbol = self._arbol
+        tipo = arbol.tipos[self._i]
+        if tipo in (ND.CLASE, ND.FUNCION):
+            return arbol.tokens[self.inicio + 1].lexeme
+        if tipo in (ND.PARAMETRO, ND.NOMBRE):
+            return arbol.tokens[self.inicio].lexeme
+        if tipo == ND.ATRIBUTO:
+            return arbol.tokens[self.fin - 1].lexeme
+        return None
+
+    @property
+    def hijos(self):
+        return list(self)
+
+    def __iter__(self):
+        arbol = self._arbol
+        h = arbol.primer_hijo[self._i]
+        while h != SIN_NODO:
+            yield Nodo(arbol, h)
+            h = arbol.siguiente[h]
+
+    @property
+    def tokens(self):
+        store = self._arbol.tokens
+        return [store[i] for i in range(self.inicio, self.fin)]
+
+    @property
+    def texto(self):
+        """Tokens del nodo separados por espacios (sin NEWLINE/INDENT/DEDENT)."""
+        return " ".join(_texto(t) for t in self.tokens if t.kind not in _SIN_TEXTO)
+
+    @property
+    def operadores(self):
+        """Operadores de un nodo unaria, binaria o comparacion ("-", "**", "and"...)."""
+        arbol = self._arbol
+        store = arbol.tokens
+        if arbol.tipos[self._i] == ND.UNARIA:
+            return [_texto(store[self.inicio])]
+        return [_texto(store[arbol.fines[h]]) for h in self._indices_hijos()[:-1]]
+
+    def _indices_hijos(self):
+        arbol = self._arbol
+        hijos = []
+        h = arbol.primer_hijo[self._i]
+        while h != SIN_NODO:
+            hijos.append(h)
+            h = arbol.siguiente[h]
+        return hijos
+
+    def __eq__(self, otro):
+        return isinstance(otro, Nodo) and otro._arbol is self._arbol and otro._i == self._i
+
+    def __hash__(self):
+        return hash((id(self._arbol), self._i))
+
+    def __repr__(self):
+        return f"Nodo({self.tipo!r}, tokens {self.inicio}:{self.fin})"
+
+
+class ArenaAST:
+    """
+    Árbol sintáctico guardado en columnas paralelas (un nodo = 20 bytes):
+      tipos[i]        -> tipo de nodo (ND.*)
+      primer_hijo[i]  -> índice del primer hijo o SIN_NODO
+      siguiente[i]    -> índice del siguiente hermano o SIN_NODO
+      inicios[i], fines[i] -> tramo de tokens [inicio, fin) en 'tokens'
+    Los hijos tienen índices menores que su padre (orden posterior), salvo los
+    cuerpos analizados después con reemplazar() (modo esquema).
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.tipos = array("i")
+        self.primer_hijo = array("i")
+        self.siguiente = array("i")
+        self.inicios = array("i")
+        self.fines = array("i")
+        self.pila = []          # nodos terminados que todavía no tienen padre
+        self._raiz = SIN_NODO
+
+    def __len__(self):
+        return len(self.tipos)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.tipos)
+        if not 0 <= i < len(self.tipos):
+            raise IndexError("nodo fuera de rango")
+        return Nodo(self, i)
+
+    @property
+    def raiz(self):
+        """Nodo 'programa' (None si el análisis no terminó correctamente)."""
+        return Nodo(self, self._raiz) if self._raiz != SIN_NODO else None
+
+    def recorrer(self, nodo=None):
+        """Nodos en preorden desde 'nodo' (por defecto la raíz), sin recursión."""
+        nodo = self.raiz if nodo is None else nodo
+        if nodo is None:
+            return
+        primer_hijo, siguiente = self.primer_hijo, self.siguiente
+        pendientes = [nodo._i]
+        while pendientes:
+            i = pendientes.pop()
+            yield Nodo(self, i)
+            hijos = []
+            h = primer_hijo[i]
+            while h != SIN_NODO:
+                hijos.append(h)
+                h = siguiente[h]
+            pendientes.extend(reversed(hijos))
+
+    # ---- Construcción (la usa el parser) ----
+
+    def _nuevo(self, tipo, inicio, fin, primer_hijo):
+        i = len(self.tipos)
+        self.tipos.append(tipo)
+        self.primer_hijo.append(primer_hijo)
+        self.siguiente.append(SIN_NODO)
+        self.inicios.append(inicio)
+        self.fines.append(fin)
+        self.pila.append(i)
+        return i
+
+    def hoja(self, tipo, inicio, fin):
+        """Nodo sin hijos."""
+        return self._nuevo(tipo, inicio, fin, SIN_NODO)
+
+    def cerrar(self, tipo, inicio, fin, marca):
+        """Nodo padre de los nodos de la pila desde 'marca', que quedan enlazados como hermanos."""
+        pila = self.pila
+        hijos = pila[marca:]
+        del pila[marca:]
+        if not hijos:
+            return self._nuevo(tipo, inicio, fin, SIN_NODO)
+        siguiente = self.siguiente
+        for a, b in zip(hijos, hijos[1:]):
+            siguiente[a] = b
+        return self._nuevo(tipo, inicio, fin, hijos[0])
+
+    def envolver(self, tipo, n, fin=None):
+        """Nodo padre de los últimos n nodos de la pila (tramo desde el primero hasta fin)."""
+        pila = self.pila
+        if fin is None:
+            fin = self.fines[pila[-1]]
+        return self.cerrar(tipo, self.inicios[pila[-n]], fin, len(pila) - n)
+
+    def reemplazar(self, padre, viejo, nuevo):
+        """Pone el nodo 'nuevo' en el lugar del hijo 'viejo' de 'padre' (índices)."""
+        siguiente = self.siguiente
+        siguiente[nuevo] = siguiente[viejo]
+        if self.primer_hijo[padre] == viejo:
+            self.primer_hijo[padre] = nuevo
+            return
+        h = self.primer_hijo[padre]
+        while siguiente[h] != viejo:
+            h = siguiente[h]
+        siguiente[h] = nuevo
+
+    def terminar(self, fin):
+        """Cierra el nodo 'programa' con todo lo que quedó en la pila."""
+        self._raiz = self.cerrar(ND.PROGRAMA, 0, fin, 0)
@@ -0,0 +1,9 @@
+# ---------------------------------------------
+# Benchmarks del lexer y el parser
+# - generador.py: programas sintéticos válidos, por tamaño y forma (con semilla)
+# - medicion.py: tiempos, tokens/seg, escalado y pico de memoria por fase
+# - python -m benchmarks: reporte JSON (ver __main__.py)
+# ---------------------------------------------
+
+from .generador import FORMAS, generar
+from .medicion import FASES, comparar, escalado, medir, medir_tamano
@@ -0,0 +1,48 @@
+# python -m benchmarks [--tamanos 1000,10000] [--forma mixto|...|todas] [-o reporte.json]
+# (desde la carpeta Proyecto2, para que lexer y analisis_gramatica se importen)
+
+import argparse
+import json
+import sys
+
+from lexer import MOTORES
+
+from .generador import FORMAS
+from .medicion import TAMANOS, comparar, imprimir_medicion, medir
+
+
+def _tamanos(texto):
+    return tuple(int(float(x)) for x in texto.split(","))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m benchmarks",
+                                 description="Mide tokenize, la carga de tokens (texto y binario) y parse_programa sobre programas generados.")
+    ap.add_argument("--tamanos", type=_tamanos, default=TAMANOS,
+                    help="tokens por programa, separados por coma (p. ej. 1e3,1e4,1e5,1e6,1e7)")
+    ap.add_argument("--forma", choices=sorted(FORMAS) + ["todas"], default="mixto", help="forma de los programas")
+    ap.add_argument("--semilla", type=int, default=0, help="semilla del generador")
+    ap.add_argument("--repeticiones", type=int, default=3, help="se toma el mejor tiempo (1 desde 1M tokens)")
+    ap.add_argument("--motor", choices=sorted(MOTORES), default="manual", help="escáner del lexer")
+    ap.add_argument("--sin-memoria", action="store_true", help="no medir el pico de memoria (más rápido)")
+    ap.add_argument("-o", "--salida", default="-", help="reporte JSON (por defecto, stdout)")
+    ap.add_argument("--comparar", default=None, help="reporte anterior: agrega el cociente de tokens/seg")
+    args = ap.parse_args(argv)
+
+    formas = tuple(FORMAS) if args.forma == "todas" else (args.forma,)
+    reporte = medir(args.tamanos, formas, args.semilla, args.repeticiones, not args.sin_memoria, args.motor,
+                    progreso=imprimir_medicion)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            reporte["comparacion"] = {"contra": args.comparar, "cociente_tokens_por_seg": comparar(reporte, json.load(f))}
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida == "-":
+        print(texto)
+    else:
+        with open(args.salida, "w", encoding="utf-8") as out:
+            out.write(texto + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
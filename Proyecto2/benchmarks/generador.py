@@ -0,0 +1,288 @@
+# ---------------------------------------------
+# Generador de programas sintéticos para los benchmarks
+# - generar(tokens, forma, semilla): texto válido para lexer.py y el Parser,
+#   de aproximadamente 'tokens' tokens (se lleva la cuenta de cada pieza)
+# - Formas: ver FORMAS; la misma semilla da siempre el mismo texto, así que
+#   los resultados se pueden comparar entre commits
+# - Solo usa lo que la gramática soporta: nada de print dentro de expresiones
+#   ni palabras reservadas (list, str, object...) como nombres
+# ---------------------------------------------
+
+import random
+
+FORMAS = {
+    "mixto": "de todo un poco: clases, funciones, control de flujo, asignaciones",
+    "anidado": "bloques y paréntesis muy anidados",
+    "expresiones": "expresiones largas de cientos de términos",
+    "cadenas": "muchas cadenas, incluidas triples de decenas de KB",
+    "tabs": "como 'mixto' pero indentado con tabuladores",
+    "compuestos": "asignaciones aumentadas y operadores compuestos (**, //, <<, >>=...)",
+}
+
+_NOMBRES = ("x", "y", "i", "j", "n", "total", "datos", "valor", "nodo", "resultado", "_tmp", "acum", "fila")
+_FUNCIONES = ("f", "calcular", "procesar", "rango", "leer", "math.sqrt", "obj.metodo")
+_ARITMETICOS = ("+", "-", "*", "/", "%", "@")
+_COMPUESTOS = ("**", "//", "<<", ">>", "&", "|", "^")
+_COMPARACIONES = ("==", "!=", "<", ">", "<=", ">=")
+_AUMENTADOS = ("+=", "-=", "*=", "/=", "%=", "//=", "**=", "&=", "|=", "^=", "<<=", ">>=")
+_TIPOS = (("int", 1), ("str", 1), ("float", 1), ("bool", 1), ("Nodo", 1), ("[int]", 3), ("[str, int]", 5))
+_PALABRAS = ("lorem", "ipsum", "dolor", "sit", "amet", "árbol", "token", "índice", "año", "niño")
+
+
+class _Generador:
+    """Emite líneas y cuenta tokens (incluidos NEWLINE, INDENT y DEDENT)."""
+
+    def __init__(self, forma, semilla):
+        if forma not in FORMAS:
+            raise ValueError(f"forma desconocida: {forma!r} (opciones: {', '.join(FORMAS)})")
+        self.r = random.Random(semilla)
+        self.forma = forma
+        self.unidad = "\t" if forma == "tabs" else "    "
+        self.lineas = []
+        self.n = 0
+
+    def linea(self, nivel, texto, n):
+        self.lineas.append(self.unidad * nivel + texto)
+        self.n += n + 1  # + NEWLINE
+
+    # ---- Expresiones: cada función devuelve (texto, tokens) ----
+
+    def atomo(self):
+        r = self.r
+        x = r.random()
+        if x < 0.45:
+            return r.choice(_NOMBRES), 1
+        if x < 0.65:
+            return r.choice(("0", "1", "42", "1_000", "0x1F", "0o17", "0b1010", "7")), 1
+        if x < 0.75:
+            return r.choice(("3.14", "0.5", "1e-3", "2.5E10", "1_0.0_1")), 1
+        if x < 0.9:
+            return self.cadena_corta(), 1
+        if x < 0.95:
+            return r.choice(("True", "False", "None")), 1
+        return r.choice(_NOMBRES) + "." + r.choice(_NOMBRES), 3
+
+    def cadena_corta(self):
+        r = self.r
+        palabras = " ".join(r.choice(_PALABRAS) for _ in range(r.randint(0, 6)))
+        plantilla = r.choice(("'{}'", '"{}"', "r'{}\\d'", 'f"{} {{x}}"', "'con \\'escape\\' {}'", "b'{}'"))
+        return plantilla.format(palabras)
+
+    def cadena_triple(self, kb):
+        r = self.r
+        lineas = []
+        tam = 0
+        while tam < kb * 1024:
+            lin = " ".join(r.choice(_PALABRAS) for _ in range(r.randint(3, 14)))
+            lineas.append(lin)
+            tam += len(lin) + 1
+        comillas = r.choice(('"""', "'''"))
+        return comillas + "\n".join(lineas) + comillas
+
+    def operador(self):
+        r = self.r
+        if self.forma == "compuestos" and r.random() < 0.6:
+            return r.choice(_COMPUESTOS)
+        x = r.random()
+        if x < 0.6:
+            return r.choice(_ARITMETICOS)
+        if x < 0.75:
+            return r.choice(_COMPUESTOS)
+        if x < 0.9:
+            return r.choice(_COMPARACIONES)
+        return r.choice(("and", "or"))
+
+    def expresion(self, prof=3):
+        r = self.r
+        if prof <= 0:
+            return self.atomo()
+        x = r.random()
+        if x < 0.3:
+            return self.atomo()
+        if x < 0.55:
+            a, na = self.expresion(prof - 1)
+            b, nb = self.expresion(prof - 1)
+            return f"{a} {self.operador()} {b}", na + nb + 1
+        if x < 0.65:
+            a, na = self.expresion(prof - 1)
+            return f"({a})", na + 2
+        if x < 0.8:
+            return self.llamada(prof - 1)
+        if x < 0.87:
+            a, na = self.expresion(prof - 1)
+            return f"{r.choice(_NOMBRES)}[{a}]", na + 3
+        if x < 0.94:
+            elems = [self.expresion(prof - 2) for _ in range(r.randint(0, 4))]
+            return "[" + ", ".join(t for t, _ in elems) + "]", 2 + sum(n for _, n in elems) + max(0, len(elems) - 1)
+        a, na = self.expresion(prof - 1)
+        return r.choice(("-", "+", "~")) + a, na + 1
+
+    def llamada(self, prof):
+        r = self.r
+        nombre = r.choice(_FUNCIONES)
+        args = [self.expresion(prof) for _ in range(r.randint(0, 3))]
+        n = nombre.count(".") * 2 + 1 + 2 + sum(n for _, n in args) + max(0, len(args) - 1)
+        return f"{nombre}(" + ", ".join(t for t, _ in args) + ")", n
+
+    def expresion_larga(self, terminos):
+        partes = []
+        n = 0
+        for k in range(terminos):
+            t, nt = self.atomo() if k % 7 else self.llamada(1)
+            if k:
+                partes.append(self.operador())
+                n += 1
+            partes.append(t)
+            n += nt
+        return " ".join(partes), n
+
+    def parentesis(self, prof):
+        a, na = self.expresion(1)
+        return "(" * prof + a + ")" * prof, na + 2 * prof
+
+    def condicion(self):
+        a, na = self.expresion(2)
+        b, nb = self.atomo()
+        texto, n = f"{a} {self.r.choice(_COMPARACIONES)} {b}", na + nb + 1
+        if self.r.random() < 0.2:
+            texto, n = "not " + texto, n + 1
+        # 'if (' lee una condición entre paréntesis: si empieza con '(' va entera
+        if texto.startswith("(") or self.r.random() < 0.2:
+            texto, n = f"({texto})", n + 2
+        return texto, n
+
+    # ---- Sentencias ----
+
+    def simple(self, nivel):
+        r = self.r
+        forma = self.forma
+        x = r.random()
+        if forma == "compuestos" and x < 0.6:
+            e, n = self.expresion(3)
+            self.linea(nivel, f"{r.choice(_NOMBRES)} {r.choice(_AUMENTADOS)} {e}", n + 2)
+        elif forma == "expresiones" and x < 0.7:
+            e, n = self.expresion_larga(r.randint(50, 400))
+            self.linea(nivel, f"{r.choice(_NOMBRES)} = {e}", n + 2)
+        elif forma == "cadenas" and x < 0.6:
+            if r.random() < 0.05:
+                self.linea(nivel, f"{r.choice(_NOMBRES)} = {self.cadena_triple(r.randint(1, 64))}", 3)
+            else:
+                cadenas = [self.cadena_corta() for _ in range(r.randint(1, 8))]
+                self.linea(nivel, f"print({', '.join(cadenas)})", 3 + 2 * len(cadenas) - 1)
+        elif forma == "anidado" and x < 0.3:
+            e, n = self.parentesis(r.randint(20, 200))
+            self.linea(nivel, f"{r.choice(_NOMBRES)} = {e}", n + 2)
+        elif x < 0.35:
+            e, n = self.expresion()
+            self.linea(nivel, f"{r.choice(_NOMBRES)} = {e}", n + 2)
+        elif x < 0.45:
+            e, n = self.expresion()
+            tipo, nt = r.choice(_TIPOS)
+            self.linea(nivel, f"{r.choice(_NOMBRES)}: {tipo} = {e}", n + nt + 3)
+        elif x < 0.52:
+            a, na = self.expresion(1)
+            b, nb = self.expresion(1)
+            self.linea(nivel, f"{r.choice(_NOMBRES)}, {r.choice(_NOMBRES)} = {a}, {b}", na + nb + 5)
+        elif x < 0.62:
+            e, n = self.expresion(2)
+            self.linea(nivel, f"{r.choice(_NOMBRES)} {r.choice(_AUMENTADOS)} {e}", n + 2)
+        elif x < 0.7:
+            e, n = self.expresion(2)
+            self.linea(nivel, f"self.{r.choice(_NOMBRES)}[{r.choice(_NOMBRES)}] = {e}", n + 7)
+        elif x < 0.82:
+            e, n = self.llamada(2)
+            self.linea(nivel, e, n)
+        elif x < 0.9:
+            args = [self.expresion(1) for _ in range(r.randint(0, 3))]
+            self.linea(nivel, "print(" + ", ".join(t for t, _ in args) + ")",
+                       3 + sum(n for _, n in args) + max(0, len(args) - 1))
+        elif x < 0.95:
+            e, n = self.expresion(2)
+            self.linea(nivel, f"return {e}", n + 1)
+        else:
+            self.linea(nivel, r.choice(("pass", "break", "continue")), 1)
+        if forma != "cadenas" and r.random() < 0.03:
+            self.linea(nivel, "# comentario " + r.choice(_PALABRAS), 0)  # el lexer emite su NEWLINE
+
+    def bloque(self, nivel, cabecera, n_cabecera, presupuesto, prof):
+        """Cabecera terminada en ':' y una suite de ~presupuesto tokens."""
+        self.linea(nivel, cabecera, n_cabecera)
+        self.n += 2  # INDENT + DEDENT
+        fin = self.n + max(1, presupuesto)
+        self.simple(nivel + 1)
+        self.sentencias(nivel + 1, fin, prof + 1)
+
+    def compuesta(self, nivel, fin, prof):
+        r = self.r
+        resto = fin - self.n
+        if self.forma == "anidado":
+            sub = max(1, int(resto * r.uniform(0.85, 0.99)))
+        else:
+            sub = r.randint(1, max(1, min(resto, 400)))
+        x = r.random()
+        if x < 0.3:
+            c, n = self.condicion()
+            self.bloque(nivel, f"if {c}:", n + 2, sub, prof)
+            while r.random() < 0.3 and self.n < fin:
+                c, n = self.condicion()
+                self.bloque(nivel, f"elif {c}:", n + 2, sub // 2, prof)
+            if r.random() < 0.4 and self.n < fin:
+                self.bloque(nivel, "else:", 2, sub // 2, prof)
+        elif x < 0.45:
+            c, n = self.condicion()
+            self.bloque(nivel, f"while {c}:", n + 2, sub, prof)
+        elif x < 0.65:
+            e, n = self.llamada(1)
+            if r.random() < 0.5:
+                self.bloque(nivel, f"for {r.choice(_NOMBRES)} in {e}:", n + 4, sub, prof)
+            else:
+                self.bloque(nivel, f"for ({r.choice(_NOMBRES)}, {r.choice(_NOMBRES)}) in {e}:", n + 8, sub, prof)
+        elif x < 0.85:
+            params, n = [], 0
+            for _ in range(r.randint(0, 4)):
+                if r.random() < 0.4:
+                    tipo, nt = r.choice(_TIPOS)
+                    params.append(f"{r.choice(_NOMBRES)}: {tipo}")
+                    n += 2 + nt
+                else:
+                    params.append(r.choice(_NOMBRES))
+                    n += 1
+            n += max(0, len(params) - 1)
+            self.bloque(nivel, f"def {r.choice(_FUNCIONES[:4])}_{r.randint(0, 999)}({', '.join(params)}):",
+                        n + 5, sub, prof)
+        else:
+            if r.random() < 0.5:
+                self.bloque(nivel, f"class Clase{r.randint(0, 999)}(Base):", 6, sub, prof)
+            else:
+                self.bloque(nivel, f"class Clase{r.randint(0, 999)}:", 3, sub, prof)
+
+    def sentencias(self, nivel, fin, prof):
+        r = self.r
+        limite = 60 if self.forma == "anidado" else 6
+        while self.n < fin:
+            if prof < limite and r.random() < (0.7 if self.forma == "anidado" else 0.25):
+                self.compuesta(nivel, fin, prof)
+            else:
+                self.simple(nivel)
+
+    def programa(self, tokens):
+        r = self.r
+        for _ in range(r.randint(1, 4)):
+            modulo = r.choice(("math", "os", "sys", "json", "itertools"))
+            if r.random() < 0.5:
+                self.linea(0, f"import {modulo}", 2)
+            else:
+                self.linea(0, f"from {modulo} import {r.choice(_NOMBRES)}, {r.choice(_NOMBRES)}", 6)
+        self.sentencias(0, tokens - 1, 0)
+        self.n += 1  # EOF
+        return "\n".join(self.lineas) + "\n"
+
+
+def generar(tokens, forma="mixto", semilla=0):
+    """
+    Programa sintácticamente válido de unos 'tokens' tokens (se pasa por poco
+    al cerrar la última sentencia). Devuelve (texto, tokens estimados).
+    """
+    gen = _Generador(forma, semilla)
+    texto = gen.programa(tokens)
+    return texto, gen.n
@@ -0,0 +1,193 @@
+# ---------------------------------------------
+# Medición de rendimiento por fases
+# - Por cada tamaño genera un programa (generador.generar, con semilla) y
+#   mide por separado lexer.tokenize, cargar_tokens ('salida_tokens.txt'),
+#   cargar_tokens_binario (formato mmap) y Parser.parse_programa: mejor
+#   tiempo de N repeticiones y tokens/seg
+# - Pico de memoria de cada fase con tracemalloc, en una pasada aparte para
+#   no inflar los tiempos
+# - Escalado: pendiente log-log del tiempo frente a los tokens (1.0 = lineal)
+# - El reporte JSON lleva el commit y la huella del analizador; comparar()
+#   enfrenta dos reportes fase por fase
+# ---------------------------------------------
+
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import lexer
+from analisis_gramatica import Parser, cargar_tokens, cargar_tokens_binario
+from cache_analisis import VERSION
+
+from .generador import generar
+
+FASES = ("tokenize", "cargar_tokens", "cargar_binario", "parse_programa")
+TAMANOS = (1_000, 10_000, 100_000, 1_000_000)
+REPETICIONES_MAX_TOKENS = 1_000_000  # desde este tamaño se mide una sola vez
+
+
+def _mejor_tiempo(funcion, repeticiones):
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        t = time.perf_counter() - t0
+        mejor = t if mejor is None else min(mejor, t)
+    return mejor, resultado
+
+
+def _pico_memoria(funcion):
+    """Bytes asignados en el pico de 'funcion' (sin contar lo que ya estaba vivo)."""
+    tracemalloc.start()
+    try:
+        funcion()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _parsear(tokens):
+    parser = Parser(tokens, silencioso=True)
+    parser.parse_programa()
+    if parser.error_sintactico is not None:
+        raise RuntimeError(f"el programa generado no es válido: {parser.error_sintactico}")
+    return parser
+
+
+def _cargar_binario(ruta):
+    mapeados = cargar_tokens_binario(ruta)
+    mapeados.cerrar()
+
+
+def medir_tamano(tokens, forma="mixto", semilla=0, repeticiones=3, memoria=True, motor="manual"):
+    """Mide las fases (ver FASES) sobre un programa generado de ~'tokens' tokens."""
+    texto, _ = generar(tokens, forma, semilla)
+    if tokens >= REPETICIONES_MAX_TOKENS:
+        repeticiones = 1
+    fd, ruta = tempfile.mkstemp(prefix="bench_tokens_", suffix=".txt")
+    os.close(fd)
+    ruta_bin = ruta[:-len(".txt")] + ".bin"
+    try:
+        t_lex, store = _mejor_tiempo(lambda: lexer.tokenize(texto, motor), repeticiones)
+        lexer.exportar_tokens(store, ruta)
+        lexer.exportar_tokens_binario(store, ruta_bin)
+        t_carga, cargados = _mejor_tiempo(lambda: cargar_tokens(ruta), repeticiones)
+        t_binario, _ = _mejor_tiempo(lambda: _cargar_binario(ruta_bin), repeticiones)
+        t_parse, _ = _mejor_tiempo(lambda: _parsear(store), repeticiones)
+        picos = {}
+        if memoria:
+            picos["tokenize"] = _pico_memoria(lambda: lexer.tokenize(texto, motor))
+            picos["cargar_tokens"] = _pico_memoria(lambda: cargar_tokens(ruta))
+            picos["cargar_binario"] = _pico_memoria(lambda: _cargar_binario(ruta_bin))
+            picos["parse_programa"] = _pico_memoria(lambda: _parsear(store))
+        bytes_binario = os.path.getsize(ruta_bin)
+    finally:
+        os.remove(ruta)
+        if os.path.exists(ruta_bin):
+            os.remove(ruta_bin)
+
+    n = len(store)
+    fases = {}
+    for fase, segundos in zip(FASES, (t_lex, t_carga, t_binario, t_parse)):
+        fases[fase] = {
+            "segundos": round(segundos, 6),
+            "tokens_por_seg": round(n / segundos) if segundos else None,
+            "pico_memoria_bytes": picos.get(fase),
+        }
+    return {
+        "tokens_pedidos": tokens,
+        "tokens": n,
+        # El formato de texto parte los lexemas con saltos de línea (cadenas triples)
+        "tokens_cargados": len(cargados),
+        "bytes_fuente": len(texto.encode("utf-8")),
+        "bytes_tokens_binario": bytes_binario,
+        "repeticiones": repeticiones,
+        "fases": fases,
+    }
+
+
+def escalado(resultados):
+    """
+    Por fase, exponente b de t ~ tokens^b (mínimos cuadrados en log-log):
+    1.0 es lineal; por encima, la fase se degrada con el tamaño.
+    """
+    salida = {}
+    for fase in FASES:
+        puntos = [(math.log(r["tokens"]), math.log(r["fases"][fase]["segundos"]))
+                  for r in resultados if r["fases"][fase]["segundos"]]
+        if len(puntos) < 2:
+            salida[fase] = None
+            continue
+        mx = sum(x for x, _ in puntos) / len(puntos)
+        my = sum(y for _, y in puntos) / len(puntos)
+        sxx = sum((x - mx) ** 2 for x, _ in puntos)
+        salida[fase] = round(sum((x - mx) * (y - my) for x, y in puntos) / sxx, 3) if sxx else None
+    return salida
+
+
+def _commit():
+    try:
+        r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                           cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return r.stdout.strip() or None
+
+
+def medir(tamanos=TAMANOS, formas=("mixto",), semilla=0, repeticiones=3, memoria=True, motor="manual",
+          progreso=None):
+    """Reporte completo: metadatos, mediciones por forma y tamaño, y escalado por forma."""
+    reporte = {
+        "commit": _commit(),
+        "version_analizador": VERSION.hex()[:16],
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "semilla": semilla,
+        "motor": motor,
+        "formas": {},
+    }
+    for forma in formas:
+        resultados = []
+        for tokens in tamanos:
+            r = medir_tamano(tokens, forma, semilla, repeticiones, memoria, motor)
+            resultados.append(r)
+            if progreso is not None:
+                progreso(forma, r)
+        reporte["formas"][forma] = {"mediciones": resultados, "escalado": escalado(resultados)}
+    return reporte
+
+
+def comparar(actual, anterior):
+    """
+    Cociente de tokens/seg (actual / anterior) por forma, tamaño y fase, para
+    las mediciones presentes en ambos reportes: < 1 es una regresión.
+    """
+    salida = {}
+    for forma, datos in actual["formas"].items():
+        previos = {r["tokens_pedidos"]: r for r in anterior.get("formas", {}).get(forma, {}).get("mediciones", [])}
+        for r in datos["mediciones"]:
+            p = previos.get(r["tokens_pedidos"])
+            if p is None:
+                continue
+            for fase in FASES:
+                if fase not in p["fases"]:  # reporte anterior a esa fase
+                    continue
+                nuevo, viejo = r["fases"][fase]["tokens_por_seg"], p["fases"][fase]["tokens_por_seg"]
+                if nuevo and viejo:
+                    salida.setdefault(forma, {}).setdefault(str(r["tokens_pedidos"]), {})[fase] = round(nuevo / viejo, 3)
+    return salida
+
+
+def imprimir_medicion(forma, r, out=sys.stderr):
+    partes = [f"{forma:>12} {r['tokens']:>10} tokens"]
+    for fase in FASES:
+        f = r["fases"][fase]
+        partes.append(f"{fase} {f['tokens_por_seg'] or 0:>10,} tok/s")
+    print("  ".join(partes), file=out)
@@ -0,0 +1,148 @@
+# ---------------------------------------------
+# Caché en disco de resultados de análisis (lexer + parser)
+# - Clave: sha256(versión del analizador + bytes del fuente)
+# - Valor: flujo de tokens compacto (TokenStore.a_bytes) y resultado del
+#   parser (éxito o primer diagnóstico con línea y columna)
+# - SQLite en modo WAL: varios procesos del lote pueden leer y escribir a la vez
+# - Tamaño acotado con desalojo LRU (las entradas usadas hace más tiempo salen primero)
+# ---------------------------------------------
+
+import hashlib
+import marshal
+import os
+import sqlite3
+import sys
+import time
+
+import almacen_tokens
+import analisis_gramatica
+import gramatica
+import lexer
+import posiciones
+from almacen_tokens import TokenStore
+
+LIMITE_BYTES = 256 * 1024 * 1024  # tamaño máximo por defecto de la caché
+_RESOLUCION_LRU = 60.0  # segundos: un acierto solo reescribe 'usado' si es más viejo que esto
+
+
+def _huella_version():
+    """
+    Versión del analizador: hash del código de lexer, parser, gramática,
+    almacén de tokens y posiciones (línea y columna de los diagnósticos), más
+    el formato de serialización. Cualquier cambio en la gramática, en el lexer
+    o en el cálculo de posiciones invalida las entradas anteriores.
+    """
+    h = hashlib.sha256()
+    for modulo in (lexer, analisis_gramatica, gramatica, almacen_tokens, posiciones):
+        with open(modulo.__file__, "rb") as f:
+            h.update(f.read())
+    h.update(f"{marshal.version}:{sys.byteorder}".encode())
+    return h.digest()
+
+
+VERSION = _huella_version()
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    clave    TEXT PRIMARY KEY,
+    tokens   BLOB,
+    status   TEXT NOT NULL,
+    linea    INTEGER,
+    columna  INTEGER,
+    mensaje  TEXT,
+    tam      INTEGER NOT NULL,
+    usado    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entradas_usado ON entradas(usado);
+CREATE TABLE IF NOT EXISTS meta (nombre TEXT PRIMARY KEY, valor INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('total', 0);
+"""
+
+
+class CacheAnalisis:
+    """
+    Caché persistente compartible entre procesos. Cada proceso abre su propia
+    instancia sobre el mismo archivo; SQLite serializa las escrituras.
+    """
+
+    def __init__(self, ruta, limite_bytes=LIMITE_BYTES):
+        self.ruta = ruta
+        self.limite_bytes = limite_bytes
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        # isolation_level=None: las transacciones se abren explícitamente
+        self._db = sqlite3.connect(ruta, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_ESQUEMA)
+
+    @staticmethod
+    def clave(datos):
+        """Clave de contenido para los bytes de un archivo fuente."""
+        return hashlib.sha256(VERSION + datos).hexdigest()
+
+    def obtener(self, clave, con_tokens=False):
+        """
+        Devuelve (resultado, tokens) o None si no está. 'resultado' es un dict
+        con status/line/col/message; 'tokens' es el TokenStore (solo si
+        con_tokens=True y el lexer terminó bien), si no None.
+        """
+        columnas = "status, linea, columna, mensaje, usado" + (", tokens" if con_tokens else "")
+        fila = self._db.execute(f"SELECT {columnas} FROM entradas WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            return None
+        status, linea, columna, mensaje, usado = fila[:5]
+        ahora = time.time()
+        if ahora - usado > _RESOLUCION_LRU:
+            self._db.execute("UPDATE entradas SET usado = ? WHERE clave = ?", (ahora, clave))
+        tokens = None
+        if con_tokens and fila[5] is not None:
+            tokens = TokenStore.desde_bytes(fila[5])
+        resultado = {"status": status, "line": linea, "col": columna, "message": mensaje}
+        return resultado, tokens
+
+    def guardar(self, clave, resultado, tokens=None):
+        """Guarda el resultado (y el TokenStore, si lo hay) y aplica el límite de tamaño."""
+        blob = tokens.a_bytes() if tokens is not None else None
+        tam = len(clave) + (len(blob) if blob is not None else 0) + len(resultado.get("message") or "")
+        db = self._db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            cur = db.execute(
+                "INSERT OR IGNORE INTO entradas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (clave, blob, resultado["status"], resultado.get("line"), resultado.get("col"),
+                 resultado.get("message"), tam, time.time()),
+            )
+            if cur.rowcount:  # otro proceso pudo haberla insertado primero
+                db.execute("UPDATE meta SET valor = valor + ? WHERE nombre = 'total'", (tam,))
+            self._desalojar()
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _desalojar(self):
+        """Borra las entradas menos usadas hasta quedar en el 90% del límite (dentro de la transacción)."""
+        db = self._db
+        total = db.execute("SELECT valor FROM meta WHERE nombre = 'total'").fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        objetivo = total - int(self.limite_bytes * 0.9)
+        liberado = 0
+        claves = []
+        for clave, tam in db.execute("SELECT clave, tam FROM entradas ORDER BY usado"):
+            claves.append((clave,))
+            liberado += tam
+            if liberado >= objetivo:
+                break
+        db.executemany("DELETE FROM entradas WHERE clave = ?", claves)
+        db.execute("UPDATE meta SET valor = valor - ? WHERE nombre = 'total'", (liberado,))
+
+    def tam_total(self):
+        return self._db.execute("SELECT valor FROM meta WHERE nombre = 'total'").fetchone()[0]
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM entradas").fetchone()[0]
+
+    def cerrar(self):
+        self._db.close()
@@ -0,0 +1,458 @@
+# ---------------------------------------------
+# Gramática LL(1) declarativa + generador de tabla - Proyecto Corte 2
+# - GRAMATICA: no terminal -> alternativas (cadenas de símbolos)
+#     MAYUSCULAS  terminal (nombre en lexer.TK) o clase de tokens (CLASES)
+#     minusculas  no terminal
+#     ""          alternativa vacía (se predice con FOLLOW)
+#     [A B] ...   la alternativa se elige solo con esos tokens (anticipación
+#                 explícita, en lugar de FIRST/FOLLOW)
+#     !nombre     error (ver ERRORES)
+# - construir_tabla(): FIRST, FOLLOW, detección de conflictos LL(1) y tabla
+#   de predicción que ejecuta analisis_gramatica.ParserTabla (pila explícita)
+# - Describe el mismo lenguaje y los mismos mensajes que el Parser recursivo:
+#   NEWLINE es una sentencia más (el parser recursivo lo consume como
+#   "NEWLINE opcional" al final de cada sentencia simple, que es equivalente)
+# ---------------------------------------------
+
+import sys
+
+from lexer import NOMBRES_TIPO, TK
+
+GRAMATICA = {
+    "programa": ["sentencias EOF"],
+    "sentencias": ["sentencia sentencias", "[EOF]"],
+    "sentencia": [
+        "[INDENT DEDENT] !indentacion",
+        "[KW_ELSE KW_ELIF] !espera_if",
+        "import_stmt", "class_decl", "func_decl", "if_stmt", "for_stmt", "while_stmt",
+        "return_stmt", "yield_stmt", "print_stmt",
+        "KW_PASS", "KW_BREAK", "KW_CONTINUE",
+        "asig_o_expr",
+        "[INICIO_EXPR] expresion",
+        "NEWLINE",
+    ],
+
+    # import a, b / from a import b, c
+    "import_stmt": ["KW_IMPORT ID ids_resto", "KW_FROM ID KW_IMPORT ID ids_resto"],
+    "ids_resto": ["COMA ID ids_resto", ""],
+
+    # class Nombre([Padre]): suite
+    "class_decl": ["KW_CLASS ID clase_base DOS_PUNTOS suite"],
+    "clase_base": ["PAR_IZQ ID PAR_DER", ""],
+
+    # def nombre(params): suite
+    "func_decl": ["KW_DEF ID PAR_IZQ params PAR_DER DOS_PUNTOS suite"],
+    "params": ["param params_resto", "[PAR_DER EOF]"],
+    "params_resto": ["COMA params_tras_coma", ""],
+    "params_tras_coma": ["param params_resto", "[PAR_DER EOF]"],
+    "param": ["ID anotacion_opt"],
+    "anotacion_opt": ["DOS_PUNTOS tipo_anotado", ""],
+    "tipo_anotado": ["tipo"],
+
+    # Tipos: nombre[...] o [...], sin coma final dentro de los corchetes
+    "tipo": ["NOMBRE_TIPO tipo_corchetes", "corchetes"],
+    "tipo_corchetes": ["corchetes", ""],
+    "corchetes": ["COR_IZQ tipo corchetes_resto COR_DER"],
+    "corchetes_resto": ["COMA tipo_tras_coma corchetes_resto", ""],
+    "tipo_tras_coma": ["[COR_DER] !coma_final", "tipo"],
+
+    # suite -> NEWLINE (NEWLINE)* INDENT (sentencia)+ DEDENT
+    "suite": ["NEWLINE nuevas_lineas indent sentencia_suite cuerpo_resto dedent"],
+    "nuevas_lineas": ["NEWLINE nuevas_lineas", ""],
+    "indent": ["INDENT"],
+    "sentencia_suite": ["[DEDENT EOF] !indentacion", "sentencia"],
+    "cuerpo_resto": ["sentencia cuerpo_resto", "[DEDENT EOF]"],
+    "dedent": ["DEDENT"],
+
+    # if / elif* / else?  (la condición puede ir entre paréntesis)
+    "if_stmt": ["KW_IF condicion DOS_PUNTOS suite elifs else_opt"],
+    "condicion": ["PAR_IZQ expresion PAR_DER", "expresion"],
+    "elifs": ["KW_ELIF condicion DOS_PUNTOS suite elifs", ""],
+    "else_opt": ["KW_ELSE DOS_PUNTOS suite", ""],
+
+    # for target_list in expr: suite / while expr: suite
+    "for_stmt": ["KW_FOR targets_for KW_IN expresion DOS_PUNTOS suite"],
+    "targets_for": ["PAR_IZQ ID ids_resto PAR_DER", "ID ids_resto"],
+    "while_stmt": ["KW_WHILE expresion DOS_PUNTOS suite"],
+
+    # return / yield [expr]
+    "return_stmt": ["KW_RETURN valor_opt"],
+    "yield_stmt": ["KW_YIELD valor_opt"],
+    "valor_opt": ["expresion", "[NEWLINE DEDENT EOF]"],
+
+    # print(args, con coma final opcional)
+    "print_stmt": ["KW_PRINT PAR_IZQ print_args PAR_DER"],
+    "print_args": ["expresion print_resto", ""],
+    "print_resto": ["COMA print_tras_coma", ""],
+    "print_tras_coma": ["expresion print_resto", ""],
+
+    # Asignación (simple, múltiple, anotada, aumentada) o expresión que empieza con id
+    "asig_o_expr": ["ID tras_id"],
+    "tras_id": ["DOS_PUNTOS tipo anotacion_valor", "target_post targets asig_resto"],
+    "anotacion_valor": ["ASIG expr_lista", ""],
+    "target_post": ["PUNTO ID target_post", "indice target_post", ""],
+    "targets": ["COMA ID target_post targets", ""],
+    "asig_resto": ["ASIG expr_lista", "OP_AUMENTADA expresion", "postfijos ops"],
+    "expr_lista": ["expresion expr_lista_resto"],
+    "expr_lista_resto": ["COMA expresion expr_lista_resto", ""],
+
+    # Expresiones: mismo lenguaje que Parser._expresion, en un solo nivel (la
+    # precedencia solo decide cómo se agrupan los operandos, no qué se acepta)
+    "expresion": ["termino ops"],
+    "ops": ["OP_BINARIO termino ops", ""],
+    "termino": [
+        "OP_UNARIO termino postfijos",
+        "ID postfijos",
+        "LITERAL postfijos",
+        "PAR_IZQ expresion tupla_resto PAR_DER postfijos",
+        "COR_IZQ lista_cont COR_DER postfijos",
+    ],
+    "tupla_resto": ["COMA expresion tupla_resto", ""],
+    "lista_cont": ["expresion lista_resto", "[COR_DER]"],
+    "lista_resto": ["COMA lista_tras_coma", ""],
+    "lista_tras_coma": ["expresion lista_resto", "[COR_DER]"],
+
+    # Postfijos: llamadas, indexación y atributos
+    "postfijos": ["llamada postfijos", "indice postfijos", "PUNTO ID postfijos", ""],
+    "llamada": ["PAR_IZQ args PAR_DER"],
+    "args": ["expresion args_resto", "[PAR_DER]"],
+    "args_resto": ["COMA args_tras_coma", "[PAR_DER]"],
+    "args_tras_coma": ["expresion args_resto", "[PAR_DER]"],
+    "indice": ["COR_IZQ expresion indice_resto COR_DER"],
+    "indice_resto": ["COMA expresion indice_resto", ""],
+}
+
+INICIO = "programa"
+
+# Clases de tokens: un símbolo que acepta cualquiera de sus miembros
+CLASES = {
+    "OP_BINARIO": ("SUMA", "RESTA", "MULT", "DIV", "MOD",
+                   "IGUALDAD", "DISTINTO", "MAYOR", "MENOR", "MAYOR_IGUAL", "MENOR_IGUAL",
+                   "POTENCIA", "DIV_ENTERA", "SHIFT_IZQ", "SHIFT_DER",
+                   "AND_BIT", "OR_BIT", "XOR_BIT", "MATMUL", "KW_AND", "KW_OR"),
+    "OP_UNARIO": ("SUMA", "RESTA", "NOT_BIT", "KW_NOT"),
+    "OP_AUMENTADA": ("MAS_IGUAL", "MENOS_IGUAL", "MUL_IGUAL", "DIV_IGUAL", "MOD_IGUAL",
+                     "DIVENT_IGUAL", "POT_IGUAL", "ANDB_IGUAL", "ORB_IGUAL", "XORB_IGUAL",
+                     "SHL_IGUAL", "SHR_IGUAL"),
+    "LITERAL": ("ENTERO", "FLOAT", "CADENA", "KW_TRUE", "KW_FALSE", "KW_NONE"),
+    "NOMBRE_TIPO": ("ID", "KW_INT", "KW_STR", "KW_FLOAT", "KW_BOOL"),
+    # Expresión-sentencia que no empieza con id
+    "INICIO_EXPR": ("ENTERO", "FLOAT", "CADENA", "KW_TRUE", "KW_FALSE", "KW_NONE", "PAR_IZQ", "COR_IZQ"),
+}
+
+# Alternativa elegida cuando el token no tiene entrada en la tabla (como el
+# 'else' del parser recursivo). Sin entrada aquí, la vacía "" si la hay o la
+# única alternativa; si no (o si está en ERRORES), el no terminal reporta su error.
+POR_DEFECTO = {
+    "sentencias": 0, "params": 0, "params_tras_coma": 0, "tipo_tras_coma": 1,
+    "sentencia_suite": 1, "cuerpo_resto": 0, "condicion": 1, "targets_for": 1,
+    "valor_opt": 0, "print_args": 0, "print_tras_coma": 0, "tras_id": 1, "asig_resto": 2,
+    "lista_cont": 0, "lista_tras_coma": 0, "args": 0, "args_tras_coma": 0,
+}
+
+# Conflictos LL(1) aceptados: gana la alternativa escrita primero (el parser
+# recursivo consume con avidez: 'f (x)' es una llamada y no dos sentencias)
+EN_ORDEN = {"condicion", "target_post", "tipo_corchetes", "postfijos"}
+
+# Errores de un no terminal sin alternativa para el token actual, o de una
+# acción !nombre: tokens esperados (mensaje estándar, en este orden) o el
+# nombre de un error especial del parser ("indentacion", "anotacion", "coma_final")
+ERRORES = {
+    "sentencia": ("KW_IMPORT", "KW_CLASS", "KW_DEF", "KW_IF", "KW_FOR", "KW_WHILE", "KW_PRINT",
+                  "ID", "KW_RETURN", "KW_YIELD", "KW_PASS", "KW_BREAK", "KW_CONTINUE", "NEWLINE",
+                  "ENTERO", "FLOAT", "CADENA", "KW_TRUE", "KW_FALSE", "KW_NONE", "PAR_IZQ", "COR_IZQ"),
+    "termino": ("ID", "ENTERO", "FLOAT", "CADENA", "KW_TRUE", "KW_FALSE", "KW_NONE",
+                "PAR_IZQ", "COR_IZQ", "SUMA", "RESTA", "NOT_BIT", "KW_NOT"),
+    "tipo": ("ID", "KW_INT", "KW_STR", "KW_FLOAT", "KW_BOOL", "COR_IZQ"),
+    "args_resto": ("COMA", "PAR_DER"),
+    "tipo_anotado": "anotacion",
+    "indent": "indentacion",
+    "dedent": "indentacion",
+    "!indentacion": "indentacion",
+    "!coma_final": "coma_final",
+    "!espera_if": ("KW_IF",),
+}
+
+ERRORES_ESPECIALES = {"indentacion", "anotacion", "coma_final"}  # implementados en ParserTabla
+
+
+class GramaticaError(Exception):
+    """La gramática no es válida (símbolo sin definir, error sin declarar...)."""
+
+
+class ConflictoLL1(GramaticaError):
+    """Dos alternativas de un no terminal se predicen con el mismo token."""
+
+    def __init__(self, conflictos):
+        self.conflictos = conflictos  # [(no_terminal, token, [alternativas])]
+        lineas = [f"  {nt} con {tok}: {' | '.join(repr(a) for a in alts)}" for nt, tok, alts in conflictos]
+        super().__init__("conflictos LL(1):\n" + "\n".join(lineas))
+
+
+# ---------------------------- GENERADOR ----------------------------
+
+def _terminal(nombre):
+    k = getattr(TK, nombre, None)
+    if not isinstance(k, int):
+        raise GramaticaError(f"terminal desconocido: {nombre}")
+    return k
+
+
+def _separar(alternativa):
+    """'[A B] x Y' -> (frozenset de tipos o None, ['x', 'Y'])."""
+    guarda = None
+    if alternativa.startswith("["):
+        fin = alternativa.index("]")
+        guarda = frozenset(k for nombre in alternativa[1:fin].split() for k in _miembros(nombre))
+        alternativa = alternativa[fin + 1:]
+    return guarda, alternativa.split()
+
+
+def _miembros(nombre):
+    """Tipos de token que acepta un terminal o una clase."""
+    if nombre in CLASES:
+        return frozenset(_terminal(t) for t in CLASES[nombre])
+    return frozenset((_terminal(nombre),))
+
+
+class TablaLL1:
+    """
+    Resultado del generador. Los símbolos se codifican como enteros por rangos,
+    para que el driver los distinga con comparaciones:
+      [0, n_terminales)              terminal (valor de lexer.TK)
+      [base_no_terminales, base_clases)  no terminal
+      [base_clases, base_acciones)   clase de tokens
+      [base_acciones, ...)           error (índice en 'acciones')
+    """
+
+    def __init__(self, gramatica=GRAMATICA, inicio=INICIO, clases=CLASES, por_defecto=POR_DEFECTO,
+                 en_orden=EN_ORDEN, errores=ERRORES):
+        self.gramatica = gramatica
+        self.no_terminales = list(gramatica)
+        self.n_terminales = len(NOMBRES_TIPO)
+        self.base_no_terminales = self.n_terminales
+        self.base_clases = self.base_no_terminales + len(self.no_terminales)
+        self.nombres_clase = list(clases)
+        self.base_acciones = self.base_clases + len(self.nombres_clase)
+        self.clases = [_miembros(nombre) for nombre in self.nombres_clase]
+        self.acciones = []   # ("esperados", (tipos...)) o (nombre_error_especial,)
+        self._codigo_accion = {}
+        self._errores = errores
+
+        self._alternativas = {}  # nt -> [(guarda, símbolos)]
+        for nt, alternativas in gramatica.items():
+            self._alternativas[nt] = [_separar(a) for a in alternativas]
+        self._validar()
+
+        self.anulables, self.primeros = self._calcular_primeros()
+        self.siguientes = self._calcular_siguientes(inicio)
+        self.resueltos = []  # conflictos aceptados por EN_ORDEN
+        self.filas, self.defectos = self._construir(por_defecto, en_orden)
+        self.inicio = self.codigo(inicio)
+        self.expansiones = self._expandir_todo()
+
+    # ---- Símbolos ----
+
+    def codigo(self, simbolo):
+        if simbolo in self.gramatica:
+            return self.base_no_terminales + self.no_terminales.index(simbolo)
+        if simbolo in CLASES:
+            return self.base_clases + self.nombres_clase.index(simbolo)
+        if simbolo.startswith("!"):
+            return self._accion(simbolo)
+        return _terminal(simbolo)
+
+    def _accion(self, clave, esperados=None):
+        """
+        Código de la acción de error declarada en ERRORES[clave]; sin
+        declaración, error estándar con los tipos 'esperados'.
+        """
+        codigo = self._codigo_accion.get(clave)
+        if codigo is None:
+            spec = self._errores.get(clave)
+            if isinstance(spec, str):
+                if spec not in ERRORES_ESPECIALES:
+                    raise GramaticaError(f"error especial desconocido: {spec}")
+                self.acciones.append((spec,))
+            elif spec is not None:
+                self.acciones.append(("esperados", tuple(_terminal(t) for t in spec)))
+            elif esperados is not None:
+                self.acciones.append(("esperados", tuple(esperados)))
+            else:
+                raise GramaticaError(f"error sin declarar en ERRORES: {clave}")
+            codigo = self._codigo_accion[clave] = self.base_acciones + len(self.acciones) - 1
+        return codigo
+
+    def _validar(self):
+        for nt, alternativas in self._alternativas.items():
+            for _guarda, simbolos in alternativas:
+                for s in simbolos:
+                    if s.startswith("!"):
+                        if s not in self._errores:
+                            raise GramaticaError(f"{nt}: error sin declarar en ERRORES: {s}")
+                    elif s[0].islower():
+                        if s not in self.gramatica:
+                            raise GramaticaError(f"{nt}: no terminal sin definir: {s}")
+                    elif s not in CLASES:
+                        _terminal(s)
+
+    # ---- FIRST / FOLLOW ----
+
+    def _primeros_de(self, simbolos, anulables, primeros):
+        """(FIRST, anulable) de una secuencia de símbolos. Un error no deriva nada."""
+        resultado = set()
+        for s in simbolos:
+            if s.startswith("!"):
+                return resultado, False
+            if s in self.gramatica:
+                resultado |= primeros[s]
+                if s not in anulables:
+                    return resultado, False
+            else:
+                resultado |= _miembros(s)
+                return resultado, False
+        return resultado, True
+
+    def _calcular_primeros(self):
+        anulables = set()
+        primeros = {nt: set() for nt in self.gramatica}
+        cambio = True
+        while cambio:
+            cambio = False
+            for nt, alternativas in self._alternativas.items():
+                for guarda, simbolos in alternativas:
+                    prim, anulable = self._primeros_de(simbolos, anulables, primeros)
+                    if guarda is not None:
+                        prim &= guarda  # la alternativa solo deriva lo que empieza por la guarda
+                    if not prim <= primeros[nt]:
+                        primeros[nt] |= prim
+                        cambio = True
+                    if anulable and nt not in anulables:
+                        anulables.add(nt)
+                        cambio = True
+        return anulables, primeros
+
+    def _calcular_siguientes(self, inicio):
+        siguientes = {nt: set() for nt in self.gramatica}
+        cambio = True
+        while cambio:
+            cambio = False
+            for nt, alternativas in self._alternativas.items():
+                for _guarda, simbolos in alternativas:
+                    for i, s in enumerate(simbolos):
+                        if s not in self.gramatica:
+                            continue
+                        prim, anulable = self._primeros_de(simbolos[i + 1:], self.anulables, self.primeros)
+                        nuevos = prim | (siguientes[nt] if anulable else set())
+                        if not nuevos <= siguientes[s]:
+                            siguientes[s] |= nuevos
+                            cambio = True
+        return siguientes
+
+    # ---- Tabla ----
+
+    def _construir(self, por_defecto, en_orden):
+        filas, defectos, conflictos = [], [], []
+        for nt in self.no_terminales:
+            alternativas = self._alternativas[nt]
+            producciones = [tuple(self.codigo(s) for s in reversed(simbolos)) for _g, simbolos in alternativas]
+            prediccion = {}  # tipo -> [índices de alternativa]
+            for i, (guarda, simbolos) in enumerate(alternativas):
+                if guarda is None:
+                    prim, anulable = self._primeros_de(simbolos, self.anulables, self.primeros)
+                    guarda = prim | (self.siguientes[nt] if anulable else set())
+                for k in guarda:
+                    prediccion.setdefault(k, []).append(i)
+            fila = {}
+            for k, indices in sorted(prediccion.items()):
+                if len(indices) > 1:
+                    textos = [self.gramatica[nt][i] for i in indices]
+                    if nt not in en_orden:
+                        conflictos.append((nt, NOMBRES_TIPO[k], textos))
+                        continue
+                    self.resueltos.append((nt, NOMBRES_TIPO[k], textos))
+                fila[k] = producciones[indices[0]]
+
+            i_defecto = por_defecto.get(nt)
+            if i_defecto is None and "" in self.gramatica[nt]:
+                i_defecto = self.gramatica[nt].index("")
+            if i_defecto is None and len(alternativas) == 1 and nt not in self._errores:
+                i_defecto = 0  # el error lo reporta lo que venga dentro (como una llamada parse_*)
+            if i_defecto is not None:
+                defecto = producciones[i_defecto]
+            else:
+                defecto = (self._accion(nt, sorted(prediccion)),)
+            filas.append(fila)
+            defectos.append(defecto)
+        if conflictos:
+            raise ConflictoLL1(conflictos)
+        return filas, defectos
+
+    # ---- Expansión precalculada (para el driver) ----
+
+    def _prediccion(self, i, k):
+        """Producción (invertida) del no terminal i con el token k."""
+        return self.filas[i].get(k, self.defectos[i])
+
+    def _expandir(self, i, k):
+        """
+        Deriva por la izquierda el no terminal i con el token k hasta llegar a
+        un terminal, una clase o un error; todo depende solo de k, así que se
+        precalcula. Devuelve (símbolos a apilar, invertidos; consume k).
+        """
+        pila = list(self._prediccion(i, k))
+        while pila:
+            s = pila[-1]
+            if s < self.base_no_terminales:
+                if s == k:
+                    pila.pop()
+                    return tuple(pila), True
+                break
+            if s < self.base_clases:
+                pila.pop()
+                pila.extend(self._prediccion(s - self.base_no_terminales, k))
+            elif s < self.base_acciones:
+                if k in self.clases[s - self.base_clases]:
+                    pila.pop()
+                    return tuple(pila), True
+                break
+            else:
+                break
+        return tuple(pila), False
+
+    def _expandir_todo(self):
+        """
+        expansiones[i][k] para cada no terminal i y tipo k; la posición
+        n_terminales es la de un tipo desconocido (fuera de la tabla).
+        """
+        fuera = self.n_terminales
+        return [[self._expandir(i, k) for k in range(fuera + 1)] for i in range(len(self.no_terminales))]
+
+    # ---- Informe ----
+
+    def resumen(self, salida=sys.stdout):
+        nombre = NOMBRES_TIPO.__getitem__
+        for nt in self.no_terminales:
+            prim = " ".join(sorted(map(nombre, self.primeros[nt]))) + (" ε" if nt in self.anulables else "")
+            sig = " ".join(sorted(map(nombre, self.siguientes[nt])))
+            print(f"{nt}\n  FIRST:  {prim}\n  FOLLOW: {sig}", file=salida)
+        print(f"\n{len(self.no_terminales)} no terminales, "
+              f"{sum(len(f) for f in self.filas)} entradas en la tabla", file=salida)
+        for nt, tok, alts in self.resueltos:
+            print(f"conflicto resuelto en orden: {nt} con {tok}: {' | '.join(repr(a) for a in alts)}", file=salida)
+
+
+_tabla = None
+
+
+def construir_tabla():
+    """Tabla LL(1) de GRAMATICA (se genera una vez por proceso)."""
+    global _tabla
+    if _tabla is None:
+        _tabla = TablaLL1()
+    return _tabla
+
+
+if __name__ == "__main__":
+    # python gramatica.py  -> FIRST/FOLLOW de cada no terminal y conflictos resueltos
+    construir_tabla().resumen()
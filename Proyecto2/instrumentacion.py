@@ -0,0 +1,202 @@
+# ---------------------------------------------
+# Instrumentación por regla gramatical del Parser
+# - Instrumentacion(parser) envuelve, solo en esa instancia, cada método
+#   parse_* / _parse_* y el motor de expresiones (_expresion): la clase Parser
+#   no cambia, así que sin instrumentar no hay ningún costo
+# - Por regla: llamadas, tokens consumidos (totales y propios), tiempo
+#   acumulado y propio, y profundidad máxima de recursión
+# - Reporte JSON y pilas colapsadas ("a;b;c microsegundos") para flame graphs
+# ---------------------------------------------
+
+import argparse
+import json
+import sys
+import time
+
+from analisis_gramatica import PARSERS, _parser
+from lexer import MOTORES, LexError, tokenize
+
+_MOTOR_EXPRESIONES = "_expresion"
+
+
+def _es_regla(nombre):
+    return nombre.startswith(("parse_", "_parse_")) or nombre == _MOTOR_EXPRESIONES
+
+
+class _Regla:
+    __slots__ = ("llamadas", "tokens", "tokens_propios", "acumulado", "propio", "activas", "profundidad_max")
+
+    def __init__(self):
+        self.llamadas = self.tokens = self.tokens_propios = 0
+        self.acumulado = self.propio = 0.0
+        self.activas = self.profundidad_max = 0
+
+
+class Instrumentacion:
+    """
+    Mide las reglas de un parser mientras está instalada:
+        instr = Instrumentacion(parser)
+        parser.parse_programa()
+        instr.quitar()
+        instr.reporte(); instr.pilas_colapsadas()
+    El tiempo y los tokens acumulados cuentan solo la activación más externa
+    de cada regla (una regla recursiva no se suma dos veces); los propios
+    descuentan lo que consumieron las reglas llamadas desde ella.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self.reglas = {}
+        self.profundidad_max = 0
+        self.tiempo_total = 0.0
+        # Pilas de llamadas como árbol de prefijos: nodo -> (padre, regla)
+        self._nodos = [(None, None)]
+        self._hijo_de = {}
+        self._propio_por_nodo = [0.0]
+        self._pila = []  # marcos [nodo, t_hijos, tokens_hijos]
+        self._instaladas = []
+        self._instalar()
+
+    def _instalar(self):
+        parser = self.parser
+        for nombre in dir(type(parser)):
+            if _es_regla(nombre) and callable(getattr(type(parser), nombre)):
+                self.reglas[nombre] = _Regla()
+                setattr(parser, nombre, self._envolver(nombre, getattr(parser, nombre)))
+                self._instaladas.append(nombre)
+
+    def quitar(self):
+        """Restaura los métodos de la clase (las mediciones se conservan)."""
+        for nombre in self._instaladas:
+            delattr(self.parser, nombre)
+        self._instaladas = []
+
+    def _envolver(self, nombre, metodo):
+        parser = self.parser
+        regla = self.reglas[nombre]
+        pila, nodos, hijo_de, propio_por_nodo = self._pila, self._nodos, self._hijo_de, self._propio_por_nodo
+        reloj = time.perf_counter
+
+        def medida(*args, **kwargs):
+            padre = pila[-1][0] if pila else 0
+            nodo = hijo_de.get((padre, nombre))
+            if nodo is None:
+                nodo = hijo_de[(padre, nombre)] = len(nodos)
+                nodos.append((padre, nombre))
+                propio_por_nodo.append(0.0)
+            marco = [nodo, 0.0, 0]
+            pila.append(marco)
+            if len(pila) > self.profundidad_max:
+                self.profundidad_max = len(pila)
+            regla.activas += 1
+            if regla.activas > regla.profundidad_max:
+                regla.profundidad_max = regla.activas
+            p0 = parser.pos
+            t0 = reloj()
+            try:
+                return metodo(*args, **kwargs)
+            finally:
+                t = reloj() - t0
+                consumidos = parser.pos - p0
+                pila.pop()
+                regla.activas -= 1
+                regla.llamadas += 1
+                propio = t - marco[1]
+                regla.propio += propio
+                regla.tokens_propios += consumidos - marco[2]
+                propio_por_nodo[nodo] += propio
+                if not regla.activas:
+                    regla.acumulado += t
+                    regla.tokens += consumidos
+                if pila:
+                    pila[-1][1] += t
+                    pila[-1][2] += consumidos
+                else:
+                    self.tiempo_total += t
+
+        medida.__name__ = nombre
+        return medida
+
+    # ---- Reportes ----
+
+    def reporte(self):
+        """Diccionario listo para JSON, reglas ordenadas por tiempo propio."""
+        reglas = sorted(((n, r) for n, r in self.reglas.items() if r.llamadas), key=lambda x: -x[1].propio)
+        return {
+            "parser": type(self.parser).__name__,
+            "tiempo_total": round(self.tiempo_total, 6),
+            "profundidad_max": self.profundidad_max,
+            "reglas": {
+                nombre: {
+                    "llamadas": r.llamadas,
+                    "tokens": r.tokens,
+                    "tokens_propios": r.tokens_propios,
+                    "tiempo_acumulado": round(r.acumulado, 6),
+                    "tiempo_propio": round(r.propio, 6),
+                    "profundidad_max": r.profundidad_max,
+                }
+                for nombre, r in reglas
+            },
+        }
+
+    def pilas_colapsadas(self):
+        """Líneas 'regla;regla;... microsegundos' (tiempo propio), formato de flamegraph.pl."""
+        nodos = self._nodos
+        lineas = []
+        for nodo in range(1, len(nodos)):
+            us = round(self._propio_por_nodo[nodo] * 1e6)
+            if us <= 0:
+                continue
+            camino = []
+            n = nodo
+            while n:
+                n, regla = nodos[n]
+                camino.append(regla)
+            lineas.append(";".join(reversed(camino)) + f" {us}")
+        return lineas
+
+    def tabla(self, limite=15):
+        """Resumen legible de las reglas más costosas."""
+        total = self.tiempo_total or 1.0
+        filas = [f"{'regla':<34}{'llamadas':>10}{'tok. prop.':>11}{'propio ms':>11}{'%':>7}{'acum. ms':>10}{'prof.':>7}"]
+        for nombre, r in list(self.reporte()["reglas"].items())[:limite]:
+            filas.append(f"{nombre:<34}{r['llamadas']:>10}{r['tokens_propios']:>11}"
+                         f"{r['tiempo_propio'] * 1000:>11.2f}{100 * r['tiempo_propio'] / total:>7.1f}"
+                         f"{r['tiempo_acumulado'] * 1000:>10.2f}{r['profundidad_max']:>7}")
+        return "\n".join(filas)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Perfil por regla gramatical del parser sobre un archivo.")
+    ap.add_argument("archivo")
+    ap.add_argument("--motor", choices=sorted(MOTORES), default="manual", help="escáner del lexer")
+    ap.add_argument("--parser", choices=sorted(PARSERS), default="recursivo", help="analizador sintáctico")
+    ap.add_argument("-o", "--salida", default=None, help="reporte JSON")
+    ap.add_argument("--pilas", default=None, help="pilas colapsadas para flamegraph.pl")
+    ap.add_argument("--top", type=int, default=15, help="reglas en el resumen de consola")
+    args = ap.parse_args(argv)
+
+    with open(args.archivo, encoding="utf-8") as f:
+        texto = f.read()
+    try:
+        tokens = tokenize(texto, args.motor)
+    except LexError as e:
+        print(f">>> {e}", file=sys.stderr)
+        return 1
+    parser = _parser(args.parser)(tokens, silencioso=True)
+    instr = Instrumentacion(parser)
+    parser.parse_programa()
+    instr.quitar()
+    print(instr.tabla(args.top))
+    print(parser.logs[-1] if parser.logs else "", file=sys.stderr)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as out:
+            json.dump(instr.reporte(), out, ensure_ascii=False, indent=2)
+    if args.pilas:
+        with open(args.pilas, "w", encoding="utf-8") as out:
+            out.write("\n".join(instr.pilas_colapsadas()) + "\n")
+    return 1 if parser.error_sintactico else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
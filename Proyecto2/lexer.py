@@ -6,8 +6,18 @@
 #   * Cadenas simples, triples y con prefijos (r, f, b, combinaciones rf/fr)
 #   * Números: enteros/float (con _), exponenciales, hex/oct/bin (con _)
 #   * Operadores simples, dobles y compuestos (+=, -=, **=, etc.)
+# - Los tokens llevan su offset en el texto; línea y columna se calculan
+#   al pedirlas (posiciones.py)
+# - lex_check: solo valida y cuenta tokens por tipo, sin construirlos
+#   (prefiltro para corpus grandes)
 # ---------------------------------------------
 
+import re
+import sys
+
+from almacen_tokens import TokenStore, escribir_binario
+from posiciones import CursorPosiciones, IndiceLineas
+
 TAB_SIZE = 4  # tabula a múltiplos de 4 columnas
 
 RESERVED = {
@@ -70,10 +80,75 @@ SINGLE_OPS = {
     "~": "tk_not_bit",
 }
 
+# ---------- Tipos de token como enteros pequeños ----------
+# NOMBRES_TIPO[k] es el nombre legado del tipo k (el que aparece en
+# 'salida_tokens.txt' y en los mensajes de error); la columna 'tipos'
+# del TokenStore guarda solo el entero.
+NOMBRES_TIPO = (
+    ("EOF", "NEWLINE", "INDENT", "DEDENT", "id", "tk_entero", "tk_float", "tk_cadena")
+    + tuple(sorted(RESERVED))
+    + tuple(MULTI_OPS.values())
+    + tuple(SINGLE_OPS.values())
+)
+TIPO_ID = {nombre: k for k, nombre in enumerate(NOMBRES_TIPO)}
+
+
+def _nombre_constante(nombre):
+    """tk_par_izq -> PAR_IZQ, id -> ID, palabra reservada 'if' -> KW_IF."""
+    if nombre.startswith("tk_"):
+        return nombre[3:].upper()
+    if nombre in RESERVED:
+        return "KW_" + nombre.upper()
+    return nombre.upper()
+
+
+class TK:
+    """
+    Enumeración compartida de tipos de token (enteros planos, no Enum, para que
+    las comparaciones del parser sean baratas): TK.PAR_IZQ, TK.KW_IF, TK.EOF...
+    """
+
+
+for _k, _nombre in enumerate(NOMBRES_TIPO):
+    setattr(TK, _nombre_constante(_nombre), _k)
+del _k, _nombre
+
+_RESERVED_ID = {palabra: TIPO_ID[palabra] for palabra in RESERVED}
+_MULTI_OPS_ID = {op: TIPO_ID[nombre] for op, nombre in MULTI_OPS.items()}
+_SINGLE_OPS_ID = {op: TIPO_ID[nombre] for op, nombre in SINGLE_OPS.items()}
+_OPS_ID = {**_SINGLE_OPS_ID, **_MULTI_OPS_ID}
+
+
+class LexError(Exception):
+    """Error léxico en (linea, columna). Se lanza en vez de terminar el proceso."""
+
+    def __init__(self, linea, columna):
+        super().__init__(f"Error léxico(linea:{linea},posicion:{columna})")
+        self.linea = linea
+        self.columna = columna
+
 
 def error(linea, columna):
-    print(f">>> Error léxico(linea:{linea},posicion:{columna})")
-    raise SystemExit(1)
+    raise LexError(linea, columna)
+
+
+class _ErrorEnOffset(Exception):
+    """
+    Error léxico en un offset del texto escaneado: los escáneres no llevan
+    línea ni columna, así que quien los llama lo convierte en LexError.
+    """
+
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+def _fallar(offset):
+    raise _ErrorEnOffset(offset)
+
+
+class _TextoIncompleto(Exception):
+    """Un token llega al final del bloque leído y necesita más texto (modo por bloques)."""
 
 
 def es_id_start(ch):
@@ -112,113 +187,92 @@ def es_prefijo_cadena(texto, i):
     return None
 
 
-def leer_cadena(texto, i, col, linea):
-    """Lector original de cadena (sin prefijos), conservado como fallback."""
+# Cuerpo de cada tipo de cadena (sin la comilla de cierre): se salta en C
+# hasta la próxima comilla, '\' o salto de línea; un '\' siempre se lleva el
+# carácter siguiente y una cadena simple no puede cruzar un salto de línea.
+_CUERPO_CADENA = {
+    '"': re.compile(r'[^"\\\n]*(?:\\[\s\S][^"\\\n]*)*'),
+    "'": re.compile(r"[^'\\\n]*(?:\\[\s\S][^'\\\n]*)*"),
+    '"""': re.compile(r'[^"\\]*(?:(?:\\[\s\S]|"(?!""))[^"\\]*)*'),
+    "'''": re.compile(r"[^'\\]*(?:(?:\\[\s\S]|'(?!''))[^'\\]*)*"),
+}
+
+
+def leer_cadena(texto, i, final=True):
+    """
+    Lector de cadena sin prefijo (la comilla está en i). Devuelve (token, i):
+    el token (tipo, lexema, offset) y la posición tras la comilla de cierre.
+    El contenido se toma como una sola rebanada del texto. Con final=False
+    (lectura por bloques) una cadena que llega al fin del texto lanza
+    _TextoIncompleto en lugar de ser un error léxico.
+    """
     n = len(texto)
     quote = texto[i]
-    start_line, start_col = linea, col
-
-    is_triple = i + 2 < n and texto[i + 1] == quote and texto[i + 2] == quote
-    if is_triple:
-        i += 3; col += 3
-        lex = []
-        while i < n:
-            ch = texto[i]
-            if ch == quote and i + 2 < n and texto[i + 1] == quote and texto[i + 2] == quote:
-                i += 3; col += 3
-                contenido = escapar_contenido("".join(lex))
-                return f'<tk_cadena,"{contenido}",{start_line},{start_col}>', i, col, linea
-            if ch == "\n":
-                i += 1; linea += 1; col = 1
-                lex.append("\n"); continue
-            if ch == "\\" and i + 1 < n:
-                lex.append(ch); i += 1; col += 1
-                lex.append(texto[i]); i += 1; col += 1; continue
-            lex.append(ch); i += 1; col += 1
-        error(start_line, start_col)
+    triple = quote * 3
+    if texto.startswith(triple, i):
+        j = i + 3
+        k = _CUERPO_CADENA[triple].match(texto, j).end()
+        if texto.startswith(triple, k):
+            fin = k + 3
+        elif final:
+            _fallar(i)
+        else:
+            raise _TextoIncompleto()
     else:
-        i += 1; col += 1
-        lex = []
-        while i < n and texto[i] != quote:
-            ch = texto[i]
-            if ch == "\n":
-                error(start_line, start_col)
-            if ch == "\\" and i + 1 < n:
-                lex.append(ch); i += 1; col += 1
-                lex.append(texto[i]); i += 1; col += 1; continue
-            lex.append(ch); i += 1; col += 1
-        if i >= n:
-            error(start_line, start_col)
-        i += 1; col += 1
-        contenido = escapar_contenido("".join(lex))
-        return f'<tk_cadena,"{contenido}",{start_line},{start_col}>', i, col, linea
-
-
-def leer_cadena_con_prefijo(texto, i, col, linea):
+        j = i + 1
+        k = _CUERPO_CADENA[quote].match(texto, j).end()
+        if k < n and texto[k] == quote:
+            fin = k + 1
+        elif (k < n and texto[k] == "\n") or final:
+            _fallar(i)
+        else:
+            raise _TextoIncompleto()
+    contenido = escapar_contenido(texto[j:k])
+    return (TK.CADENA, f'"{contenido}"', i), fin
+
+
+def leer_cadena_con_prefijo(texto, i, final=True):
     """
     Igual a leer_cadena, pero acepta prefijos (r/R, f/F, b/B, combinaciones),
     sin interpretar f-strings ni escapes especiales: solo tokeniza.
     """
-    n = len(texto)
-    start_line, start_col = linea, col
-
     pref_info = es_prefijo_cadena(texto, i)
     if pref_info is None:
-        return leer_cadena(texto, i, col, linea)
+        return leer_cadena(texto, i, final)
 
-    j, quote, is_triple = pref_info
+    # El token (y su posición de error) empieza en el prefijo; el resto se lee desde la comilla
+    j, _quote, _is_triple = pref_info
+    try:
+        (tipo, lexema, _), fin = leer_cadena(texto, j, final)
+    except _ErrorEnOffset:
+        _fallar(i)
+    return (tipo, lexema, i), fin
 
-    # Avanza columna e índice por el prefijo hasta la comilla
-    while i < j:
-        i += 1
-        col += 1
-
-    # Ahora i está en la comilla inicial
-    if is_triple:
-        i += 3; col += 3
-        lex = []
-        while i < n:
-            ch = texto[i]
-            if ch == quote and i + 2 < n and texto[i + 1] == quote and texto[i + 2] == quote:
-                i += 3; col += 3
-                contenido = escapar_contenido("".join(lex))
-                return f'<tk_cadena,"{contenido}",{start_line},{start_col}>', i, col, linea
-            if ch == "\n":
-                i += 1; linea += 1; col = 1
-                lex.append("\n"); continue
-            if ch == "\\" and i + 1 < n:
-                lex.append(ch); i += 1; col += 1
-                lex.append(texto[i]); i += 1; col += 1; continue
-            lex.append(ch); i += 1; col += 1
-        error(start_line, start_col)
-    else:
-        i += 1; col += 1
-        lex = []
-        while i < n and texto[i] != quote:
-            ch = texto[i]
-            if ch == "\n":
-                error(start_line, start_col)
-            if ch == "\\" and i + 1 < n:
-                lex.append(ch); i += 1; col += 1
-                lex.append(texto[i]); i += 1; col += 1; continue
-            lex.append(ch); i += 1; col += 1
-        if i >= n:
-            error(start_line, start_col)
-        i += 1; col += 1
-        contenido = escapar_contenido("".join(lex))
-        return f'<tk_cadena,"{contenido}",{start_line},{start_col}>', i, col, linea
-
-
-def leer_numero(texto, i, col, linea):
+
+_ESCAPE = re.compile(r"\\[\s\S]")
+
+
+def _anotar_escapados(texto, desde, hasta, escapados):
+    """
+    Anota en 'escapados' los saltos de línea precedidos de '\\' en la cadena
+    texto[desde:hasta] (siguen en la misma línea lógica, ver posiciones.py).
+    """
+    if texto.find("\\\n", desde, hasta) != -1:
+        for e in _ESCAPE.finditer(texto, desde, hasta):
+            if texto[e.start() + 1] == "\n":
+                escapados.append(e.start() + 1)
+
+
+def leer_numero(texto, i):
     """
     Reconoce:
       - Enteros con guiones bajos: 1_000
       - Flotantes: 3.14, .5, 1., 1e-3, 2_0.5_0e+1 (se eliminan '_')
       - Hex/Oct/Bin: 0xFF, 0o77, 0b1010 (con '_')
-    Devuelve (token, i, col, linea) o None si no hay número en i.
+    Devuelve (token, i) o None si no hay número en i; token es la tupla
+    (tipo, lexema, offset).
     """
     n = len(texto)
-    start_line, start_col = linea, col
     j = i
 
     def consume_digits_underscore(k, base_digits):
@@ -237,7 +291,7 @@ def leer_numero(texto, i, col, linea):
         else:  # b
             j = consume_digits_underscore(j, "01")
         lex = texto[i:j].replace("_", "")
-        return (f"<tk_entero,{lex},{start_line},{start_col}>", j, col + (j - i), linea)
+        return (TK.ENTERO, lex, i), j
 
     # Parte entera (permite guiones bajos)
     has_int = False
@@ -281,33 +335,147 @@ def leer_numero(texto, i, col, linea):
     if j == i:
         return None  # no había número
 
-    if is_float:
-        return (f"<tk_float,{lex},{start_line},{start_col}>", j, col + (j - i), linea)
-    else:
-        return (f"<tk_entero,{lex},{start_line},{start_col}>", j, col + (j - i), linea)
+    tipo = TK.FLOAT if is_float else TK.ENTERO
+    return (tipo, lex, i), j
 
 
 # ---------------------- Tokenizador principal ----------------------
 
-def tokenize(texto):
-    tokens = []
-    i = 0
+_INDENTACION = re.compile(r"[ \t]*")
+_ESPACIOS = re.compile(r"[ \r]*")
+
+TAM_BLOQUE = 1 << 16  # caracteres por lectura en iter_tokens
+
+
+class EstadoLexer:
+    """
+    Estado que el tokenizador arrastra entre bloques de texto. 'tabs' y
+    'escapados' son los offsets que hacen falta para calcular línea y
+    columna después (ver posiciones.py); se anotan en orden creciente.
+    """
+    __slots__ = ("indent_stack", "at_line_start", "tabs", "escapados")
+
+    def __init__(self):
+        self.indent_stack = [0]
+        self.at_line_start = True
+        self.tabs = []
+        self.escapados = []
+
+
+def _medir_indentacion(texto, i, tabs):
+    """
+    Indentación de la línea que empieza en i: devuelve (j, ancho) con j la
+    posición del primer carácter que no es espacio ni tab. Los tabs se
+    anotan en 'tabs' y avanzan hasta el siguiente múltiplo de TAB_SIZE.
+    """
+    j = _INDENTACION.match(texto, i).end()
+    if texto.find("\t", i, j) == -1:
+        return j, j - i
+    ancho = 0
+    for k in range(i, j):
+        if texto[k] == " ":
+            ancho += 1
+        else:
+            tabs.append(k)
+            ancho += TAB_SIZE - (ancho % TAB_SIZE)
+    return j, ancho
+
+
+def _emitir_indent_dedent(indent_stack, actual_indent, inicio_linea, agregar):
+    top = indent_stack[-1]
+    if actual_indent > top:
+        indent_stack.append(actual_indent)
+        agregar(TK.INDENT, "", inicio_linea)
+    elif actual_indent < top:
+        while indent_stack and indent_stack[-1] > actual_indent:
+            indent_stack.pop()
+            agregar(TK.DEDENT, "", inicio_linea)
+
+
+# ---- Despacho por primer carácter ----
+# Cada carácter ASCII se clasifica una sola vez; el bucle consulta su clase
+# con un acceso a diccionario en lugar de probar en orden es_prefijo_cadena,
+# es_id_start y leer_numero. Lo que no está en la tabla (no ASCII o
+# inválido) sigue el camino original: letra Unicode o _token_respaldo.
+
+(_C_ID, _C_PREFIJO, _C_ESPACIO, _C_OPERADOR, _C_SALTO,
+ _C_NUMERO, _C_COMILLA, _C_COMENTARIO, _C_TAB) = range(9)
+
+_PREFIJOS = frozenset("rRfFbB")
+_COMILLAS = frozenset("'\"")
+
+# Resto de un identificador: \w es exactamente '_' o isalnum() (Unicode)
+_PALABRA = re.compile(r"\w*")
+
+
+def _tabla_despacho():
+    tabla = {}
+    for op in _OPS_ID:
+        tabla[op[0]] = _C_OPERADOR
+    for ch in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_":
+        tabla[ch] = _C_PREFIJO if ch in _PREFIJOS else _C_ID
+    for ch in "0123456789.":  # '.5' es un número; '.' solo, un operador
+        tabla[ch] = _C_NUMERO
+    tabla.update({" ": _C_ESPACIO, "\r": _C_ESPACIO, "\t": _C_TAB, "\n": _C_SALTO,
+                  "#": _C_COMENTARIO, "'": _C_COMILLA, '"': _C_COMILLA})
+    return tabla
+
+
+def _trie_operadores(operadores):
+    """
+    Autómata de operadores: nodo = {carácter: [tipo o None, hijos]}. Se
+    avanza mientras haya transición y gana el último operador completo
+    visto, es decir, el más largo ('**=' antes que '**' y que '*').
+    """
+    raiz = {}
+    for op, tipo in operadores.items():
+        hijos = raiz
+        for ch in op[:-1]:
+            hijos = hijos.setdefault(ch, [None, {}])[1]
+        hijos.setdefault(op[-1], [None, {}])[0] = tipo
+    return raiz
+
+
+_DESPACHO = _tabla_despacho()
+_TRIE_OPS = _trie_operadores({op: t for op, t in _OPS_ID.items() if op != "."})
+
+
+def _token_respaldo(texto, i, agregar):
+    """Token en i con los lectores originales; devuelve la posición tras él."""
+    num_res = leer_numero(texto, i)
+    if num_res is not None:
+        tok, i = num_res
+        agregar(*tok)
+        return i
+    ch = texto[i]
+    if ch in SINGLE_OPS:
+        agregar(_SINGLE_OPS_ID[ch], "", i)
+        return i + 1
+    _fallar(i)
+
+
+def _escanear(texto, estado, agregar, final=True, inicio=0, marcar=None):
+    """
+    Núcleo del tokenizador: recorre 'texto' desde 'inicio' emitiendo cada
+    token con agregar(tipo, lexema, offset) y deja en 'estado' la
+    indentación alcanzada y los tabs y saltos escapados vistos. No lleva
+    línea ni columna: se calculan a partir del offset cuando hacen falta.
+    Devuelve la posición donde se detuvo: con final=False puede ser el
+    inicio de una cadena que sigue en el próximo bloque. Un error léxico
+    lanza _ErrorEnOffset. Si se da 'marcar', se llama marcar(i, indent_stack)
+    en cada inicio de línea fuera de cadenas (puntos de control del lexer
+    incremental).
+    """
+    i = inicio
     n = len(texto)
-    linea = 1
-    col = 1
-
-    indent_stack = [0]
-    at_line_start = True
-
-    def emitir_indent_dedent(actual_indent, line_no):
-        top = indent_stack[-1]
-        if actual_indent > top:
-            indent_stack.append(actual_indent)
-            tokens.append(f"<INDENT, ,{line_no},1>")
-        elif actual_indent < top:
-            while indent_stack and indent_stack[-1] > actual_indent:
-                indent_stack.pop()
-                tokens.append(f"<DEDENT, ,{line_no},1>")
+
+    indent_stack = estado.indent_stack
+    at_line_start = estado.at_line_start
+    tabs, escapados = estado.tabs, estado.escapados
+
+    despacho, operadores, palabra = _DESPACHO, _TRIE_OPS, _PALABRA.match
+    prefijos, comillas, reservadas = _PREFIJOS, _COMILLAS, _RESERVED_ID
+    TK_ID, TK_NEWLINE = TK.ID, TK.NEWLINE
 
     while i < n:
         ch = texto[i]
@@ -316,125 +484,488 @@ def tokenize(texto):
         # Inicio de línea: medir indentación
         # -----------------------------------------------------------------
         if at_line_start:
-            actual_indent = 0
-            while i < n and texto[i] in (" ", "\t"):
-                if texto[i] == " ":
-                    i += 1; col += 1; actual_indent += 1
-                else:
-                    i += 1
-                    adv = TAB_SIZE - ((col - 1) % TAB_SIZE)
-                    col += adv; actual_indent += adv
+            inicio_linea = i
+            i, actual_indent = _medir_indentacion(texto, i, tabs)
 
             at_line_start = False  # Ya no estamos al inicio de la línea
 
             if i < n and texto[i] not in ("\n", "#"):
                 # Línea con código real -> emitir INDENT/DEDENT
-                emitir_indent_dedent(actual_indent, linea)
+                _emitir_indent_dedent(indent_stack, actual_indent, inicio_linea, agregar)
             # si es línea en blanco o comentario, no emitir
 
             # Volver al bucle para recargar ch en nueva posición
             continue
         # -----------------------------------------------------------------
 
-        # Espacios sueltos
-        if ch == " " or ch == "\r":
-            i += 1; col += 1
+        clase = despacho.get(ch)
+        if clase is None:
+            # Fuera de la tabla: una letra Unicode abre un identificador;
+            # lo demás (dígitos Unicode, caracteres inválidos) va al respaldo
+            if not es_id_start(ch):
+                i = _token_respaldo(texto, i, agregar)
+                continue
+            clase = _C_ID
+        elif clase == _C_PREFIJO:
+            # r, f, b...: es cadena solo si tras una o dos letras de prefijo viene la comilla
+            k = i + 1
+            if k < n and texto[k] in prefijos:
+                k += 1
+            clase = _C_COMILLA if k < n and texto[k] in comillas else _C_ID
+
+        # Identificadores y palabras reservadas
+        if clase == _C_ID:
+            j = palabra(texto, i + 1).end()
+            lexema = texto[i:j]
+            tipo = reservadas.get(lexema)
+            if tipo is None:
+                agregar(TK_ID, lexema, i)
+            else:
+                agregar(tipo, "", i)
+            i = j
             continue
 
-        # Tab fuera del inicio (ajusta columnas igualmente)
-        if ch == "\t":
+        # Espacios sueltos (una racha de varios se salta de una vez)
+        if clase == _C_ESPACIO:
             i += 1
-            adv = TAB_SIZE - ((col - 1) % TAB_SIZE)
-            col += adv
+            if i < n and (texto[i] == " " or texto[i] == "\r"):
+                i = _ESPACIOS.match(texto, i).end()
+            continue
+
+        # Operadores: el más largo que coincida, recorriendo el trie
+        if clase == _C_OPERADOR:
+            tipo, hijos = operadores[ch]
+            j = fin = i + 1
+            while hijos and j < n:
+                nodo = hijos.get(texto[j])
+                if nodo is None:
+                    break
+                j += 1
+                if nodo[0] is not None:
+                    tipo, fin = nodo[0], j
+                hijos = nodo[1]
+            if tipo is None:
+                _fallar(i)  # '!' sin '='
+            agregar(tipo, "", i)
+            i = fin
             continue
 
         # Salto de línea
-        if ch == "\n":
-            tokens.append(f"<NEWLINE,\\n,{linea},{col}>")
-            i += 1; linea += 1; col = 1
+        if clase == _C_SALTO:
+            agregar(TK_NEWLINE, "\\n", i)
+            i += 1
             at_line_start = True
+            if marcar is not None:
+                marcar(i, indent_stack)
             continue
 
-        # Comentario
-        if ch == "#":
-            while i < n and texto[i] != "\n":
-                i += 1; col += 1
-            continue  # se omite
+        # Números (enteros/float/hex/oct/bin con '_') y '.'
+        if clase == _C_NUMERO:
+            i = _token_respaldo(texto, i, agregar)
+            continue
 
         # Cadenas (con o sin prefijo)
-        pref = es_prefijo_cadena(texto, i)
-        if ch in ('"', "'") or pref is not None:
-            tok, i, col, linea = leer_cadena_con_prefijo(texto, i, col, linea)
-            tokens.append(tok)
+        if clase == _C_COMILLA:
+            try:
+                tok, j = leer_cadena_con_prefijo(texto, i, final)
+            except _TextoIncompleto:
+                break  # se reintenta desde el inicio de la cadena con más texto
+            _anotar_escapados(texto, i, j, escapados)
+            agregar(*tok)
+            i = j
             continue
 
-        # Identificadores y palabras reservadas
-        if es_id_start(ch):
-            start_line, start_col = linea, col
-            j = i
-            while j < n and es_id_part(texto[j]):
-                j += 1
-            lexema = texto[i:j]
-            if lexema in RESERVED:
-                tokens.append(f"<{lexema},{start_line},{start_col}>")
-            else:
-                tokens.append(f"<id,{lexema},{start_line},{start_col}>")
-            col += (j - i); i = j
+        # Comentario: se salta hasta el salto de línea
+        if clase == _C_COMENTARIO:
+            i = texto.find("\n", i)
+            if i == -1:
+                i = n
+            continue  # se omite
+
+        # Tab fuera del inicio (ajusta columnas igualmente)
+        tabs.append(i)
+        i += 1
+
+    estado.at_line_start = at_line_start
+    return i
+
+
+# ------------- Motor alternativo: expresión regular maestra -------------
+# Un único patrón compilado con un grupo con nombre por clase de token; el
+# bucle solo consulta m.lastgroup en vez de probar carácter a carácter
+# es_prefijo_cadena, es_id_start, leer_numero y los cortes de MULTI_OPS.
+# Los casos raros (dígitos Unicode, exponentes sin dígitos, caracteres
+# inválidos) se delegan en _token_respaldo, que usa los lectores originales
+# para producir exactamente la misma secuencia de tokens.
+
+def _alternativas(palabras):
+    """Alternación de literales, las más largas primero ('**=' antes que '**')."""
+    return "|".join(re.escape(p) for p in sorted(palabras, key=lambda p: (-len(p), p)))
+
+
+# Los espacios sueltos se absorben delante de cada token (menos coincidencias)
+_PATRON_MAESTRO = re.compile(
+    r"[ \r]*(?:"
+    r"(?P<nl>\n)"
+    r"|(?P<tab>\t)"
+    r"|(?P<com>\#[^\n]*)"
+    r"""|(?P<cad>[rRfFbB]{0,2}(?:'''|\"\"\"|'|"))"""
+    r"|(?P<kw>(?:" + _alternativas(RESERVED) + r")(?!\w))"
+    r"|(?P<id>[^\W\d]\w*)"
+    r"|(?P<base>0[xX][0-9a-fA-F_]*|0[oO][0-7_]*|0[bB][01_]*)"
+    r"|(?P<num>(?:[0-9][0-9_]*(?:\.[0-9_]*)?|\.[0-9][0-9_]*)(?:[eE][+-]?[0-9_]+)?)"
+    r"|(?P<op>" + _alternativas(_OPS_ID) + "))"
+)
+
+
+def _escanear_regex(texto, estado, agregar, final=True, inicio=0, marcar=None):
+    """
+    Mismo contrato que _escanear (tokens, estado y posición devuelta
+    idénticos), guiado por _PATRON_MAESTRO en lugar de carácter a carácter.
+    """
+    i = inicio
+    n = len(texto)
+    indent_stack = estado.indent_stack
+    at_line_start = estado.at_line_start
+    tabs, escapados = estado.tabs, estado.escapados
+
+    buscar = _PATRON_MAESTRO.match
+    TK_ID, TK_NEWLINE, TK_CADENA = TK.ID, TK.NEWLINE, TK.CADENA
+    TK_ENTERO, TK_FLOAT = TK.ENTERO, TK.FLOAT
+    reservadas, operadores = _RESERVED_ID, _OPS_ID
+
+    while i < n:
+        # Inicio de línea: medir indentación
+        if at_line_start:
+            inicio_linea = i
+            i, actual_indent = _medir_indentacion(texto, i, tabs)
+            at_line_start = False
+            if i < n and texto[i] not in ("\n", "#"):
+                _emitir_indent_dedent(indent_stack, actual_indent, inicio_linea, agregar)
             continue
 
-        # Números (enteros/float/hex/oct/bin con '_')
-        num_res = leer_numero(texto, i, col, linea)
-        if num_res is not None:
-            tok, i, col, linea = num_res
-            tokens.append(tok)
+        m = buscar(texto, i)
+        if m is None:
+            # espacios al final del texto o antes de algo que el patrón no cubre
+            j = _ESPACIOS.match(texto, i).end()
+            if j > i:
+                i = j
+            else:
+                i = _token_respaldo(texto, i, agregar)
             continue
+        grupo = m.lastgroup
+        i = m.start(grupo)
+
+        if grupo == "id":
+            j = m.end()
+            if texto[i] < "\x80" or texto[i].isalpha():
+                agregar(TK_ID, texto[i:j], i)
+                i = j
+            else:
+                # p. ej. '²': \w lo acepta pero no es inicio de identificador
+                i = _token_respaldo(texto, i, agregar)
+        elif grupo == "op":
+            j = m.end()
+            if j < n and texto[i] == "." and texto[j] >= "\x80":
+                # '.' seguido de un dígito Unicode es un float para leer_numero
+                i = _token_respaldo(texto, i, agregar)
+            else:
+                agregar(operadores[texto[i:j]], "", i)
+                i = j
+        elif grupo == "kw":
+            j = m.end()
+            agregar(reservadas[texto[i:j]], "", i)
+            i = j
+        elif grupo == "nl":
+            agregar(TK_NEWLINE, "\\n", i)
+            i += 1
+            at_line_start = True
+            if marcar is not None:
+                marcar(i, indent_stack)
+        elif grupo == "num":
+            j = m.end()
+            if j < n and (texto[j] in "eE" or texto[j] >= "\x80"):
+                # exponente sin dígitos o dígitos Unicode: reglas de leer_numero
+                i = _token_respaldo(texto, i, agregar)
+            else:
+                lexema = texto[i:j]
+                es_float = "." in lexema or "e" in lexema or "E" in lexema
+                agregar(TK_FLOAT if es_float else TK_ENTERO, lexema.replace("_", ""), i)
+                i = j
+        elif grupo == "cad":
+            j = m.end()
+            apertura = texto[j - 3:j] if j - i >= 3 else ""
+            triple = apertura in ('"""', "'''")
+            comilla = apertura if triple else texto[j - 1]
+            k = _CUERPO_CADENA[comilla].match(texto, j).end()
+            if triple:
+                fin = k + 3 if texto.startswith(comilla, k) else -1
+            elif k < n and texto[k] == comilla:
+                fin = k + 1
+            elif k < n and texto[k] == "\n":
+                _fallar(i)
+            else:
+                fin = -1
+            if fin < 0:
+                if not final:
+                    break  # se reintenta desde el inicio de la cadena con más texto
+                _fallar(i)
+            contenido = texto[j:k]
+            agregar(TK_CADENA, f'"{escapar_contenido(contenido)}"', i)
+            # Los saltos con '\' delante no abren línea nueva
+            if "\\" in contenido:
+                _anotar_escapados(texto, j, k, escapados)
+            i = fin
+        elif grupo == "tab":
+            tabs.append(i)
+            i += 1
+        elif grupo == "com":
+            i = m.end()
+        else:  # base
+            j = m.end()
+            agregar(TK_ENTERO, texto[i:j].replace("_", ""), i)
+            i = j
 
-        # Operadores de 3 y 2 caracteres (priorizar el más largo)
-        if i + 2 < n:
-            tri = texto[i:i + 3]
-            if tri in MULTI_OPS:
-                start_line, start_col = linea, col
-                tokens.append(f"<{MULTI_OPS[tri]},{start_line},{start_col}>")
-                i += 3; col += 3
-                continue
+    estado.at_line_start = at_line_start
+    return i
 
-        if i + 1 < n:
-            duo = texto[i:i + 2]
-            if duo in MULTI_OPS:
-                start_line, start_col = linea, col
-                tokens.append(f"<{MULTI_OPS[duo]},{start_line},{start_col}>")
-                i += 2; col += 2
-                continue
 
-        # Operadores de 1 carácter
-        if ch in SINGLE_OPS:
-            start_line, start_col = linea, col
-            tokens.append(f"<{SINGLE_OPS[ch]},{start_line},{start_col}>")
-            i += 1; col += 1
-            continue
+MOTORES = {"manual": _escanear, "regex": _escanear_regex}
+
 
-        # Si nada coincide, error
-        error(linea, col)
+def _motor(nombre):
+    try:
+        return MOTORES[nombre]
+    except KeyError:
+        raise ValueError(
+            f"motor de lexer desconocido: {nombre!r} (opciones: {', '.join(MOTORES)})"
+        ) from None
 
-    # Al finalizar, vaciar indentaciones pendientes
+
+def _cerrar(estado, agregar, fin):
+    """Al finalizar (offset 'fin'), vacía las indentaciones pendientes y emite EOF."""
+    indent_stack = estado.indent_stack
     while len(indent_stack) > 1:
         indent_stack.pop()
-        tokens.append(f"<DEDENT, ,{linea},{col}>")
+        agregar(TK.DEDENT, "", fin)
+
+    agregar(TK.EOF, "", fin)
+
+
+# Apertura de una cadena triple: si no se cierra, el resto del archivo es parte de ella
+_TRIPLE_ABIERTA = re.compile(r"[rRfFbB]{0,2}(?:'''|\"\"\")")
+
+
+def _descartar_linea(texto, offset, estado, tokens):
+    """
+    Recuperación tras un error léxico en 'offset': quita los tokens que ya se
+    habían emitido de su línea lógica y devuelve dónde seguir: la línea
+    siguiente o, si el error abre una cadena triple sin cerrar, el final del
+    texto. Si la línea abría un bloque, su INDENT se quita y se deshace en la
+    pila, como con una línea en blanco; los DEDENT se conservan, porque los
+    bloques que cierra ya salieron de la pila.
+    """
+    tipos = tokens.tipos
+    k = len(tipos)
+    while k and tipos[k - 1] != TK.NEWLINE:
+        k -= 1
+    if k < len(tipos) and tipos[k] == TK.INDENT:
+        estado.indent_stack.pop()
+    else:
+        while k < len(tipos) and tipos[k] == TK.DEDENT:
+            k += 1
+    tokens.recortar(k)
+    estado.at_line_start = True
+    fin = texto.find("\n", offset)
+    if fin == -1 or _TRIPLE_ABIERTA.match(texto, offset):
+        return len(texto)
+    return fin + 1
 
-    tokens.append(f"<EOF, ,{linea},{col}>")
+
+def tokenize(texto, motor="manual", max_errores=1):
+    """
+    Devuelve un TokenStore con los tokens estructurados (tipo, lexema, línea,
+    columna), de modo que el Parser puede consumirlos directamente sin pasar
+    por 'salida_tokens.txt'. 'motor' elige el escáner: "manual" (carácter a
+    carácter) o "regex" (patrón maestro); ambos dan los mismos tokens.
+    Cada token guarda solo su offset en 'texto': línea y columna se resuelven
+    con un IndiceLineas al pedirlas (errores, exportación).
+    Con max_errores > 1 un error léxico no lanza LexError: queda en
+    tokens.errores, su línea se descarta y el escaneo sigue en la siguiente;
+    al llegar a max_errores errores el resto del texto no se escanea.
+    """
+    escanear = _motor(motor)
+    estado = EstadoLexer()
+    posiciones = IndiceLineas(texto, estado.tabs, estado.escapados, TAB_SIZE)
+    tokens = TokenStore(NOMBRES_TIPO, posiciones)
+    i, errores = 0, []
+    while True:
+        try:
+            escanear(texto, estado, tokens.agregar_en, inicio=i)
+            break
+        except _ErrorEnOffset as e:
+            if max_errores <= 1:
+                raise LexError(*posiciones.linea_columna(e.offset)) from None
+            errores.append(e.offset)
+            i = _descartar_linea(texto, e.offset, estado, tokens)
+            if len(errores) >= max_errores:
+                break
+    _cerrar(estado, tokens.agregar_en, len(texto))
+    # Las posiciones se resuelven al final, con todos los saltos escapados ya anotados
+    tokens.errores = [LexError(*posiciones.linea_columna(offset)) for offset in errores]
     return tokens
 
 
+def lex_check(texto, motor="manual"):
+    """
+    Solo validación léxica, para filtrar corpus grandes antes de analizarlos:
+    usa el mismo escáner que tokenize, pero cada token únicamente suma uno a
+    la cuenta de su tipo (sin TokenStore, offsets ni tabla de lexemas, y las
+    posiciones se calculan solo si hay error). Devuelve un dict con:
+      - "valido": False si hubo un error léxico
+      - "error": el LexError (línea y columna) del primer error, o None
+      - "tokens": {nombre del tipo: cantidad}, los mismos que daría tokenize
+        (con error, los vistos hasta él)
+      - "total": cantidad de tokens; "lineas": líneas físicas del texto
+      - "profundidad_max": máxima cantidad de bloques indentados abiertos
+    """
+    escanear = _motor(motor)
+    estado = EstadoLexer()
+    pila = estado.indent_stack
+    cuentas = [0] * len(NOMBRES_TIPO)
+    maximo = [0]
+    TK_INDENT = TK.INDENT
+
+    def agregar(tipo, lexema, offset):
+        cuentas[tipo] += 1
+        if tipo == TK_INDENT and len(pila) > maximo[0]:
+            maximo[0] = len(pila)  # la pila ya incluye el nivel 0
+
+    error = None
+    try:
+        escanear(texto, estado, agregar)
+        _cerrar(estado, agregar, len(texto))
+    except _ErrorEnOffset as e:
+        posiciones = IndiceLineas(texto, estado.tabs, estado.escapados, TAB_SIZE)
+        error = LexError(*posiciones.linea_columna(e.offset))
+    return {
+        "valido": error is None,
+        "error": error,
+        "tokens": {NOMBRES_TIPO[k]: c for k, c in enumerate(cuentas) if c},
+        "total": sum(cuentas),
+        "lineas": texto.count("\n") + (not texto.endswith("\n")) if texto else 0,
+        "profundidad_max": max(maximo[0] - 1, 0),
+    }
+
+
+def iter_tokens(file_obj, tam_bloque=TAM_BLOQUE, motor="manual"):
+    """
+    Modo generador: lee file_obj por bloques y produce tuplas
+    (tipo, lexema, linea, col) a medida que avanza, sin tener nunca el
+    archivo completo ni todos los tokens en memoria. Cada bloque se corta en
+    su último salto de línea; una cadena que cruza el corte se vuelve a
+    escanear junto con el bloque siguiente. 'motor' como en tokenize.
+    """
+    escanear = _motor(motor)
+    estado = EstadoLexer()
+    pendientes = []
+    cursor = CursorPosiciones("", estado.tabs, estado.escapados, TAB_SIZE)
+
+    def agregar(tipo, lexema, offset):
+        pendientes.append((tipo, lexema) + cursor.avanzar(offset))
+
+    def escanear_bloque(texto, final):
+        # Los offsets son relativos a cada bloque: el cursor sigue desde
+        # la línea y columna donde se detuvo el bloque anterior
+        nonlocal cursor
+        estado.tabs.clear()
+        estado.escapados.clear()
+        cursor = CursorPosiciones(texto, estado.tabs, estado.escapados, TAB_SIZE, cursor.linea, cursor.col)
+        try:
+            i = escanear(texto, estado, agregar, final=final)
+        except _ErrorEnOffset as e:
+            raise LexError(*cursor.avanzar(e.offset)) from None
+        cursor.avanzar(i)
+        return i
+
+    resto = ""
+    while True:
+        # Si quedó una cadena larga pendiente se lee al menos otro tanto (sin costo cuadrático)
+        bloque = file_obj.read(max(tam_bloque, len(resto)))
+        if not bloque:
+            break
+        texto = resto + bloque
+        corte = texto.rfind("\n") + 1
+        if corte == 0:
+            resto = texto  # línea más larga que el bloque: seguir leyendo
+            continue
+        i = escanear_bloque(texto[:corte], final=False)
+        resto = texto[i:]
+        yield from pendientes
+        pendientes.clear()
+
+    escanear_bloque(resto, final=True)
+    _cerrar(estado, agregar, len(resto))
+    yield from pendientes
+
+
+# ------------------ Exportación al formato de texto ------------------
+
+def formatear_token(tok):
+    """
+    Convierte un token (vista de TokenStore) al formato de texto de 'salida_tokens.txt':
+      <TIPO,LEXEMA,LINEA,COL>  o  <TIPO,LINEA,COL> (sin lexema)
+    Solo se usa para la exportación de depuración.
+    """
+    return formatear_tupla(tok.kind, tok.lexeme, tok.line, tok.col)
+
+
+def formatear_tupla(tipo, lexema, linea, col):
+    """Igual que formatear_token, para las tuplas (tipo, lexema, linea, col) de iter_tokens."""
+    nombre = NOMBRES_TIPO[tipo]
+    if tipo in (TK.INDENT, TK.DEDENT, TK.EOF):
+        return f"<{nombre}, ,{linea},{col}>"
+    if lexema:
+        return f"<{nombre},{lexema},{linea},{col}>"
+    return f"<{nombre},{linea},{col}>"
+
+
+def exportar_tokens(tokens, nombre_archivo="salida_tokens.txt"):
+    """
+    Escribe los tokens en el formato de texto (exportación opcional de depuración).
+    Acepta un TokenStore o cualquier iterable de tuplas, p. ej. iter_tokens(f).
+    """
+    filas = tokens.filas() if hasattr(tokens, "filas") else tokens
+    with open(nombre_archivo, "w", encoding="utf-8") as out:
+        for t in filas:
+            out.write(formatear_tupla(*t) + "\n")
+
+
+def exportar_tokens_binario(tokens, nombre_archivo="salida_tokens.bin"):
+    """
+    Escribe los tokens en el formato binario de almacen_tokens (cabecera,
+    tabla de lexemas sin repetir y registros de 8 bytes), que el parser abre
+    con mmap (analisis_gramatica.cargar_tokens_binario). Acepta lo mismo que
+    exportar_tokens; un iterador se escribe por bloques.
+    """
+    return escribir_binario(tokens, nombre_archivo, NOMBRES_TIPO)
+
+
 def main():
+    # python lexer.py [--binario]: con --binario se escribe 'salida_tokens.bin'
+    binario = "--binario" in sys.argv[1:]
+    salida = "salida_tokens.bin" if binario else "salida_tokens.txt"
     infile = input("Ingrese el nombre del archivo de entrada (.py): ").strip()
     with open(infile, "r", encoding="utf-8") as f:
-        src = f.read()
-    tokens = tokenize(src)
-    #print("\n".join(tokens))
-    with open("salida_tokens.txt", "w", encoding="utf-8") as out:
-        for t in tokens:
-            out.write(t + "\n")
-    print("\n Tokens generados correctamente en 'salida_tokens.txt'")
+        try:
+            if binario:
+                exportar_tokens_binario(iter_tokens(f), salida)
+            else:
+                exportar_tokens(iter_tokens(f), salida)
+        except LexError as e:
+            print(f">>> {e}")
+            raise SystemExit(1)
+    print(f"\n Tokens generados correctamente en '{salida}'")
 
 
 if __name__ == "__main__":
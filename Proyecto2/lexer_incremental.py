@@ -0,0 +1,195 @@
+# ---------------------------------------------
+# Lexer incremental para buffers de editor
+# - Puntos de control en cada inicio de línea fuera de cadenas:
+#   (offset, índice de token, línea, indent_stack)
+#   (dentro de una cadena triple no hay puntos: no se puede retomar ahí)
+# - Una edición (offset, borrados, insertado) se re-escanea desde el último
+#   punto anterior a ella y se detiene en el primer punto posterior cuyo
+#   estado coincide con el del flujo viejo; el resto se reutiliza
+# - Los tokens nuevos se empalman en el mismo TokenStore; los desplazamientos
+#   de offset/índice/línea del resto quedan pendientes y solo se materializa
+#   el tramo entre una edición y la anterior (como un gap buffer)
+# ---------------------------------------------
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from almacen_tokens import TokenStore, sumar_tramo
+from lexer import NOMBRES_TIPO, TAB_SIZE, EstadoLexer, LexError, _cerrar, _ErrorEnOffset, _motor
+from posiciones import CursorPosiciones
+
+
+class _Sincronizado(Exception):
+    """El re-escaneo alcanzó un punto de control idéntico al del flujo viejo."""
+
+    def __init__(self, linea, indice_viejo):
+        super().__init__()
+        self.linea = linea
+        self.indice_viejo = indice_viejo
+
+
+class _PuntosControl:
+    """
+    Columnas paralelas de puntos de control ordenadas por offset. Los puntos
+    k >= corte tienen pendiente el desplazamiento d = (d_off, d_idx, d_lin).
+    """
+
+    def __init__(self):
+        self.offsets = array("i")
+        self.indices = array("i")
+        self.lineas = array("i")
+        self.indents = []
+        self.corte = 0
+        self.d = (0, 0, 0)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def punto(self, k):
+        """(offset, índice de token, línea, indent) reales del punto k."""
+        off, idx, lin = self.offsets[k], self.indices[k], self.lineas[k]
+        if k >= self.corte:
+            d_off, d_idx, d_lin = self.d
+            off, idx, lin = off + d_off, idx + d_idx, lin + d_lin
+        return off, idx, lin, self.indents[k]
+
+    def buscar(self, offset, lo=0, derecha=False):
+        """bisect_left (o bisect_right) sobre los offsets reales, desde 'lo'."""
+        bisect = bisect_right if derecha else bisect_left
+        corte, n = self.corte, len(self.offsets)
+        if corte >= n:
+            return bisect(self.offsets, offset, lo, n)
+        d_off = self.d[0]
+        if offset < self.offsets[corte] + d_off:
+            return bisect(self.offsets, offset, lo, max(lo, corte))
+        return bisect(self.offsets, offset - d_off, max(lo, corte), n)
+
+    def _sumar(self, desde, hasta, d):
+        d_off, d_idx, d_lin = d
+        sumar_tramo(self.offsets, desde, hasta, d_off)
+        sumar_tramo(self.indices, desde, hasta, d_idx)
+        sumar_tramo(self.lineas, desde, hasta, d_lin)
+
+    def _fijar_hasta(self, k):
+        """Materializa el desplazamiento pendiente de los puntos < k."""
+        if self.corte < k:
+            self._sumar(self.corte, k, self.d)
+            self.corte = k
+
+    def reemplazar(self, desde, hasta, nuevos, d):
+        """
+        Los puntos [desde, hasta) pasan a ser 'nuevos' (valores reales) y los
+        puntos >= hasta reciben además el desplazamiento d.
+        """
+        self._fijar_hasta(desde)
+        if self.corte > hasta:
+            # [hasta, corte) ya estaba materializado: se compensa para unificar el corte
+            self._sumar(hasta, self.corte, tuple(-x for x in self.d))
+        self.d = tuple(a + b for a, b in zip(self.d, d))
+        self.offsets[desde:hasta] = array("i", (p[0] for p in nuevos))
+        self.indices[desde:hasta] = array("i", (p[1] for p in nuevos))
+        self.lineas[desde:hasta] = array("i", (p[2] for p in nuevos))
+        self.indents[desde:hasta] = [p[3] for p in nuevos]
+        self.corte = desde + len(nuevos)
+
+    def truncar(self, k):
+        """Deja solo los puntos < k (ya sin desplazamientos pendientes)."""
+        self._fijar_hasta(k)
+        del self.offsets[k:]
+        del self.indices[k:]
+        del self.lineas[k:]
+        del self.indents[k:]
+        self.corte, self.d = k, (0, 0, 0)
+
+
+class LexerIncremental:
+    """
+    Mantiene 'texto' y su TokenStore 'tokens' al día ante ediciones. El costo
+    de editar() depende del tamaño de la edición (líneas re-escaneadas) y de la
+    distancia a la edición anterior, no del tamaño del archivo.
+    """
+
+    def __init__(self, texto, motor="manual"):
+        self._escanear = _motor(motor)
+        self.texto = ""
+        self.tokens = TokenStore(NOMBRES_TIPO)
+        self.error = None  # LexError del último re-escaneo, si lo hubo
+        self._puntos = _PuntosControl()
+        self._puntos.reemplazar(0, 0, [(0, 0, 1, (0,))], (0, 0, 0))
+        try:
+            self.editar(0, 0, texto)
+        except LexError:
+            pass  # queda en self.error; el buffer de un editor puede estar a medio escribir
+
+    def editar(self, offset, borrados, insertado):
+        """
+        Aplica la edición: borra 'borrados' caracteres desde 'offset' e inserta
+        'insertado'. Devuelve (desde, hasta_viejo, hasta_nuevo): los tokens
+        [desde, hasta_viejo) del flujo anterior pasaron a ser [desde, hasta_nuevo).
+        Con un error léxico lanza LexError; 'tokens' queda solo con el prefijo
+        válido y la siguiente edición re-escanea desde ahí hasta el final.
+        """
+        viejo = self.texto
+        if not (0 <= offset and borrados >= 0 and offset + borrados <= len(viejo)):
+            raise ValueError("edición fuera del texto")
+        texto = viejo[:offset] + insertado + viejo[offset + borrados:]
+        self.texto = texto
+        delta = len(insertado) - borrados
+        fin_nuevo = offset + len(insertado)
+
+        puntos = self._puntos
+        j = puntos.buscar(offset, derecha=True) - 1  # punto de reinicio (lo anterior no cambia)
+        inicio, desde, linea0, indent0 = puntos.punto(j)
+        tokens = self.tokens
+        nuevos = tokens.vacio_compartido()
+        marcados = []  # puntos de control nuevos (valores reales, índices absolutos)
+        sincronizar = self.error is None  # con un error previo el flujo viejo está truncado
+        estado = EstadoLexer()
+        estado.indent_stack = list(indent0)
+        # El escáner da offsets; el almacén guarda línea y columna (se desplazan por edición)
+        cursor = CursorPosiciones(texto, estado.tabs, estado.escapados, TAB_SIZE, linea0, 1, inicio)
+
+        def agregar(tipo, lexema, offset):
+            nuevos.agregar(tipo, lexema, *cursor.avanzar(offset))
+
+        def marcar(pos, indent_stack):
+            linea = cursor.avanzar(pos)[0]
+            indent = tuple(indent_stack)
+            if sincronizar and pos >= fin_nuevo:
+                m = puntos.buscar(pos - delta, j + 1)
+                if m < len(puntos):
+                    off, _idx, _lin, indent_viejo = puntos.punto(m)
+                    if off == pos - delta and indent_viejo == indent:
+                        raise _Sincronizado(linea, m)
+            marcados.append((pos, desde + len(nuevos), linea, indent))
+
+        try:
+            self._escanear(texto, estado, agregar, True, inicio, marcar)
+            _cerrar(estado, agregar, len(texto))
+            sinc = None
+        except _Sincronizado as s:
+            sinc = s
+        except _ErrorEnOffset as e:
+            # Se conserva el prefijo válido hasta el punto de reinicio
+            tokens.empalmar(desde, len(tokens), tokens.vacio_compartido())
+            puntos.truncar(j + 1)
+            self.error = LexError(*cursor.avanzar(e.offset))
+            raise self.error from None
+        self.error = None
+
+        if sinc is None:
+            # Re-escaneo hasta el final: todo lo posterior al punto j se reemplaza
+            hasta_viejo = len(tokens)
+            tokens.empalmar(desde, hasta_viejo, nuevos)
+            puntos.truncar(j + 1)
+            puntos.reemplazar(j + 1, j + 1, marcados, (0, 0, 0))
+            return desde, hasta_viejo, len(tokens)
+
+        m = sinc.indice_viejo
+        _off, hasta_viejo, linea_vieja, _indent = puntos.punto(m)
+        d_tokens = len(nuevos) - (hasta_viejo - desde)
+        d_lineas = sinc.linea - linea_vieja
+        tokens.empalmar(desde, hasta_viejo, nuevos)
+        tokens.desplazar_lineas(desde + len(nuevos), d_lineas)
+        puntos.reemplazar(j + 1, m, marcados, (delta, d_tokens, d_lineas))
+        return desde, hasta_viejo, desde + len(nuevos)
@@ -0,0 +1,224 @@
+# ---------------------------------------------
+# Lexer en paralelo para un solo archivo muy grande
+# - Pre-escaneo barato: cortes en inicios de línea con código en la columna 0
+#   (indentación 0) que no caen dentro de una cadena triple según la paridad
+#   de las comillas triples
+# - Cada tramo se escanea en un proceso del pool como si empezara el archivo
+# - Empalme en orden: en cada corte se emiten los DEDENT que dejaba abiertos
+#   el tramo anterior (una línea de indentación 0 los cierra todos), los
+#   offsets ya son absolutos y la tabla de lexemas de cada tramo se reubica
+#   en la global, así que el TokenStore resultante es idéntico al de tokenize
+# - El pre-escaneo puede equivocarse (comillas triples dentro de comentarios o
+#   de cadenas simples): un tramo solo se usa si el anterior terminó
+#   exactamente en el corte al inicio de una línea; si no, ese tramo se vuelve
+#   a escanear en serie desde donde quedó el anterior
+# ---------------------------------------------
+
+import argparse
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from almacen_tokens import TokenStore
+from lexer import (MOTORES, NOMBRES_TIPO, TAB_SIZE, TK, EstadoLexer, LexError, _cerrar, _ErrorEnOffset,
+                   _motor, tokenize)
+from posiciones import IndiceLineas
+
+TAM_MIN_TRAMO = 1 << 20  # caracteres: por debajo no compensa repartir
+TRAMOS_POR_PROCESO = 2  # algo más de un tramo por proceso reparte mejor los tramos lentos
+
+# "\n" seguido de un carácter de código en la columna 0 (el corte es la posición siguiente)
+_LINEA_CODIGO = re.compile(r"\n(?=[^ \t\r\n#])")
+_TRIPLE = re.compile(r"'''|\"\"\"")
+
+
+def _comilla_abierta(texto, desde, hasta, abierta):
+    """Comilla triple que sigue abierta en 'hasta', contando desde 'desde' (sin mirar escapes ni comentarios)."""
+    for m in _TRIPLE.finditer(texto, desde, hasta):
+        if abierta is None:
+            abierta = m.group()
+        elif m.group() == abierta:
+            abierta = None
+    return abierta
+
+
+def cortes(texto, partes, tam_min=TAM_MIN_TRAMO):
+    """
+    Tramos [(a, b), ...] que cubren 'texto': a lo sumo 'partes', de al menos
+    unos 'tam_min' caracteres, cortados en inicios de línea de indentación 0
+    con código y fuera de las cadenas triples que se ven en el pre-escaneo.
+    """
+    n = len(texto)
+    partes = min(partes, n // max(tam_min, 1))
+    inicios = [0]
+    abierta, visto = None, 0  # comilla triple abierta en la posición 'visto'
+    for k in range(1, partes):
+        m = _LINEA_CODIGO.search(texto, max(k * n // partes, inicios[-1] + 1) - 1)
+        while m is not None:
+            corte = m.end()
+            abierta = _comilla_abierta(texto, visto, corte, abierta)
+            visto = corte
+            if abierta is None:
+                break
+            # Dentro de una cadena triple: el corte va después de que se cierre
+            cierre = texto.find(abierta, corte)
+            if cierre == -1:
+                m = None
+                break
+            abierta, visto = None, cierre + 3
+            m = _LINEA_CODIGO.search(texto, visto)
+        if m is None:
+            break
+        inicios.append(m.end())
+    return list(zip(inicios, inicios[1:] + [n]))
+
+
+def _escanear_desde(tramo, base, estado, agregar_en, final, motor):
+    """
+    Escanea 'tramo' (que empieza en el offset 'base' del texto completo) con
+    el estado dado: los tokens, tabs y saltos escapados salen con offsets
+    absolutos. Devuelve la posición absoluta donde se detuvo.
+    """
+    tabs, escapados = estado.tabs, estado.escapados
+    n_tabs, n_escapados = len(tabs), len(escapados)
+    if base:
+        def agregar(tipo, lexema, offset):
+            agregar_en(tipo, lexema, offset + base)
+    else:
+        agregar = agregar_en
+    try:
+        i = _motor(motor)(tramo, estado, agregar, final=final)
+    except _ErrorEnOffset as e:
+        raise _ErrorEnOffset(e.offset + base) from None
+    finally:
+        if base:
+            tabs[n_tabs:] = [t + base for t in tabs[n_tabs:]]
+            escapados[n_escapados:] = [e + base for e in escapados[n_escapados:]]
+    return i + base
+
+
+def _lexear_tramo(tramo, base, final, motor):
+    """
+    Worker: escanea un tramo desde un estado inicial (inicio de línea, sin
+    indentación) y devuelve sus columnas, su tabla de lexemas y el estado
+    final. Un error léxico se devuelve como offset: solo cuenta si el tramo
+    resulta usable al empalmar.
+    """
+    estado = EstadoLexer()
+    tokens = TokenStore(NOMBRES_TIPO, IndiceLineas(tramo, estado.tabs, estado.escapados, TAB_SIZE))
+    error = None
+    try:
+        fin = _escanear_desde(tramo, base, estado, tokens.agregar_en, final, motor)
+    except _ErrorEnOffset as e:
+        fin, error = None, e.offset
+    return (tokens.tipos, tokens.lexemas, tokens.offsets, tokens.cadenas, estado.tabs, estado.escapados,
+            estado.indent_stack, estado.at_line_start, fin, error)
+
+
+def _empalmar(tokens, estado, resultado):
+    """Agrega al final de 'tokens' lo escaneado por un worker; devuelve la posición donde se detuvo."""
+    tipos, lexemas, offsets, cadenas, tabs, escapados, indent_stack, at_line_start, fin, error = resultado
+    estado.tabs.extend(tabs)
+    estado.escapados.extend(escapados)  # también antes de un error: cuentan para su línea
+    if error is not None:
+        raise _ErrorEnOffset(error)
+    # Tabla local -> global: los lexemas nuevos se agregan en el orden en que
+    # aparecen en el tramo, igual que al escanear todo en serie
+    indice = tokens._indice_cadena
+    tabla = []
+    for cadena in cadenas:
+        k = indice.get(cadena)
+        if k is None:
+            k = indice[cadena] = len(tokens.cadenas)
+            tokens.cadenas.append(cadena)
+        tabla.append(k)
+    if tabla == list(range(len(tabla))):
+        tokens.lexemas.extend(lexemas)
+    else:
+        tokens.lexemas.extend(array("i", map(tabla.__getitem__, lexemas)))
+    tokens.tipos.extend(tipos)
+    tokens.offsets.extend(offsets)
+    estado.indent_stack[:] = indent_stack
+    estado.at_line_start = at_line_start
+    return fin
+
+
+def tokenize_paralelo(texto, procesos=None, motor="manual", tam_min=TAM_MIN_TRAMO):
+    """
+    Igual que lexer.tokenize (mismo TokenStore, mismos errores), repartiendo
+    el escaneo de un texto grande entre 'procesos' procesos. Con un solo
+    tramo (texto chico o sin cortes posibles) es tokenize tal cual.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    tramos = cortes(texto, procesos * TRAMOS_POR_PROCESO, tam_min)
+    if procesos == 1 or len(tramos) == 1:
+        return tokenize(texto, motor)
+    _motor(motor)  # nombre inválido: ValueError antes de arrancar el pool
+
+    n = len(texto)
+    estado = EstadoLexer()
+    posiciones = IndiceLineas(texto, estado.tabs, estado.escapados, TAB_SIZE)
+    tokens = TokenStore(NOMBRES_TIPO, posiciones)
+    pool = ProcessPoolExecutor(min(procesos, len(tramos)))
+    try:
+        futuros = [pool.submit(_lexear_tramo, texto[a:b], a, b == n, motor) for a, b in tramos]
+        pos = 0
+        for (a, b), futuro in zip(tramos, futuros):
+            if pos == a and estado.at_line_start:
+                # Corte verdadero: la línea de indentación 0 cierra los bloques abiertos
+                for _ in range(len(estado.indent_stack) - 1):
+                    tokens.agregar_en(TK.DEDENT, "", a)
+                del estado.indent_stack[1:]
+                pos = _empalmar(tokens, estado, futuro.result())
+            elif pos < b:
+                # El tramo anterior terminó dentro de una cadena que cruza el corte
+                futuro.cancel()
+                pos = _escanear_desde(texto[pos:b], pos, estado, tokens.agregar_en, b == n, motor)
+    except _ErrorEnOffset as e:
+        raise LexError(*posiciones.linea_columna(e.offset)) from None
+    finally:
+        pool.shutdown(cancel_futures=True)
+    _cerrar(estado, tokens.agregar_en, n)
+    return tokens
+
+
+def _mismos_tokens(a, b):
+    """Compara dos TokenStore columna por columna (a_bytes no sirve: marshal depende de las referencias)."""
+    return (a.tipos == b.tipos and a.lexemas == b.lexemas and a.offsets == b.offsets
+            and a.cadenas == b.cadenas and a.posiciones.tabs == b.posiciones.tabs
+            and a.posiciones.escapados == b.posiciones.escapados)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Tokeniza un archivo grande repartiéndolo entre procesos.")
+    ap.add_argument("archivo")
+    ap.add_argument("-j", "--procesos", type=int, default=None, help="procesos (por defecto, todos los núcleos)")
+    ap.add_argument("--motor", choices=sorted(MOTORES), default="manual", help="escáner del lexer")
+    ap.add_argument("--comparar", action="store_true", help="tokenizar también en serie y verificar que coinciden")
+    args = ap.parse_args(argv)
+
+    with open(args.archivo, encoding="utf-8") as f:
+        texto = f.read()
+    t0 = time.perf_counter()
+    try:
+        tokens = tokenize_paralelo(texto, args.procesos, args.motor)
+    except LexError as e:
+        print(f">>> {e}", file=sys.stderr)
+        return 1
+    t_paralelo = time.perf_counter() - t0
+    print(f"{len(tokens)} tokens en {t_paralelo:.2f}s")
+    if args.comparar:
+        t0 = time.perf_counter()
+        serie = tokenize(texto, args.motor)
+        t_serie = time.perf_counter() - t0
+        iguales = _mismos_tokens(serie, tokens)
+        print(f"en serie {t_serie:.2f}s (x{t_serie / t_paralelo:.2f}), {'idénticos' if iguales else 'DIFERENTES'}")
+        return 0 if iguales else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# ---------------------------------------------
+# Validación por lotes (lexer + parser) - Proyecto Corte 2
+# - Recibe directorios, archivos o patrones glob (p. ej. "src/**/*.py")
+# - Analiza cada archivo en un proceso del pool (ProcessPoolExecutor)
+# - Un archivo con error léxico o sintáctico no detiene a los demás
+# - Reporte agregado en JSON lines: una línea por archivo con
+#   file, status, line, col, message, timings
+# - Código de salida 0 si todos los archivos son válidos, 1 si alguno falla
+# - --cache: los archivos sin cambios se resuelven desde cache_analisis (sin lexer ni parser)
+# - --max-errores N: recuperación de errores, el registro lista todos los errores del archivo
+# - --solo-lexico: prefiltro rápido con lexer.lex_check (sin parser), el registro suma
+#   las cuentas de tokens por tipo
+# ---------------------------------------------
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analisis_gramatica import PARSERS
+from cache_analisis import LIMITE_BYTES, CacheAnalisis
+from lexer import LexError, MOTORES, lex_check, tokenize
+
+# Valores posibles de "status" en el reporte
+OK = "ok"
+ERROR_LEXICO = "lex_error"
+ERROR_SINTACTICO = "parse_error"
+ERROR_LECTURA = "io_error"
+ERROR_INTERNO = "internal_error"
+
+
+def expandir_rutas(rutas, extension=".py"):
+    """
+    Lista ordenada y sin duplicados de archivos a validar: los directorios se
+    recorren recursivamente buscando 'extension'; el resto se trata como glob.
+    """
+    archivos = set()
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _dirs, nombres in os.walk(ruta):
+                for nombre in nombres:
+                    if nombre.endswith(extension):
+                        archivos.add(os.path.join(raiz, nombre))
+        else:
+            coincidencias = glob.glob(ruta, recursive=True)
+            # Una ruta sin comodines que no existe se reporta como io_error
+            archivos.update(coincidencias or ([ruta] if not glob.has_magic(ruta) else []))
+    return sorted(archivos)
+
+
+_caches = {}  # una CacheAnalisis por proceso (cada worker abre su conexión)
+
+
+def _cache_del_proceso(ruta, limite_bytes):
+    cache = _caches.get(ruta)
+    if cache is None:
+        cache = _caches[ruta] = CacheAnalisis(ruta, limite_bytes)
+    return cache
+
+
+def _decodificar(datos):
+    """Texto igual al de open(..., encoding="utf-8") en modo texto (saltos de línea universales)."""
+    return datos.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def validar_archivo(ruta, motor="manual", cache=None, limite_cache=LIMITE_BYTES, parser="recursivo", max_errores=1,
+                    solo_lexico=False):
+    """
+    Lexer + parser de un archivo. Nunca lanza: cualquier fallo queda en el
+    registro devuelto (un dict con las claves del reporte JSON lines).
+    'cache' es la ruta de una CacheAnalisis: un acierto evita lexer y parser.
+    'parser' elige el analizador sintáctico (analisis_gramatica.PARSERS).
+    Con max_errores > 1 el análisis sigue tras cada error y el registro suma
+    "errors" (line, col, message de cada uno); status, line, col y message son
+    los del primero, igual que sin recuperación. Así no se usa la caché.
+    Con solo_lexico=True solo se corre lexer.lex_check (tampoco usa la caché):
+    el registro suma "tokens" (cuentas por tipo), "lines" y "max_indent".
+    """
+    registro = {"file": ruta, "status": OK, "line": None, "col": None, "message": None,
+                "cached": False}
+    t0 = time.perf_counter()
+    t_lex = t_parse = None  # inicio de cada etapa alcanzada
+    try:
+        with open(ruta, "rb") as f:
+            datos = f.read()
+        usa_cache = cache and max_errores == 1 and not solo_lexico
+        almacen = _cache_del_proceso(cache, limite_cache) if usa_cache else None
+        clave = almacen.clave(datos) if almacen is not None else None
+        previo = almacen.obtener(clave) if almacen is not None else None
+        if previo is not None:
+            registro.update(previo[0], cached=True)
+        else:
+            texto = _decodificar(datos)
+            t_lex = time.perf_counter()
+            tokens = None
+            if solo_lexico:
+                resumen = lex_check(texto, motor)
+                e = resumen["error"]
+                if e is not None:
+                    registro.update(status=ERROR_LEXICO, line=e.linea, col=e.columna, message=str(e))
+                registro.update(tokens=resumen["tokens"], lines=resumen["lineas"],
+                                max_indent=resumen["profundidad_max"])
+                t_parse = time.perf_counter()
+            else:
+                try:
+                    tokens = tokenize(texto, motor, max_errores)
+                    t_parse = time.perf_counter()
+                    if max_errores > 1:
+                        analizador = PARSERS[parser](tokens, silencioso=True, max_errores=max_errores)
+                        analizador.parse_programa()
+                        errores = analizador.errores
+                        registro["errors"] = [{"line": e.linea, "col": e.columna, "message": str(e)} for e in errores]
+                    else:
+                        analizador = PARSERS[parser](tokens, silencioso=True)
+                        analizador.parse_programa()
+                        errores = [analizador.error_sintactico] if analizador.error_sintactico else []
+                    if errores:
+                        e = errores[0]
+                        estado = ERROR_LEXICO if isinstance(e, LexError) else ERROR_SINTACTICO
+                        registro.update(status=estado, line=e.linea, col=e.columna, message=str(e))
+                except LexError as e:
+                    registro.update(status=ERROR_LEXICO, line=e.linea, col=e.columna, message=str(e))
+            if almacen is not None:
+                almacen.guardar(clave, registro, tokens)
+    except (OSError, UnicodeDecodeError) as e:
+        registro.update(status=ERROR_LECTURA, message=str(e))
+    except Exception as e:  # p. ej. RecursionError con anidamientos extremos
+        registro.update(status=ERROR_INTERNO, message=f"{type(e).__name__}: {e}")
+    t_fin = time.perf_counter()
+    # Una etapa no alcanzada dura 0; la que falló termina en t_fin
+    t_lex = t_fin if t_lex is None else t_lex
+    t_parse = t_fin if t_parse is None else t_parse
+    registro["timings"] = {
+        "read_s": round(t_lex - t0, 6),
+        "lex_s": round(t_parse - t_lex, 6),
+        "parse_s": round(t_fin - t_parse, 6),
+        "total_s": round(t_fin - t0, 6),
+    }
+    return registro
+
+
+def validar_lote(archivos, procesos=None, motor="manual", cache=None, limite_cache=LIMITE_BYTES,
+                 parser="recursivo", max_errores=1, solo_lexico=False):
+    """
+    Genera los registros de validar_archivo en el mismo orden que 'archivos'.
+    procesos=1 analiza en este mismo proceso (sin pool).
+    """
+    if procesos == 1:
+        for ruta in archivos:
+            yield validar_archivo(ruta, motor, cache, limite_cache, parser, max_errores, solo_lexico)
+        return
+    procesos = procesos or os.cpu_count() or 1
+    # Trozos medianos: pocos viajes entre procesos sin desbalancear el final
+    trozo = max(1, min(64, len(archivos) // (procesos * 8)))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        n = len(archivos)
+        yield from pool.map(validar_archivo, archivos, [motor] * n, [cache] * n, [limite_cache] * n,
+                            [parser] * n, [max_errores] * n, [solo_lexico] * n, chunksize=trozo)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Valida en paralelo árboles de código fuente (lexer + parser).")
+    ap.add_argument("rutas", nargs="+", help="directorios, archivos o patrones glob")
+    ap.add_argument("-o", "--salida", default="-", help="reporte JSON lines (por defecto, stdout)")
+    ap.add_argument("-j", "--procesos", type=int, default=None, help="procesos del pool (por defecto, todos los núcleos)")
+    ap.add_argument("--motor", choices=sorted(MOTORES), default="manual", help="escáner del lexer")
+    ap.add_argument("--parser", choices=sorted(PARSERS), default="recursivo",
+                    help="analizador sintáctico (tabla: LL(1) generado de gramatica.py)")
+    ap.add_argument("--extension", default=".py", help="extensión buscada dentro de directorios")
+    ap.add_argument("--cache", default=None, help="archivo de caché (SQLite) para saltar archivos sin cambios")
+    ap.add_argument("--cache-max", type=int, default=LIMITE_BYTES // (1024 * 1024),
+                    help="tamaño máximo de la caché en MB (desalojo LRU)")
+    ap.add_argument("--max-errores", type=int, default=1,
+                    help="seguir tras cada error y reportar hasta N por archivo (solo parser recursivo, sin caché)")
+    ap.add_argument("--solo-lexico", action="store_true",
+                    help="solo validar el léxico y contar tokens por tipo (prefiltro rápido, sin parser ni caché)")
+    args = ap.parse_args(argv)
+    if args.solo_lexico and args.max_errores > 1:
+        ap.error("--solo-lexico informa solo el primer error léxico: no admite --max-errores")
+    if args.max_errores > 1 and not PARSERS[args.parser].RECUPERA_ERRORES:
+        ap.error(f"--max-errores requiere el parser recursivo, no {args.parser!r}")
+
+    archivos = expandir_rutas(args.rutas, args.extension)
+    inicio = time.perf_counter()
+    fallidos = aciertos = 0
+    out = sys.stdout if args.salida == "-" else open(args.salida, "w", encoding="utf-8")
+    try:
+        registros = validar_lote(archivos, args.procesos, args.motor, args.cache, args.cache_max * 1024 * 1024,
+                                 args.parser, args.max_errores, args.solo_lexico)
+        for registro in registros:
+            if registro["status"] != OK:
+                fallidos += 1
+            aciertos += registro["cached"]
+            out.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    resumen = f" {len(archivos)} archivos, {fallidos} con errores"
+    if args.cache:
+        resumen += f", {aciertos} desde caché"
+    print(f"{resumen} ({time.perf_counter() - inicio:.2f}s)", file=sys.stderr)
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# ---------------------------------------------
+# Re-análisis sintáctico incremental (editor)
+# - ParserIncremental registra el tramo de tokens de cada sentencia: nodo
+#   (largo, hijos), con los hijos (sentencias de sus suites) en posiciones
+#   relativas al padre, así que desplazar un subárbol no cuesta nada
+# - El parser solo mira hacia adelante: una sentencia que empezó en p y dejó
+#   la posición en p + largo depende únicamente de los tokens [p, p + largo]
+#   (el último es su token de anticipación). Si ninguno cambió, se reutiliza
+# - Tras una edición solo se re-analizan las sentencias que contienen el
+#   cambio, de la más externa a la más interna; sus hermanas se saltan
+# - En el nivel superior, al volver a un límite de sentencia viejo posterior al
+#   cambio, el resto del análisis anterior se reutiliza entero (también las
+#   sentencias posteriores a un error, para no re-analizar medio archivo
+#   cuando el texto vuelve a ser válido)
+# - AnalizadorIncremental combina LexerIncremental + ParserIncremental
+# ---------------------------------------------
+
+from array import array
+from bisect import bisect_left
+
+from almacen_tokens import sumar_tramo
+from analisis_gramatica import EOF, ParseError, Parser
+from lexer import LexError
+from lexer_incremental import LexerIncremental
+
+_SIN_CANDIDATOS = {}  # compartido, nunca se modifica
+
+
+class ParserIncremental(Parser):
+    """
+    Parser sobre un TokenStore que cambia en sitio (LexerIncremental.tokens).
+    Después de cada cambio de tokens se llama a notificar() con el rango que
+    devolvió LexerIncremental.editar(); analizar() re-analiza lo mínimo y deja
+    el mismo resultado (logs y error_sintactico) que un análisis completo.
+    """
+
+    def __init__(self, tokens, silencioso=True):
+        super().__init__(tokens, silencioso)
+        # Sentencias de nivel superior del último análisis: inicio absoluto y nodo
+        self._top_inicios = array("i")
+        self._top_nodos = []
+        # Los nodos forman cadenas de sentencias consecutivas; cada una termina en
+        # un corte: el EOF o una sentencia que falló. La primera empieza en 0 y
+        # las demás son restos válidos de análisis anteriores, pasado un error
+        self._cortes = [0]
+        self._n_viejo = 0           # tokens en el último análisis
+        # Tokens sin cambios desde el último análisis: prefijo y sufijo
+        self._prefijo = 0
+        self._sufijo = 0
+        # Estado de un análisis en curso
+        self._hijos = None
+        self._candidatos = _SIN_CANDIDATOS
+        self._a = self._b_viejo = self._b_nuevo = self._d = 0
+
+    def notificar(self, desde, hasta_viejo, hasta_nuevo):
+        """Los tokens [desde, hasta_viejo) pasaron a ser [desde, hasta_nuevo)."""
+        self._prefijo = min(self._prefijo, desde)
+        self._sufijo = min(self._sufijo, len(self.tokens) - hasta_nuevo)
+
+    def truncado(self):
+        """El flujo quedó recortado a un prefijo válido (error léxico en LexerIncremental)."""
+        self._prefijo = min(self._prefijo, len(self.tokens))
+        self._sufijo = 0
+
+    def parse_programa(self):
+        self.analizar()
+
+    def _a_viejo(self, p):
+        """Posición p del flujo actual en el flujo del último análisis (None si es token nuevo)."""
+        if p < self._a:
+            return p
+        if p >= self._b_nuevo:
+            return p - self._d
+        return None
+
+    def analizar(self):
+        tipos = self._tipos = self.tokens.tipos
+        n = len(tipos)
+        self._ultimo = n - 1
+        self.logs = []
+        self.error_sintactico = None
+        self.errores = []
+        a = self._a = self._prefijo
+        b_viejo = self._b_viejo = self._n_viejo - self._sufijo
+        self._b_nuevo = n - self._sufijo
+        d = self._d = n - self._n_viejo
+
+        # Se retoma en la primera sentencia de la cadena inicial que no termina
+        # (con su token de anticipación) antes del cambio; las anteriores se conservan
+        viejos_inicios, viejos_nodos, viejos_cortes = self._top_inicios, self._top_nodos, self._cortes
+        k = bisect_left(range(len(viejos_nodos)), a, key=lambda j: viejos_inicios[j] + viejos_nodos[j][0])
+        k = min(k, bisect_left(viejos_inicios, viejos_cortes[0]))
+        inicios, nodos = viejos_inicios[:k], viejos_nodos[:k]
+        self.pos = viejos_inicios[k - 1] + viejos_nodos[k - 1][0] if k else 0
+        self.k = tipos[self.pos] if n else EOF
+
+        error_inicio = None
+        try:
+            while self.k != EOF:
+                p = self.pos
+                nodo = None
+                p_viejo = self._a_viejo(p)
+                if p_viejo is not None:
+                    m = bisect_left(viejos_inicios, p_viejo, k)
+                    if m < len(viejos_inicios) and viejos_inicios[m] == p_viejo:
+                        nodo = viejos_nodos[m]
+                        if p_viejo >= b_viejo:
+                            # Mismo límite de sentencia y mismos tokens hasta el final: la
+                            # cadena vieja se reutiliza entera, desplazada d tokens
+                            corte = viejos_cortes[bisect_left(viejos_cortes, p_viejo)]
+                            hasta = bisect_left(viejos_inicios, corte, m)
+                            cadena = viejos_inicios[m:hasta]
+                            sumar_tramo(cadena, 0, len(cadena), d)
+                            inicios.extend(cadena)
+                            nodos.extend(viejos_nodos[m:hasta])
+                            self.pos = corte + d
+                            self.k = tipos[self.pos]
+                            k = hasta
+                            continue
+                self._candidatos = {p_viejo: nodo} if nodo is not None else _SIN_CANDIDATOS
+                self._hijos = hijos = []
+                error_inicio = p
+                self.parse_sentencia()
+                inicios.append(p)
+                nodos.append(hijos[0][1])
+            error_inicio = None
+            self.coincidir(EOF)
+            self.emit(" Análisis sintáctico finalizado correctamente.")
+        except ParseError as e:
+            self.error_sintactico = e
+        finally:
+            self._hijos, self._candidatos = None, _SIN_CANDIDATOS
+
+        if error_inicio is None:
+            cortes = [self.pos]
+        else:
+            # Las sentencias viejas posteriores al error siguen siendo válidas (sus
+            # tokens no cambiaron): se guardan para resincronizar en la próxima edición
+            desde_viejo = max(b_viejo, error_inicio - d + 1)
+            m = bisect_left(viejos_inicios, desde_viejo)
+            cola = viejos_inicios[m:]
+            sumar_tramo(cola, 0, len(cola), d)
+            inicios.extend(cola)
+            nodos.extend(viejos_nodos[m:])
+            cortes = [error_inicio] + [c + d for c in viejos_cortes if c >= desde_viejo]
+        self._top_inicios, self._top_nodos, self._cortes = inicios, nodos, cortes
+        self._n_viejo = n
+        self._prefijo = self._sufijo = n
+        return self.error_sintactico
+
+    def parse_sentencia(self):
+        hijos = self._hijos
+        if hijos is None:  # fuera de analizar(): sin registro
+            return Parser.parse_sentencia(self)
+        p = self.pos
+        p_viejo = self._a_viejo(p)
+        candidatos = self._candidatos
+        nodo = candidatos.get(p_viejo) if p_viejo is not None else None
+        if nodo is not None and (p_viejo + nodo[0] < self._a or p_viejo >= self._b_viejo):
+            # Tramo intacto: mismo resultado que antes, sin volver a analizarlo
+            self.pos = p + nodo[0]
+            self.k = self._tipos[self.pos]
+            hijos.append((p, nodo))
+            return
+        # Se re-analiza; las sentencias viejas de sus suites son candidatas a reutilizarse
+        self._hijos = propios = []
+        self._candidatos = {p_viejo + rel: h for rel, h in nodo[1]} if nodo is not None else _SIN_CANDIDATOS
+        try:
+            Parser.parse_sentencia(self)
+        finally:
+            self._hijos, self._candidatos = hijos, candidatos
+        hijos.append((p, (self.pos - p, [(q - p, h) for q, h in propios])))
+
+
+class AnalizadorIncremental:
+    """
+    Texto de un editor con tokens y resultado sintáctico al día:
+        inc = AnalizadorIncremental(texto)
+        inc.editar(offset, borrados, insertado)
+        error = inc.validar()   # None, LexError o ParseError (con linea y columna)
+    """
+
+    def __init__(self, texto, motor="manual"):
+        self.lexer = LexerIncremental(texto, motor)
+        self.parser = ParserIncremental(self.lexer.tokens)
+        if self.lexer.error is not None:
+            self.parser.truncado()
+
+    @property
+    def texto(self):
+        return self.lexer.texto
+
+    def editar(self, offset, borrados, insertado):
+        """Aplica la edición al texto y a los tokens (el re-análisis se hace en validar())."""
+        try:
+            rango = self.lexer.editar(offset, borrados, insertado)
+        except LexError:
+            self.parser.truncado()
+            return
+        self.parser.notificar(*rango)
+
+    def validar(self):
+        """Error léxico o sintáctico del texto actual, o None si es válido."""
+        if self.lexer.error is not None:
+            return self.lexer.error
+        return self.parser.analizar()
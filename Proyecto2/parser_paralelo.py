@@ -0,0 +1,219 @@
+# ---------------------------------------------
+# Análisis sintáctico en paralelo de las sentencias del nivel superior
+# - El parser solo mira hacia adelante y no guarda estado fuera de 'pos': una
+#   sentencia que empieza en p se analiza igual sin importar lo anterior
+# - Cortes: posiciones tras un NEWLINE/DEDENT con profundidad de bloques 0
+#   (INDENT - DEDENT) que no empiezan con else/elif (continúan un if)
+# - Los workers solo necesitan la columna de tipos: se escribe una vez en un
+#   archivo temporal que cada proceso mapea en memoria (mmap); los tokens
+#   completos (línea, columna, lexema) quedan en el proceso principal
+# - Cada worker analiza las sentencias de su tramo y devuelve dónde terminó y,
+#   si falló, dónde empezaba la sentencia con error. Un tramo solo se usa si
+#   el anterior terminó exactamente en su inicio; si no (una sentencia cruzó
+#   el corte), se analiza en serie desde donde quedó el anterior
+# - El primer error se rehace en el proceso principal con los tokens reales,
+#   así que el mensaje y los logs son los mismos que en serie
+# ---------------------------------------------
+
+import argparse
+import mmap
+import os
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from analisis_gramatica import DEDENT, EOF, INDENT, KW_ELIF, KW_ELSE, NEWLINE, ParseError, Parser
+from lexer import MOTORES, LexError
+from lexer_paralelo import tokenize_paralelo
+
+TAM_MIN_TRAMO = 100_000  # tokens por tramo: por debajo no compensa repartir
+TRAMOS_POR_PROCESO = 4
+
+# Un corte no puede caer en un token que continúa la sentencia anterior
+_NO_INICIAN = frozenset({INDENT, DEDENT, NEWLINE, EOF, KW_ELSE, KW_ELIF})
+
+
+def cortes(tipos, partes, tam_min=TAM_MIN_TRAMO):
+    """
+    Tramos [(a, b), ...] de posiciones de token que cubren 'tipos' (array
+    "i"), cortados en inicios de sentencia del nivel superior; a lo sumo
+    'partes' tramos de al menos unos 'tam_min' tokens.
+    """
+    n = len(tipos)
+    partes = min(partes, n // max(tam_min, 1))
+    datos = memoryview(tipos).cast("B")
+    # Los ids de tipo son chicos y no nulos: solo coinciden alineados a un elemento
+    aguja_indent = array("i", [INDENT]).tobytes()
+    aguja_dedent = array("i", [DEDENT]).tobytes()
+    inicios = [0]
+    p = profundidad = 0  # profundidad antes del token p
+    for k in range(1, partes):
+        objetivo = max(k * n // partes, inicios[-1] + tam_min)
+        tramo = datos[p * 4:objetivo * 4].tobytes()
+        profundidad += tramo.count(aguja_indent) - tramo.count(aguja_dedent)
+        p = objetivo
+        while p < n:
+            t = tipos[p]
+            if profundidad == 0 and t not in _NO_INICIAN and tipos[p - 1] in (NEWLINE, DEDENT):
+                break
+            if t == INDENT:
+                profundidad += 1
+            elif t == DEDENT:
+                profundidad -= 1
+            p += 1
+        if p >= n:
+            break
+        inicios.append(p)
+    return list(zip(inicios, inicios[1:] + [n]))
+
+
+# ---------------------------- LADO DEL WORKER ----------------------------
+
+class _TokenVacio:
+    """Lo que ve un worker como token: sus errores se rehacen en el proceso principal."""
+    line = col = 0
+    lexeme = type = ""
+
+
+class _SoloTipos:
+    """Columna de tipos mapeada (lo único que el parser consulta al acertar)."""
+
+    def __init__(self, tipos):
+        self.tipos = tipos
+
+    def __len__(self):
+        return len(self.tipos)
+
+    def __getitem__(self, i):
+        return _TokenVacio
+
+
+_mapeado = (None, None)  # (ruta, _SoloTipos) del último archivo de tipos abierto
+
+
+def _tipos_de(ruta):
+    global _mapeado
+    if _mapeado[0] != ruta:
+        with open(ruta, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _mapeado = (ruta, _SoloTipos(memoryview(mm).cast("i")))
+    return _mapeado[1]
+
+
+def _parsear_tramo(ruta, a, b):
+    """
+    Analiza las sentencias que empiezan en [a, b). Devuelve (fin, fallo):
+    la posición donde terminó o, si fallo, el inicio de la sentencia con error.
+    """
+    parser = Parser(_tipos_de(ruta), silencioso=True)
+    parser.pos, parser.k = a, parser._tipos[a]
+    inicio = a
+    try:
+        while parser.pos < b and parser.k != EOF:
+            inicio = parser.pos
+            parser.parse_sentencia()
+    except ParseError:
+        return inicio, True
+    return parser.pos, False
+
+
+# ------------------------------- PARSER -------------------------------
+
+class ParserParalelo(Parser):
+    """
+    Mismo resultado que Parser (logs, error_sintactico, mensajes), repartiendo
+    las sentencias del nivel superior entre 'procesos' procesos. 'pool' permite
+    reutilizar un ProcessPoolExecutor entre archivos (sin él se crea uno por
+    análisis). Con un flujo de tokens o un archivo chico analiza en serie.
+    """
+
+    def __init__(self, tokens, silencioso=False, procesos=None, pool=None, tam_min=TAM_MIN_TRAMO):
+        super().__init__(tokens, silencioso)
+        self.procesos = procesos or os.cpu_count() or 1
+        self.pool = pool
+        self.tam_min = tam_min
+
+    def parse_programa(self):
+        tipos = self._tipos
+        if not hasattr(self.tokens, "__len__"):
+            return Parser.parse_programa(self)
+        if not isinstance(tipos, array) or tipos.typecode != "i":
+            tipos = array("i", tipos)
+        tramos = cortes(tipos, self.procesos * TRAMOS_POR_PROCESO, self.tam_min)
+        if len(tramos) == 1 or (self.procesos == 1 and self.pool is None):
+            return Parser.parse_programa(self)
+
+        fd, ruta = tempfile.mkstemp(prefix="tipos_", suffix=".bin")
+        with os.fdopen(fd, "wb") as f:
+            tipos.tofile(f)
+        pool = self.pool or ProcessPoolExecutor(min(self.procesos, len(tramos)))
+        futuros = [pool.submit(_parsear_tramo, ruta, a, b) for a, b in tramos]
+        try:
+            pos = 0
+            for (a, b), futuro in zip(tramos, futuros):
+                if pos == a:
+                    fin, fallo = futuro.result()
+                    pos = fin
+                    if not fallo:
+                        continue
+                    # La sentencia con error se vuelve a analizar aquí, con los
+                    # tokens reales, para emitir exactamente el mismo mensaje
+                else:
+                    futuro.cancel()
+                if pos < b:
+                    self.pos, self.k = pos, tipos[pos]
+                    while self.pos < b and self.k != EOF:
+                        self.parse_sentencia()
+                    pos = self.pos
+            self.pos, self.k = pos, tipos[pos]
+            self.coincidir(EOF)
+            self.emit(" Análisis sintáctico finalizado correctamente.")
+        except ParseError as e:
+            self.error_sintactico = e
+            if not self.errores or self.errores[-1] is not e:
+                self.errores.append(e)
+        finally:
+            for futuro in futuros:
+                futuro.cancel()
+            if self.pool is None:
+                pool.shutdown()
+            os.unlink(ruta)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Analiza un archivo grande repartiendo las sentencias del nivel superior.")
+    ap.add_argument("archivo")
+    ap.add_argument("-j", "--procesos", type=int, default=None, help="procesos (por defecto, todos los núcleos)")
+    ap.add_argument("--motor", choices=sorted(MOTORES), default="manual", help="escáner del lexer")
+    ap.add_argument("--comparar", action="store_true", help="analizar también en serie y verificar que coinciden")
+    args = ap.parse_args(argv)
+
+    with open(args.archivo, encoding="utf-8") as f:
+        texto = f.read()
+    try:
+        tokens = tokenize_paralelo(texto, args.procesos, args.motor)
+    except LexError as e:
+        print(f">>> {e}", file=sys.stderr)
+        return 1
+    with ProcessPoolExecutor(args.procesos) as pool:
+        pool.submit(int).result()  # arranca el pool fuera de la medición
+        t0 = time.perf_counter()
+        parser = ParserParalelo(tokens, silencioso=True, procesos=args.procesos, pool=pool)
+        parser.parse_programa()
+        t_paralelo = time.perf_counter() - t0
+    print(f"{parser.logs[-1].strip()} ({len(tokens)} tokens, {t_paralelo:.2f}s)")
+    if args.comparar:
+        t0 = time.perf_counter()
+        serie = Parser(tokens, silencioso=True)
+        serie.parse_programa()
+        t_serie = time.perf_counter() - t0
+        iguales = serie.logs == parser.logs
+        print(f"en serie {t_serie:.2f}s (x{t_serie / t_paralelo:.2f}), {'mismo resultado' if iguales else 'DIFERENTE'}")
+        return 0 if iguales else 1
+    return 1 if parser.error_sintactico else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
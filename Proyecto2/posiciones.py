@@ -0,0 +1,140 @@
+# ---------------------------------------------
+# Línea y columna a partir de offsets en el texto fuente
+# - El lexer guarda en cada token solo su offset; línea y columna se
+#   calculan cuando hacen falta (mensajes de error, exportación de texto)
+# - Además del texto, el lexer anota dos listas de offsets (pocas entradas):
+#     tabs:      tabs fuera de cadenas y comentarios (avanzan la columna
+#                hasta el siguiente múltiplo de TAB_SIZE; el resto cuenta 1)
+#     escapados: saltos de línea precedidos de '\' dentro de una cadena,
+#                que no abren una línea nueva
+# - IndiceLineas: acceso aleatorio (bisect sobre los inicios de línea)
+# - CursorPosiciones: recorrido hacia adelante, para flujos de tokens
+# ---------------------------------------------
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+def _columna(col, desde, hasta, tabs, t, tam_tab):
+    """Columna en 'hasta' partiendo de 'col' en 'desde'; tabs[t:] son los tabs >= desde."""
+    n = len(tabs)
+    while t < n and tabs[t] < hasta:
+        col += tabs[t] - desde
+        col += tam_tab - (col - 1) % tam_tab
+        desde = tabs[t] + 1
+        t += 1
+    return col + hasta - desde
+
+
+class IndiceLineas:
+    """
+    Índice de inicios de línea de 'texto', construido una sola vez y solo al
+    primer pedido (las listas 'tabs' y 'escapados' pueden seguir llenándose
+    mientras el lexer avanza). linea(offset) y columna(offset) son 1-based.
+    """
+
+    def __init__(self, texto, tabs, escapados, tam_tab):
+        self.texto = texto
+        self.tabs = tabs
+        self.escapados = escapados
+        self.tam_tab = tam_tab
+        self._inicios = None
+
+    def _construir(self):
+        texto = self.texto
+        escapados = set(self.escapados)
+        inicios = array("i", [0])
+        p = texto.find("\n")
+        while p != -1:
+            if p not in escapados:
+                inicios.append(p + 1)
+            p = texto.find("\n", p + 1)
+        self._inicios = inicios
+
+    def linea(self, offset):
+        if self._inicios is None:
+            self._construir()
+        return bisect_right(self._inicios, offset)
+
+    def columna(self, offset):
+        return self.linea_columna(offset)[1]
+
+    def linea_columna(self, offset):
+        linea = self.linea(offset)
+        inicio = self._inicios[linea - 1]
+        t = bisect_left(self.tabs, inicio)
+        return linea, _columna(1, inicio, offset, self.tabs, t, self.tam_tab)
+
+    def convertir(self, offsets):
+        """(lineas, columnas) de una secuencia de offsets no decreciente, en una pasada."""
+        if self._inicios is None:
+            self._construir()
+        inicios, tabs, tam_tab = self._inicios, self.tabs, self.tam_tab
+        lineas, columnas = array("i"), array("i")
+        n_inicios, n_tabs = len(inicios), len(tabs)
+        linea, inicio, siguiente = 0, 0, 0
+        t = 0
+        for offset in offsets:
+            if offset >= siguiente:
+                linea = bisect_right(inicios, offset)
+                inicio = inicios[linea - 1]
+                siguiente = inicios[linea] if linea < n_inicios else float("inf")
+                t = bisect_left(tabs, inicio)
+            lineas.append(linea)
+            if t < n_tabs and tabs[t] < offset:
+                columnas.append(_columna(1, inicio, offset, tabs, t, tam_tab))
+            else:
+                columnas.append(offset - inicio + 1)
+        return lineas, columnas
+
+
+class CursorPosiciones:
+    """
+    Convierte offsets no decrecientes de 'texto' en (linea, col) avanzando
+    desde la última posición pedida: cada token cuesta lo que mide el tramo
+    desde el anterior (count/rfind en C), sin índice previo. Sirve para
+    flujos que se producen mientras se escanea (iter_tokens, lexer
+    incremental): 'tabs' y 'escapados' solo tienen que estar anotados hasta
+    la posición pedida. (linea, col) es la posición de 'inicio'.
+    """
+
+    def __init__(self, texto, tabs, escapados, tam_tab, linea=1, col=1, inicio=0):
+        self.texto = texto
+        self.tabs = tabs
+        self.escapados = escapados
+        self.tam_tab = tam_tab
+        self.linea = linea
+        self.col = col
+        self.pos = inicio
+        self._t = bisect_left(tabs, inicio)
+        self._e = bisect_left(escapados, inicio)
+
+    def avanzar(self, offset):
+        pos = self.pos
+        if offset <= pos:
+            return self.linea, self.col
+        texto = self.texto
+        desde, col = pos, self.col
+        saltos = texto.count("\n", pos, offset)
+        if saltos:
+            escapados, e0 = self.escapados, self._e
+            e = e0
+            while e < len(escapados) and escapados[e] < offset:
+                e += 1
+            self._e = e
+            saltos -= e - e0
+            if saltos:
+                ultimo = texto.rfind("\n", pos, offset)
+                while ultimo in escapados[e0:e]:
+                    ultimo = texto.rfind("\n", pos, ultimo)
+                self.linea += saltos
+                desde, col = ultimo + 1, 1
+        tabs, t = self.tabs, self._t
+        while t < len(tabs) and tabs[t] < desde:
+            t += 1
+        self.col = _columna(col, desde, offset, tabs, t, self.tam_tab)
+        while t < len(tabs) and tabs[t] < offset:
+            t += 1
+        self._t = t
+        self.pos = offset
+        return self.linea, self.col
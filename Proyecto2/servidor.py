@@ -0,0 +1,547 @@
+# ---------------------------------------------
+# Servidor de validación (daemon) con estado caliente
+# - asyncio sobre un socket Unix (--socket) o stdin/stdout
+# - JSON-RPC 2.0, un mensaje por línea o con encabezado Content-Length (como
+#   LSP); cada respuesta sale con el mismo marco que su petición
+# - validate(source | path): lexer + parser en un pool de procesos que vive
+#   lo mismo que el servidor (intérprete y módulos ya cargados), sin archivos
+#   intermedios; los resultados quedan en una caché LRU en memoria por
+#   contenido, así que un texto ya visto se responde sin pasar por el pool
+# - Cancelación por petición: cancel / $/cancelRequest, o automática cuando
+#   llega otra validación del mismo 'document' (la edición anterior quedó vieja).
+#   Una petición en cola no llega a correr; una en curso se interrumpe en el
+#   worker con SIGUSR1 (ver _al_cancelar)
+# - Cliente: clase Cliente y "--cliente archivos..." (p. ej. hooks de pre-commit)
+# ---------------------------------------------
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from analisis_gramatica import PARSERS
+from cache_analisis import CacheAnalisis
+from lexer import LexError, MOTORES, tokenize
+from lote import ERROR_INTERNO, ERROR_LECTURA, ERROR_LEXICO, ERROR_SINTACTICO, OK, _decodificar
+
+RANURAS = 1024  # validaciones en curso a la vez (una bandera de cancelación por ranura)
+ENTRADAS_CACHE = 4096  # resultados guardados en memoria (desalojo LRU)
+LIMITE_MENSAJE = 256 * 1024 * 1024  # bytes de un mensaje JSON-RPC
+
+# Códigos de error JSON-RPC (-32800 es el de LSP para peticiones canceladas)
+ERROR_JSON = -32700
+PETICION_INVALIDA = -32600
+METODO_DESCONOCIDO = -32601
+PARAMETROS_INVALIDOS = -32602
+ERROR_INTERNO_RPC = -32603
+PETICION_CANCELADA = -32800
+
+_SENAL_CANCELAR = getattr(signal, "SIGUSR1", None)  # sin ella solo se cancela lo que está en cola
+
+
+class Cancelado(Exception):
+    """La validación se canceló mientras un worker la analizaba."""
+
+
+class ErrorRPC(Exception):
+    def __init__(self, codigo, mensaje):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+
+# ---------------------------- LADO DEL WORKER ----------------------------
+
+_banderas = _pids = None  # arreglos compartidos con el servidor, por ranura
+_ranura_actual = None
+
+
+def _iniciar_worker(banderas, pids):
+    global _banderas, _pids
+    _banderas, _pids = banderas, pids
+    if _SENAL_CANCELAR is not None:
+        signal.signal(_SENAL_CANCELAR, _al_cancelar)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C lo atiende el servidor
+
+
+def _al_cancelar(_signo, _marco):
+    # La señal puede llegar tarde, con el worker ya en otra petición o
+    # esperando trabajo: solo se interrumpe si la ranura en curso es la cancelada
+    ranura = _ranura_actual
+    if ranura is not None and _banderas[ranura]:
+        raise Cancelado()
+
+
+def analizar_texto(texto, motor="manual", parser="recursivo", ranura=None):
+    """
+    Lexer + parser de 'texto' (se ejecuta en un worker del pool). Devuelve un
+    dict con status/line/col/message y los tiempos de cada etapa; lanza
+    Cancelado si el servidor canceló la ranura antes o durante el análisis.
+    """
+    global _ranura_actual
+    resultado = {"status": OK, "line": None, "col": None, "message": None}
+    t0 = time.perf_counter()
+    t_parse = None
+    try:
+        if ranura is not None:
+            # El pid se publica antes de mirar la bandera: el servidor la
+            # marca antes de leer el pid, así que uno de los dos ve al otro
+            _ranura_actual = ranura
+            _pids[ranura] = os.getpid()
+            if _banderas[ranura]:
+                raise Cancelado()
+        try:
+            tokens = tokenize(texto, motor)
+            t_parse = time.perf_counter()
+            analizador = PARSERS[parser](tokens, silencioso=True)
+            analizador.parse_programa()
+            e = analizador.error_sintactico
+            if e is not None:
+                resultado.update(status=ERROR_SINTACTICO, line=e.linea, col=e.columna, message=str(e))
+        except LexError as e:
+            resultado.update(status=ERROR_LEXICO, line=e.linea, col=e.columna, message=str(e))
+        except Cancelado:
+            raise
+        except Exception as e:  # p. ej. RecursionError con anidamientos extremos
+            resultado.update(status=ERROR_INTERNO, message=f"{type(e).__name__}: {e}")
+    finally:
+        _ranura_actual = None
+    t_fin = time.perf_counter()
+    t_parse = t_fin if t_parse is None else t_parse
+    resultado["timings"] = {"lex_s": round(t_parse - t0, 6), "parse_s": round(t_fin - t_parse, 6)}
+    return resultado
+
+
+# --------------------------- MARCO DE MENSAJES ---------------------------
+
+LINEAS = "lineas"  # un objeto JSON por línea
+ENCABEZADO = "encabezado"  # Content-Length: N, línea vacía y N bytes (LSP)
+
+
+async def leer_mensaje(lector):
+    """(bytes del mensaje, marco) o (None, None) al cerrarse la entrada."""
+    while True:
+        linea = await lector.readline()
+        if not linea:
+            return None, None
+        if linea.strip():
+            break
+    if not linea[:15].lower().startswith(b"content-length:"):
+        return linea, LINEAS
+    largo = int(linea.split(b":", 1)[1])
+    while (await lector.readline()).strip():  # resto de los encabezados
+        pass
+    return await lector.readexactly(largo), ENCABEZADO
+
+
+def enmarcar(mensaje, marco):
+    datos = json.dumps(mensaje, ensure_ascii=False).encode("utf-8")
+    if marco == ENCABEZADO:
+        return b"Content-Length: %d\r\n\r\n" % len(datos) + datos
+    return datos + b"\n"
+
+
+class _SalidaEstandar:
+    """Lo mínimo de asyncio.StreamWriter sobre stdout (respuestas chicas, escritura directa)."""
+
+    def __init__(self, salida):
+        self._salida = salida
+
+    def write(self, datos):
+        self._salida.write(datos)
+        self._salida.flush()
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _entrada_estandar(loop):
+    """
+    StreamReader alimentado desde stdin por un hilo: funciona igual con un
+    pipe, una terminal o un archivo redirigido (connect_read_pipe no acepta
+    archivos regulares).
+    """
+    lector = asyncio.StreamReader(limit=LIMITE_MENSAJE)
+    fd = sys.stdin.fileno()
+
+    def alimentar():
+        try:
+            for bloque in iter(lambda: os.read(fd, 1 << 16), b""):
+                loop.call_soon_threadsafe(lector.feed_data, bloque)
+            loop.call_soon_threadsafe(lector.feed_eof)
+        except RuntimeError:
+            pass  # el servidor ya terminó (el bucle está cerrado)
+
+    threading.Thread(target=alimentar, name="stdin", daemon=True).start()
+    return lector
+
+
+# ------------------------------- SERVIDOR -------------------------------
+
+class _Peticion:
+    __slots__ = ("ranura", "futuro", "documento")
+
+    def __init__(self, ranura, futuro, documento):
+        self.ranura = ranura
+        self.futuro = futuro
+        self.documento = documento
+
+
+class Servidor:
+    """
+    Estado que vive entre peticiones: el pool de workers, la caché de
+    resultados y las validaciones en curso (para poder cancelarlas).
+        servidor = Servidor(procesos=4)
+        asyncio.run(servidor.servir("/tmp/validador.sock"))
+    """
+
+    def __init__(self, procesos=None, motor="manual", parser="recursivo", entradas_cache=ENTRADAS_CACHE):
+        self.procesos = procesos or os.cpu_count() or 1
+        self.motor = motor
+        self.parser = parser
+        self.entradas_cache = entradas_cache
+        contexto = multiprocessing.get_context()
+        self._banderas = contexto.Array("b", RANURAS, lock=False)
+        self._pids = contexto.Array("i", RANURAS, lock=False)
+        self._libres = list(range(RANURAS))
+        self._hay_ranura = asyncio.Semaphore(RANURAS)
+        self.pool = ProcessPoolExecutor(self.procesos, initializer=_iniciar_worker,
+                                        initargs=(self._banderas, self._pids))
+        self.cache = OrderedDict()  # clave de contenido -> resultado (sin file/cached/timings)
+        self.en_curso = {}  # (conexión, id) -> _Peticion
+        self.por_documento = {}  # document -> _Peticion más reciente
+        self.estadisticas = {"validaciones": 0, "aciertos_cache": 0, "canceladas": 0}
+        self._fin = None
+        self._metodos = {
+            "validate": self.validar,
+            "cancel": self.cancelar,
+            "$/cancelRequest": self.cancelar,
+            "stats": self.stats,
+            "shutdown": self.apagar,
+        }
+
+    def calentar(self):
+        """Arranca todos los workers ya (el primer pedido no paga el arranque del intérprete)."""
+        for _ in range(self.procesos):
+            self.pool.submit(analizar_texto, "", self.motor, self.parser)
+
+    # ---- Métodos RPC ----
+
+    async def validar(self, params, clave_peticion):
+        t0 = time.perf_counter()
+        try:
+            texto, archivo = await self._fuente(params)
+        except (OSError, UnicodeDecodeError) as e:
+            # Igual que en lote.py: un archivo ilegible es un resultado, no un fallo del protocolo
+            return {"file": params["path"], "status": ERROR_LECTURA, "line": None, "col": None,
+                    "message": str(e), "cached": False,
+                    "timings": {"total_s": round(time.perf_counter() - t0, 6)}}
+        motor = params.get("motor", self.motor)
+        parser = params.get("parser", self.parser)
+        if motor not in MOTORES or parser not in PARSERS:
+            raise ErrorRPC(PARAMETROS_INVALIDOS, f"motor o parser desconocido: {motor!r}, {parser!r}")
+        documento = params.get("document")
+        self.estadisticas["validaciones"] += 1
+
+        # Una validación nueva de un documento deja vieja a la anterior (y a
+        # cualquiera en curso), tenga o no su resultado en la caché
+        anterior = self.por_documento.pop(documento, None) if documento is not None else None
+        if anterior is not None:
+            self._cancelar(anterior)
+
+        # Todos los motores y parsers dan el mismo resultado: la clave es solo el contenido
+        clave = CacheAnalisis.clave(texto.encode("utf-8"))
+        resultado = self.cache.get(clave)
+        cacheado = resultado is not None
+        if cacheado:
+            self.cache.move_to_end(clave)
+            self.estadisticas["aciertos_cache"] += 1
+            tiempos = {}
+        else:
+            resultado = await self._analizar(texto, motor, parser, documento, clave_peticion)
+            tiempos = resultado.pop("timings")
+            self.cache[clave] = resultado
+            if len(self.cache) > self.entradas_cache:
+                self.cache.popitem(last=False)
+        tiempos["total_s"] = round(time.perf_counter() - t0, 6)
+        return {"file": archivo, **resultado, "cached": cacheado, "timings": tiempos}
+
+    async def cancelar(self, params, _clave_peticion):
+        conexion = _clave_peticion[0]
+        peticion = self.en_curso.get((conexion, params.get("id")))
+        if peticion is None:
+            return False  # ya terminó o nunca existió
+        self._cancelar(peticion)
+        return True
+
+    async def stats(self, _params, _clave_peticion):
+        return {**self.estadisticas, "procesos": self.procesos, "en_curso": len(self.en_curso),
+                "entradas_cache": len(self.cache)}
+
+    async def apagar(self, _params, _clave_peticion):
+        self._fin.set()
+        return None
+
+    # ---- Validación en el pool ----
+
+    async def _fuente(self, params):
+        """(texto, archivo) de los parámetros: 'source' (texto) o 'path' (se lee aquí)."""
+        if isinstance(params.get("source"), str):
+            return _decodificar(params["source"].encode("utf-8")), params.get("path")
+        if isinstance(params.get("path"), str):
+            datos = await asyncio.to_thread(_leer, params["path"])
+            return _decodificar(datos), params["path"]
+        raise ErrorRPC(PARAMETROS_INVALIDOS, "validate necesita 'source' (texto) o 'path'")
+
+    async def _analizar(self, texto, motor, parser, documento, clave_peticion):
+        await self._hay_ranura.acquire()
+        ranura = self._libres.pop()
+        self._banderas[ranura] = 0
+        self._pids[ranura] = 0
+        futuro = self.pool.submit(analizar_texto, texto, motor, parser, ranura)
+        # La ranura se libera cuando el worker la suelta, no cuando deja de
+        # esperarse: así una ranura cancelada no se reutiliza antes de tiempo
+        loop = asyncio.get_running_loop()
+        futuro.add_done_callback(lambda _f: loop.call_soon_threadsafe(self._liberar, ranura))
+        peticion = _Peticion(ranura, futuro, documento)
+        self.en_curso[clave_peticion] = peticion
+        if documento is not None:
+            self.por_documento[documento] = peticion
+        try:
+            return await asyncio.wrap_future(futuro)
+        except (Cancelado, asyncio.CancelledError):
+            if not futuro.cancelled() and not self._banderas[ranura]:
+                # Se canceló la tarea que esperaba (p. ej. se cerró la conexión)
+                self._cancelar(peticion)
+                raise
+            self.estadisticas["canceladas"] += 1
+            raise ErrorRPC(PETICION_CANCELADA, "petición cancelada") from None
+        finally:
+            del self.en_curso[clave_peticion]
+            if documento is not None and self.por_documento.get(documento) is peticion:
+                del self.por_documento[documento]
+
+    def _cancelar(self, peticion):
+        if peticion.futuro.cancel():
+            return  # seguía en la cola del pool: no llega a correr
+        self._banderas[peticion.ranura] = 1
+        pid = self._pids[peticion.ranura]
+        if pid and _SENAL_CANCELAR is not None and not peticion.futuro.done():
+            try:
+                os.kill(pid, _SENAL_CANCELAR)
+            except ProcessLookupError:
+                pass
+
+    def _liberar(self, ranura):
+        self._libres.append(ranura)
+        self._hay_ranura.release()
+
+    # ---- Conexiones ----
+
+    async def atender(self, lector, escritor):
+        """Lee mensajes de una conexión y atiende cada uno en su propia tarea."""
+        conexion = object()  # los id de JSON-RPC son por conexión
+        candado = asyncio.Lock()
+        tareas = set()
+        try:
+            while True:
+                datos, marco = await leer_mensaje(lector)
+                if datos is None:
+                    break
+                tarea = asyncio.create_task(self._despachar(datos, marco, conexion, escritor, candado))
+                tareas.add(tarea)
+                tarea.add_done_callback(tareas.discard)
+            # Entrada cerrada: las respuestas pendientes todavía se entregan
+            if tareas:
+                await asyncio.wait(tareas)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, asyncio.CancelledError):
+            # Conexión rota o servidor apagándose: lo pendiente ya no tiene a quién responder
+            for tarea in tareas:
+                tarea.cancel()
+        finally:
+            escritor.close()
+
+    async def _despachar(self, datos, marco, conexion, escritor, candado):
+        try:
+            mensaje = json.loads(datos)
+        except ValueError:
+            await _responder(escritor, candado, marco, _error(None, ERROR_JSON, "JSON inválido"))
+            return
+        if not isinstance(mensaje, dict) or not isinstance(mensaje.get("method"), str):
+            ident = mensaje.get("id") if isinstance(mensaje, dict) else None
+            await _responder(escritor, candado, marco, _error(ident, PETICION_INVALIDA, "petición inválida"))
+            return
+        ident = mensaje.get("id")
+        params = mensaje.get("params", {})
+        try:
+            metodo = self._metodos.get(mensaje["method"])
+            if metodo is None:
+                raise ErrorRPC(METODO_DESCONOCIDO, f"método desconocido: {mensaje['method']}")
+            if not isinstance(params, dict):
+                raise ErrorRPC(PARAMETROS_INVALIDOS, "params debe ser un objeto")
+            respuesta = {"jsonrpc": "2.0", "id": ident, "result": await metodo(params, (conexion, ident))}
+        except ErrorRPC as e:
+            respuesta = _error(ident, e.codigo, str(e))
+        except Exception as e:
+            respuesta = _error(ident, ERROR_INTERNO_RPC, f"{type(e).__name__}: {e}")
+        if "id" in mensaje:  # las notificaciones no tienen respuesta
+            await _responder(escritor, candado, marco, respuesta)
+
+    async def servir(self, ruta_socket=None):
+        """Atiende hasta 'shutdown', SIGTERM o (en stdin/stdout) el fin de la entrada."""
+        loop = asyncio.get_running_loop()
+        self._fin = asyncio.Event()
+        for senal in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(senal, self._fin.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        self.calentar()
+        try:
+            if ruta_socket is not None:
+                if os.path.exists(ruta_socket):
+                    os.unlink(ruta_socket)  # socket de una ejecución anterior
+                servidor = await asyncio.start_unix_server(self.atender, ruta_socket, limit=LIMITE_MENSAJE)
+                print(f"escuchando en {ruta_socket} ({self.procesos} procesos)", file=sys.stderr)
+                async with servidor:
+                    await self._fin.wait()
+                os.unlink(ruta_socket)
+            else:
+                lector = _entrada_estandar(loop)
+                atencion = asyncio.create_task(self.atender(lector, _SalidaEstandar(sys.stdout.buffer)))
+                fin = asyncio.create_task(self._fin.wait())
+                await asyncio.wait({atencion, fin}, return_when=asyncio.FIRST_COMPLETED)
+                fin.cancel()
+        finally:
+            for peticion in list(self.en_curso.values()):
+                self._cancelar(peticion)
+            self.pool.shutdown(cancel_futures=True)
+
+
+def _leer(ruta):
+    with open(ruta, "rb") as f:
+        return f.read()
+
+
+def _error(ident, codigo, mensaje):
+    return {"jsonrpc": "2.0", "id": ident, "error": {"code": codigo, "message": mensaje}}
+
+
+async def _responder(escritor, candado, marco, respuesta):
+    async with candado:
+        try:
+            escritor.write(enmarcar(respuesta, marco))
+            await escritor.drain()
+        except ConnectionError:
+            pass  # el cliente se fue: la respuesta ya no le sirve a nadie
+
+
+# -------------------------------- CLIENTE --------------------------------
+
+class Cliente:
+    """
+    Cliente bloqueante para un servidor en un socket Unix (un mensaje por línea):
+        with Cliente("/tmp/validador.sock") as c:
+            c.validar(path="codigo.py")   # dict como los registros de lote.py
+    """
+
+    def __init__(self, ruta_socket):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(ruta_socket)
+        self._archivo = self._socket.makefile("rwb")
+        self._siguiente = 0
+
+    def enviar(self, metodo, params=None):
+        """Envía una petición sin esperar la respuesta; devuelve su id."""
+        self._siguiente += 1
+        mensaje = {"jsonrpc": "2.0", "id": self._siguiente, "method": metodo, "params": params or {}}
+        self._archivo.write(enmarcar(mensaje, LINEAS))
+        self._archivo.flush()
+        return self._siguiente
+
+    def recibir(self):
+        """Próxima respuesta (en el orden en que el servidor las termina)."""
+        linea = self._archivo.readline()
+        if not linea:
+            raise ConnectionError("el servidor cerró la conexión")
+        return json.loads(linea)
+
+    def llamar(self, metodo, params=None):
+        ident = self.enviar(metodo, params)
+        respuesta = self.recibir()
+        while respuesta.get("id") != ident:
+            respuesta = self.recibir()
+        if "error" in respuesta:
+            raise ErrorRPC(respuesta["error"]["code"], respuesta["error"]["message"])
+        return respuesta["result"]
+
+    def validar(self, source=None, path=None, **params):
+        if source is not None:
+            params["source"] = source
+        if path is not None:
+            params["path"] = path
+        return self.llamar("validate", params)
+
+    def cerrar(self):
+        self._archivo.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.cerrar()
+
+
+def _validar_remoto(ruta_socket, archivos, salida):
+    """Envía todas las validaciones juntas y escribe un registro por archivo, en orden."""
+    with Cliente(ruta_socket) as cliente:
+        ids = {cliente.enviar("validate", {"path": os.path.abspath(ruta)}): ruta for ruta in archivos}
+        registros = {}
+        while len(registros) < len(ids):
+            respuesta = cliente.recibir()
+            ruta = ids[respuesta["id"]]
+            if "error" in respuesta:
+                registros[ruta] = {"file": ruta, "status": ERROR_INTERNO, "line": None, "col": None,
+                                   "message": respuesta["error"]["message"]}
+            else:
+                registros[ruta] = dict(respuesta["result"], file=ruta)
+    fallidos = 0
+    for ruta in archivos:
+        fallidos += registros[ruta]["status"] != OK
+        salida.write(json.dumps(registros[ruta], ensure_ascii=False) + "\n")
+    return fallidos
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Servidor de validación (lexer + parser) con JSON-RPC.")
+    ap.add_argument("--socket", default=None, help="socket Unix (por defecto, stdin/stdout)")
+    ap.add_argument("-j", "--procesos", type=int, default=None, help="procesos del pool (por defecto, todos los núcleos)")
+    ap.add_argument("--motor", choices=sorted(MOTORES), default="manual", help="escáner del lexer por defecto")
+    ap.add_argument("--parser", choices=sorted(PARSERS), default="recursivo", help="analizador sintáctico por defecto")
+    ap.add_argument("--cache-entradas", type=int, default=ENTRADAS_CACHE, help="resultados guardados en memoria")
+    ap.add_argument("--cliente", nargs="+", metavar="ARCHIVO", default=None,
+                    help="no servir: validar los archivos con el servidor de --socket (JSON lines como lote.py)")
+    args = ap.parse_args(argv)
+
+    if args.cliente is not None:
+        if args.socket is None:
+            ap.error("--cliente necesita --socket")
+        return 1 if _validar_remoto(args.socket, args.cliente, sys.stdout) else 0
+    servidor = Servidor(args.procesos, args.motor, args.parser, args.cache_entradas)
+    asyncio.run(servidor.servir(args.socket))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
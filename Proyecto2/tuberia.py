@@ -0,0 +1,308 @@
+# ---------------------------------------------
+# Lexer y parser en tubería
+# - El lexer corre en un productor (proceso o hilo) y, a medida que escanea,
+#   manda los tokens en lotes de tamaño fijo (columnas: tipos, lexemas,
+#   offsets) por una cola acotada; el parser los consume según llegan
+# - Contrapresión: la cola admite pocos lotes en vuelo (el productor se
+#   bloquea al llenarla) y el consumidor solo guarda los dos últimos lotes,
+#   así que los tokens en memoria no crecen con la entrada
+# - La columna de tipos es un dict posición -> tipo: los accesos del parser son
+#   búsquedas en C y solo al pasar de lote se llama a Python (__missing__)
+# - Línea y columna no viajan: con cada lote van los tabs y saltos escapados
+#   nuevos, y los tokens que pide el parser las calculan con un IndiceLineas
+#   solo al leerlas (mensajes de error)
+# - Un error léxico llega en su lugar del flujo, después de los tokens que lo
+#   preceden: se lanza cuando el parser pide un token posterior, y un error
+#   sintáctico anterior se informa sin esperar a que termine el lexing
+# ---------------------------------------------
+
+import argparse
+import multiprocessing
+import pickle
+import queue
+import sys
+import threading
+import time
+from array import array
+
+from analisis_gramatica import _parser
+from lexer import MOTORES, NOMBRES_TIPO, TAB_SIZE, EstadoLexer, LexError, _cerrar, _ErrorEnOffset, _motor, tokenize
+from posiciones import IndiceLineas
+
+TAM_LOTE = 4096  # tokens por lote
+LOTES_EN_VUELO = 8  # capacidad de la cola entre lexer y parser
+
+
+class _Detenido(Exception):
+    """El consumidor pidió detener al productor (el parser ya terminó)."""
+
+
+def _producir(fuente, cola, detener, tam_lote, motor):
+    """
+    Productor: tokeniza 'fuente' (texto o ("ruta", nombre, codificación)) y
+    pone en la cola ("lote", tipos, lexemas, offsets, tabs, escapados) con los
+    tabs y escapados nuevos de cada lote, y al final ("fin",),
+    ("error", linea, columna) o ("excepcion", e).
+    """
+    try:
+        if isinstance(fuente, tuple):
+            _, nombre, codificacion = fuente
+            with open(nombre, "r", encoding=codificacion) as f:
+                fuente = f.read()
+        texto = fuente
+        estado = EstadoLexer()
+        tipos, lexemas, offsets = array("i"), [], array("i")
+        enviados = [0, 0]  # tabs y escapados ya enviados
+
+        def enviar():
+            if detener.is_set():
+                raise _Detenido
+            # Copias: la cola de procesos serializa el lote más tarde, en otro hilo
+            cola.put(("lote", tipos[:], lexemas[:], offsets[:],
+                      estado.tabs[enviados[0]:], estado.escapados[enviados[1]:]))
+            enviados[:] = len(estado.tabs), len(estado.escapados)
+            del tipos[:], lexemas[:], offsets[:]
+
+        agregar_tipo, agregar_lexema, agregar_offset = tipos.append, lexemas.append, offsets.append
+
+        def agregar(tipo, lexema, offset):
+            agregar_tipo(tipo)
+            agregar_lexema(lexema)
+            agregar_offset(offset)
+            if len(tipos) == tam_lote:
+                enviar()
+
+        try:
+            _motor(motor)(texto, estado, agregar)
+        except _ErrorEnOffset as e:
+            if tipos:
+                enviar()  # los tokens anteriores al error también se entregan
+            posiciones = IndiceLineas(texto, estado.tabs, estado.escapados, TAB_SIZE)
+            cola.put(("error",) + posiciones.linea_columna(e.offset))
+            return
+        _cerrar(estado, agregar, len(texto))
+        if tipos:
+            enviar()
+        cola.put(("fin",))
+    except _Detenido:
+        pass
+    except Exception as e:  # archivo ilegible, UnicodeDecodeError...: se relanza en el parser
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(repr(e))
+        cola.put(("excepcion", e))
+
+
+class _TiposEnLotes(dict):
+    """Columna 'tipos' de TokensEnTuberia: posición -> tipo de los lotes en la ventana."""
+    __slots__ = ("_flujo",)
+
+    def __init__(self, flujo):
+        super().__init__()
+        self._flujo = flujo
+
+    def __missing__(self, pos):
+        return self._flujo.cargar(pos)
+
+
+class _TokenEnTuberia:
+    """Token de la ventana (misma interfaz que Token): línea y columna al leerlas."""
+    __slots__ = ("kind", "lexeme", "_offset", "_flujo")
+
+    def __init__(self, kind, lexeme, offset, flujo):
+        self.kind, self.lexeme, self._offset, self._flujo = kind, lexeme, offset, flujo
+
+    @property
+    def type(self):
+        return self._flujo.nombres_tipo[self.kind]
+
+    @property
+    def line(self):
+        return self._flujo.linea_columna(self._offset)[0]
+
+    @property
+    def col(self):
+        return self._flujo.linea_columna(self._offset)[1]
+
+    def __repr__(self):
+        return f"Token({self.type!r}, {self.lexeme!r}, {self.line}, {self.col})"
+
+
+class TokensEnTuberia:
+    """
+    Flujo de tokens producido por un lexer que corre en paralelo con el parser
+    (en otro proceso, o en un hilo con hilo=True). Se usa como cualquier flujo
+    de tokens: Parser(TokensEnTuberia(fuente)). 'fuente' es el texto o un
+    archivo abierto (en modo proceso se reabre por su nombre). Pasado el
+    último token (EOF) se sigue devolviendo ese mismo token. cerrar() (o el
+    bloque with) detiene el productor si el parser terminó antes, p. ej. por
+    un error sintáctico.
+    """
+
+    def __init__(self, fuente, motor="manual", hilo=False, tam_lote=TAM_LOTE, lotes_en_vuelo=LOTES_EN_VUELO):
+        _motor(motor)  # nombre inválido: ValueError antes de arrancar el productor
+        self.nombres_tipo = NOMBRES_TIPO
+        self.tipos = _TiposEnLotes(self)
+        self._lotes = []  # los dos últimos: (base, tipos, lexemas, offsets)
+        self._leidos = 0  # tokens recibidos
+        self._agotado = False
+        self._tabs, self._escapados = [], []
+        self._indice = None  # IndiceLineas y cuántos escapados había al construirlo
+        self._texto, self._archivo = fuente, None  # para calcular posiciones
+        if hasattr(fuente, "read"):
+            if hilo:
+                self._texto = fuente = fuente.read()
+            else:
+                # Un archivo abierto no se puede enviar: el productor lo reabre
+                # y aquí solo se relee si hace falta una posición
+                self._texto = None
+                self._archivo = fuente = ("ruta", fuente.name, getattr(fuente, "encoding", None) or "utf-8")
+        if hilo:
+            self._cola = queue.Queue(lotes_en_vuelo)
+            self._detener = threading.Event()
+            clase = threading.Thread
+        else:
+            self._cola = multiprocessing.Queue(lotes_en_vuelo)
+            self._detener = multiprocessing.Event()
+            clase = multiprocessing.Process
+        self._productor = clase(target=_producir, daemon=True,
+                                args=(fuente, self._cola, self._detener, tam_lote, motor))
+        self._productor.start()
+
+    def cargar(self, pos):
+        """Recibe lotes hasta cubrir 'pos' y devuelve su tipo (el de EOF si 'pos' pasó el final)."""
+        if pos < self._leidos:
+            raise IndexError("el token ya salió de la ventana de lectura")
+        tipos = self.tipos
+        while pos >= self._leidos and not self._agotado:
+            mensaje = self._recibir()
+            if mensaje[0] == "lote":
+                _, columna, lexemas, offsets, tabs, escapados = mensaje
+                self._lotes = self._lotes[-1:] + [(self._leidos, columna, lexemas, offsets)]
+                self._leidos += len(columna)
+                self._tabs += tabs
+                self._escapados += escapados
+                # Se conserva el lote anterior: el parser puede mirar un token atrás
+                tipos.clear()
+                for base, columna, *_ in self._lotes:
+                    tipos.update(zip(range(base, base + len(columna)), columna))
+            elif mensaje[0] == "fin":
+                self._agotado = True
+            elif mensaje[0] == "error":
+                self._agotado = True
+                raise LexError(mensaje[1], mensaje[2])
+            else:
+                self._agotado = True
+                raise mensaje[1]
+        if pos >= self._leidos:
+            if not self._lotes:
+                raise IndexError("el lexer no produjo tokens")
+            return self._lotes[-1][1][-1]
+        return tipos[pos]
+
+    def _recibir(self):
+        while True:
+            try:
+                return self._cola.get(timeout=0.1)
+            except queue.Empty:
+                if not self._productor.is_alive():
+                    try:
+                        return self._cola.get_nowait()
+                    except queue.Empty:
+                        raise RuntimeError("el lexer terminó sin cerrar el flujo de tokens") from None
+
+    def _ubicar(self, pos):
+        """(tipo, lexema, offset) del token en 'pos'."""
+        if pos >= self._leidos:
+            self.cargar(pos)
+            pos = min(pos, self._leidos - 1)
+        for base, tipos, lexemas, offsets in self._lotes:
+            if base <= pos < base + len(tipos):
+                i = pos - base
+                return tipos[i], lexemas[i], offsets[i]
+        raise IndexError("el token ya salió de la ventana de lectura")
+
+    def linea_columna(self, offset):
+        """(linea, col) de un offset ya recibido: los tabs y escapados cubren hasta el último lote."""
+        if self._indice is None or self._indice[1] != len(self._escapados):
+            if self._texto is None:
+                _, nombre, codificacion = self._archivo
+                with open(nombre, "r", encoding=codificacion) as f:
+                    self._texto = f.read()
+            self._indice = IndiceLineas(self._texto, self._tabs, self._escapados, TAB_SIZE), len(self._escapados)
+        return self._indice[0].linea_columna(offset)
+
+    def fila(self, pos):
+        """Tupla (tipo, lexema, linea, col) del token en 'pos'."""
+        tipo, lexema, offset = self._ubicar(pos)
+        return (tipo, lexema) + self.linea_columna(offset)
+
+    def __getitem__(self, pos):
+        return _TokenEnTuberia(*self._ubicar(pos), self)
+
+    def cerrar(self):
+        self._detener.set()
+        while self._productor.is_alive():
+            # Vaciar la cola desbloquea un put() pendiente para que vea 'detener'
+            try:
+                while True:
+                    self._cola.get_nowait()
+            except queue.Empty:
+                pass
+            self._productor.join(0.01)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def analizar_en_tuberia(fuente, motor="manual", parser="recursivo", hilo=False, silencioso=False,
+                        tam_lote=TAM_LOTE, lotes_en_vuelo=LOTES_EN_VUELO):
+    """
+    Como analyze(fuente, motor, parser), pero con el lexer corriendo a la par
+    del parser: la latencia se acerca a max(lex, parse) en vez de lex + parse
+    y un error sintáctico temprano no espera a que termine el lexing.
+    'fuente' es el texto o un archivo abierto. Devuelve el Parser ejecutado.
+    """
+    clase = _parser(parser)
+    with TokensEnTuberia(fuente, motor, hilo, tam_lote, lotes_en_vuelo) as tokens:
+        analizador = clase(tokens, silencioso)
+        analizador.parse_programa()
+    return analizador
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Analiza un archivo con el lexer y el parser en tubería.")
+    ap.add_argument("archivo")
+    ap.add_argument("--motor", choices=sorted(MOTORES), default="manual", help="escáner del lexer")
+    ap.add_argument("--parser", choices=["recursivo", "tabla"], default="recursivo", help="analizador")
+    ap.add_argument("--hilo", action="store_true", help="lexer en un hilo en vez de un proceso")
+    ap.add_argument("--comparar", action="store_true", help="analizar también con lex + parse en serie y comparar")
+    args = ap.parse_args(argv)
+
+    with open(args.archivo, encoding="utf-8") as f:
+        texto = f.read()
+    t0 = time.perf_counter()
+    try:
+        parser = analizar_en_tuberia(texto, args.motor, args.parser, args.hilo, silencioso=True)
+    except LexError as e:
+        print(f">>> {e} ({time.perf_counter() - t0:.2f}s)", file=sys.stderr)
+        return 1
+    t_tuberia = time.perf_counter() - t0
+    print(f"{parser.logs[-1].strip()} ({t_tuberia:.2f}s)")
+    if args.comparar:
+        t0 = time.perf_counter()
+        serie = _parser(args.parser)(tokenize(texto, args.motor), silencioso=True)
+        serie.parse_programa()
+        t_serie = time.perf_counter() - t0
+        iguales = serie.logs == parser.logs
+        print(f"lex + parse {t_serie:.2f}s (x{t_serie / t_tuberia:.2f}), {'mismo resultado' if iguales else 'DIFERENTE'}")
+        return 0 if iguales else 1
+    return 1 if parser.error_sintactico else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())